@@ -1,12 +1,17 @@
 # Импорт необходимых библиотек
 import requests  # Библиотека для выполнения HTTP-запросов к API
 import os       # Библиотека для работы с операционной системой и переменными окружения
+import json     # Библиотека для разбора частей потокового ответа
+import time     # Библиотека для измерения фаз запроса
 from dotenv import load_dotenv  # Библиотека для загрузки переменных окружения из .env файла
 from utils.logger import AppLogger  # Импорт собственного логгера для отслеживания работы (будет рассмотрен в следующей части урока)
 
 # Загрузка переменных окружения из .env файла при импорте модуля
 load_dotenv()
 
+# Тайм-ауты потокового запроса в секундах: (установка соединения, ожидание очередной части ответа)
+STREAM_TIMEOUT = (10, 120)
+
 class OpenRouterClient:
     """
     Клиент для взаимодействия с OpenRouter API.
@@ -29,7 +34,7 @@ class OpenRouterClient:
             ValueError: Если API ключ не найден в переменных окружения
         """
         # Инициализация логгера для отслеживания работы клиента
-        self.logger = AppLogger()
+        self.logger = AppLogger('api')
         
         # Получение необходимых параметров из переменных окружения
         self.api_key = os.getenv("OPENROUTER_API_KEY")  # API ключ для авторизации
@@ -78,7 +83,7 @@ class OpenRouterClient:
             models_data = response.json()
             
             # Логирование успешного получения списка моделей
-            self.logger.info(f"Retrieved {len(models_data["data"])} models")
+            self.logger.info("Retrieved %d models", len(models_data["data"]))
             
             # Преобразование данных в нужный формат
             return [
@@ -96,54 +101,115 @@ class OpenRouterClient:
                 {"id": "gpt-oss-120b:free", "name": "GPT"}
             ]
             # Логирование ошибки и возврата списка по умолчанию
-            self.logger.info(f"Retrieved {len(models_default)} models with Error: {e}")
+            self.logger.info("Retrieved %s models with Error: %s", len(models_default), e)
             return models_default
 
-    def send_message(self, message: str, model: str):
+    def send_message(self, message: str, model: str, timings: dict = None, request_id: str = None):
         """
         Отправка сообщения выбранной языковой модели.
         
+        Ответ запрашивается в потоковом режиме (SSE), что позволяет измерить
+        время до первого токена и скорость генерации. Части ответа собираются
+        в словарь того же вида, что и обычный ответ API.
+        
         Args:
             message (str): Текст сообщения для отправки
             model (str): Идентификатор выбранной модели
+            timings (dict): Словарь для записи фаз запроса в секундах (необязательно):
+                - connect_time: до получения заголовков ответа (соединение и отправка запроса)
+                - ttft: до первого токена ответа
+                - generation_time: от первого до последнего токена
+                - tokens_per_second: скорость генерации выходных токенов
+                - parse_time: суммарное время разбора частей ответа
+            request_id (str): Идентификатор запроса для записей лога (необязательно)
             
         Returns:
             dict: Ответ от API, содержащий либо ответ модели, либо информацию об ошибке
         """
         # Логирование отправки сообщения
-        self.logger.debug(f"Sending message to model: {model}")
+        self.logger.debug("Sending message to model: %s", model, model=model, request_id=request_id)
         
         # Формирование данных для отправки в API
         data = {
             "model": model,  # Идентификатор выбранной модели
-            "messages": [{"role": "user", "content": message}]  # Сообщение в формате API
+            "messages": [{"role": "user", "content": message}],  # Сообщение в формате API
+            "stream": True   # Потоковая передача ответа по мере генерации
         }
+        timings = timings if timings is not None else {}
         
         try:
             # Логирование начала выполнения запроса
             self.logger.debug("Making API request")
 
-            # Отправка POST запроса к API
-            response = requests.post(
+            # Отправка POST запроса к API; with закрывает ответ и возвращает
+            # соединение в пул, даже если чтение прервано на "[DONE]" или ошибкой
+            started = time.perf_counter()
+            with requests.post(
                 f"{self.base_url}/chat/completions",  # Эндпоинт для чата
                 headers=self.headers,                 # Заголовки с авторизацией
-                json=data                            # Данные запроса
-            )
+                json=data,                           # Данные запроса
+                stream=True,                         # Чтение тела ответа по частям
+                timeout=STREAM_TIMEOUT               # Ожидание соединения и каждой части ответа
+            ) as response:
+                timings['connect_time'] = time.perf_counter() - started
+                
+                # Проверка на ошибки HTTP
+                response.raise_for_status()
+                
+                # Сборка ответа из событий SSE вида "data: {...}"
+                content = []
+                usage = {}
+                parse_time = 0.0
+                first_token = last_token = None
+                # Строки читаются байтами и декодируются как UTF-8 (кодировка SSE):
+                # без charset в заголовках requests декодировал бы их как ISO-8859-1
+                for raw_line in response.iter_lines(chunk_size=None):
+                    line = raw_line.decode('utf-8')
+                    if not line or not line.startswith("data: "):
+                        continue  # Пустые строки и комментарии (keep-alive)
+                    payload = line[len("data: "):]
+                    if payload == "[DONE]":
+                        break
+                    parse_started = time.perf_counter()
+                    chunk = json.loads(payload)
+                    if "error" in chunk:
+                        error = chunk["error"]
+                        raise RuntimeError(error.get("message", error) if isinstance(error, dict) else error)
+                    for choice in chunk.get("choices", []):
+                        delta = choice.get("delta", {}).get("content")
+                        if delta:
+                            content.append(delta)
+                            last_token = parse_started
+                            if first_token is None:
+                                first_token = parse_started
+                    if chunk.get("usage"):
+                        usage = chunk["usage"]
+                    parse_time += time.perf_counter() - parse_started
             
-            # Проверка на ошибки HTTP
-            response.raise_for_status()
+            # Расчет фаз генерации
+            finished = time.perf_counter()
+            timings['parse_time'] = parse_time
+            if first_token is not None:
+                timings['ttft'] = first_token - started
+                timings['generation_time'] = last_token - first_token
+                output_tokens = usage.get("completion_tokens", 0)
+                if output_tokens and last_token > first_token:
+                    timings['tokens_per_second'] = output_tokens / (last_token - first_token)
+            else:
+                timings['ttft'] = finished - started
             
             # Логирование успешного получения ответа
-            self.logger.info("Successfully received response from API")
+            self.logger.info("Successfully received response from API", model=model, request_id=request_id)
             
             # Возврат данных ответа
-            return response.json()
+            return {
+                "choices": [{"message": {"role": "assistant", "content": "".join(content)}}],
+                "usage": usage
+            }
 
         except Exception as e:
-            # Формирование информативного сообщения об ошибке
-            error_msg = f"API request failed: {str(e)}"
             # Логирование ошибки с полным стектрейсом для отладки
-            self.logger.error(error_msg, exc_info=True)
+            self.logger.error("API request failed: %s", e, exc_info=True, model=model, request_id=request_id)
             # Возврат сообщения об ошибке в формате ответа API
             return {"error": str(e)}       
 
@@ -168,9 +234,7 @@ class OpenRouterClient:
                 return f"${(data.get('total_credits', 0)-data.get('total_usage', 0)):.2f}"
             return "Ошибка"
         except Exception as e:
-            # Формирование сообщения об ошибке
-            error_msg = f"API request failed: {str(e)}"
             # Логирование ошибки с полным стектрейсом
-            self.logger.error(error_msg, exc_info=True)
+            self.logger.error("API request failed: %s", e, exc_info=True)
             # Возврат сообщения об ошибке
             return "Ошибка"
\ No newline at end of file
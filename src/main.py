@@ -3,15 +3,26 @@ import flet as ft                                   # Фреймворк для
 from api.openrouter import OpenRouterClient         # Клиент для взаимодействия с AI API через OpenRouter
 from ui.styles import AppStyles                     # Модуль с настройками стилей интерфейса
 from ui.components import *                         # Компоненты пользовательского интерфейса
+from ui.updates import UpdateScheduler              # Объединение обновлений страницы
+from ui.markdown import MarkdownRenderer            # Отображение ответов AI в формате Markdown
 from utils.cache import ChatCache, CacheManager     # Модуль для кэширования истории чата
 from utils.logger import AppLogger                  # Модуль для логирования работы приложения
 from utils.analytics import Analytics               # Модуль для сбора и анализа статистики использования
 from utils.monitor import PerformanceMonitor        # Модуль для мониторинга производительности
+from utils.loop_monitor import EventLoopMonitor     # Модуль контроля задержек цикла событий
+from utils.tracing import Tracer                    # Модуль трассировки участков выполнения
+from utils.profiler import Profiler                 # Модуль встроенного профилирования
+from utils.memory import MemoryDiagnostics          # Модуль диагностики роста памяти
+from utils.archive import HistoryArchiver           # Модуль для переноса старой истории в архив
+from utils.export import HistoryExporter            # Модуль для потокового экспорта истории
+from utils.importer import HistoryImporter          # Модуль для массового импорта истории
+from utils.metrics import MetricsRegistry, MetricsServer  # Модуль метрик в формате OpenMetrics
 import asyncio                                      # Библиотека для асинхронного программирования
 import time                                         # Библиотека для работы с временными метками
-import json                                         # Библиотека для работы с JSON-данными
-from datetime import datetime                       # Класс для работы с датой и временем
+from datetime import datetime, timedelta            # Классы для работы с датой и временем
 import os                                           # Библиотека для работы с операционной системой
+import threading                                    # Библиотека для запуска фоновых задач
+import uuid                                         # Библиотека для идентификаторов запросов в логах
 
 async def main(page: ft.Page):
     page.title = "AI Chat Application"
@@ -64,10 +75,24 @@ class ChatApp:
         """
         # Инициализация основных компонентов
         self.api_client = OpenRouterClient()       # Создание клиента для работы с AI API
-        self.cache = ChatCache()                   # Инициализация системы кэширования
+        self.cache = ChatCache(                    # Инициализация системы кэширования
+            deduplicate=os.getenv("CHAT_DEDUPLICATION") == "1"  # Дедупликация текстов (по желанию)
+        )
         self.logger = AppLogger()                  # Инициализация системы логирования
         self.analytics = Analytics(self.cache)     # Инициализация системы аналитики с передачей кэша
         self.monitor = PerformanceMonitor()        # Инициализация системы мониторинга
+        self.loop_monitor = EventLoopMonitor(      # Контроль блокировок цикла событий интерфейса
+            self.monitor,
+            AppLogger('monitor'),
+            slow_threshold=float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.25"))
+        )
+
+        # Архиватор старой истории с политикой хранения из переменных окружения
+        self.archiver = HistoryArchiver(self.cache, policy=HistoryArchiver.policy_from_env())
+
+        # Выбор последнего активного диалога (или создание нового)
+        self.current_conversation_id = self.cache.get_default_conversation()
+        self.history_before = None  # Ключ (время, ID), с которого загружается более старая страница истории
 
         # Создание компонента для отображения баланса API
         self.balance_text = ft.Text(
@@ -79,31 +104,200 @@ class ChatApp:
         # Создание директории для экспорта истории чата
         self.exports_dir = "exports"               # Путь к директории экспорта
         os.makedirs(self.exports_dir, exist_ok=True)  # Создание директории, если её нет
+        self.exporter = HistoryExporter(self.cache, self.exports_dir, archiver=self.archiver)  # Потоковый экспорт истории
+        self.importer = HistoryImporter(self.cache)                    # Массовый импорт истории
+
+        # Трассировка обработки сообщений (включается переменной TRACE_ENABLED=1)
+        self.tracer = Tracer(enabled=os.getenv("TRACE_ENABLED") == "1")
+
+        # Метрики в формате OpenMetrics (HTTP-сервер включается переменной METRICS_PORT)
+        self.metrics = MetricsRegistry()
+        self.setup_metrics()
+
+    def setup_metrics(self):
+        """
+        Регистрация метрик приложения и сборщика системных показателей.
+        
+        Метрики запросов обновляются при обработке сообщения (только счетчики),
+        системные показатели собираются фоновым потоком реестра.
+        """
+        self.metrics.counter('chat_requests', 'Запросы к модели по результату')
+        self.metrics.histogram('chat_request_duration_seconds', 'Полное время обработки сообщения')
+        self.metrics.histogram('chat_time_to_first_token_seconds', 'Время до первого токена ответа')
+        self.metrics.counter('chat_blob_store_lookups', 'Обращения к хранилищу текстов (hit - текст уже сохранен)')
+        self.metrics.gauge('process_cpu_percent', 'Загрузка CPU процессом')
+        self.metrics.gauge('process_memory_percent', 'Доля памяти, занятой процессом')
+        self.metrics.gauge('process_threads', 'Количество потоков процесса')
+        self.metrics.gauge('process_uptime_seconds', 'Время работы приложения')
+        self.metrics.gauge('event_loop_lag_seconds', 'Максимальная задержка цикла событий за минуту')
+        self.metrics.counter('event_loop_slow_callbacks', 'Блокировки цикла событий медленными обработчиками')
+        self.metrics.histogram('chat_ui_updates_per_message', 'Обновления страницы за обработку сообщения',
+                               buckets=(1, 2, 3, 4, 5, 8, 12, 20))
+        self.metrics.histogram('chat_ui_update_bytes_per_message', 'Объем команд клиенту за обработку сообщения',
+                               buckets=(1e3, 4e3, 16e3, 64e3, 256e3, 1e6, 4e6))
+        self.metrics.counter('ui_update_marks', 'Пометки элементов для обновления страницы')
+        self.metrics.counter('ui_updates', 'Отправленные клиенту обновления страницы')
+        self.metrics.counter('ui_update_bytes', 'Объем команд, отправленных клиенту (при UI_UPDATE_STATS=1)')
+
+        def collect_system_metrics():
+            metrics = self.monitor.get_metrics()
+            if 'error' not in metrics:
+                self.metrics.set('process_cpu_percent', metrics['cpu_percent'])
+                self.metrics.set('process_memory_percent', metrics['memory_percent'])
+                self.metrics.set('process_threads', metrics['thread_count'])
+                self.metrics.set('process_uptime_seconds', metrics['uptime'])
+            self.metrics.set('chat_blob_store_lookups', self.cache.blob_hits, result='hit')
+            self.metrics.set('chat_blob_store_lookups', self.cache.blob_misses, result='miss')
+            loop_lag = self.monitor.loop_lag_history.window_stats(60)
+            if loop_lag:
+                self.metrics.set('event_loop_lag_seconds', loop_lag['loop_lag']['max'])
+            self.metrics.set('event_loop_slow_callbacks', self.monitor.slow_callbacks)
+            updates = getattr(self, 'updates', None)
+            if updates is not None:
+                stats = updates.stats()
+                self.metrics.set('ui_update_marks', stats['marks'])
+                self.metrics.set('ui_updates', stats['updates_sent'] or stats['flushes'])
+                self.metrics.set('ui_update_bytes', stats['bytes_sent'])
+
+        self.metrics.add_collector(collect_system_metrics)
+
+    def setup_memory_diagnostics(self, page: ft.Page):
+        """
+        Запуск диагностики роста памяти со счетчиками живых объектов приложения.
+        
+        Отчеты о местах выделения с наибольшим приростом пишутся в лог,
+        скорость роста проверяется в PerformanceMonitor.check_health.
+        """
+        diagnostics = MemoryDiagnostics(
+            AppLogger('memory'),
+            interval=float(os.getenv("MEMORY_DIAGNOSTICS_INTERVAL", "60"))
+        )
+        diagnostics.add_counter('flet_controls', lambda: len(page.index))
+        diagnostics.add_counter('chat_history_controls', lambda: len(self.chat_history.controls))
+        diagnostics.add_counter('chat_history_rows', lambda: len(self.chat_history.rows))
+        diagnostics.add_counter('session_messages', lambda: len(self.analytics.session_data))
+        diagnostics.add_counter('metrics_history', lambda: len(self.monitor.metrics_history))
+        diagnostics.add_counter('search_index_vectors', lambda: self.cache.search_index.count)
+        diagnostics.add_counter('trace_events', lambda: len(self.tracer.events))
+        diagnostics.add_counter('markdown_cache_entries', lambda: len(self.markdown.segments))
+        diagnostics.add_counter('log_handlers', lambda: len(self.logger.logger.parent.handlers))
+        self.monitor.memory_diagnostics = diagnostics
+        diagnostics.start()
 
     def load_chat_history(self):
         """
-        Загрузка истории чата из кэша и отображение её в интерфейсе.
-        Сообщения добавляются в обратном порядке для правильной хронологии.
+        Загрузка истории текущего диалога из кэша и отображение её в интерфейсе.
+        Загружается последняя страница; более старые страницы подгружаются
+        лентой при прокрутке к началу (см. load_older_history).
         """
         try:
-            history = self.cache.get_chat_history()    # Получение истории из кэша
-            for msg in reversed(history):              # Перебор сообщений в обратном порядке
-                # Распаковка данных сообщения в отдельные переменные
-                _, model, user_message, ai_response, timestamp, tokens = msg
-                # Добавление пары сообщений (пользователь + AI) в интерфейс
-                self.chat_history.controls.extend([
-                    MessageBubble(                     # Создание пузырька сообщения пользователя
-                        message=user_message,
-                        is_user=True
-                    ),
-                    MessageBubble(                     # Создание пузырька ответа AI
-                        message=ai_response,
-                        is_user=False
-                    )
-                ])
+            # Получение последней страницы истории выбранного диалога
+            history = self.cache.get_chat_history(conversation_id=self.current_conversation_id)
+            self.history_before = (history[-1][4], history[-1][0]) if history else None  # Граница следующей страницы
+            self.chat_history.set_rows(self.history_rows(history))
         except Exception as e:
             # Логирование ошибки при загрузке истории
-            self.logger.error(f"Ошибка загрузки истории чата: {e}")
+            self.logger.error("Ошибка загрузки истории чата: %s", e)
+
+    def load_older_history(self):
+        """
+        Загрузка предыдущей страницы истории текущего диалога для ленты сообщений.
+        
+        Returns:
+            list: Сообщения страницы в хронологическом порядке (пустой список - истории больше нет)
+        """
+        if self.history_before is None:
+            return []
+        try:
+            history = self.cache.get_chat_history(
+                conversation_id=self.current_conversation_id,
+                before=self.history_before
+            )
+        except Exception as e:
+            self.logger.error("Ошибка загрузки истории чата: %s", e)
+            return []
+        self.history_before = (history[-1][4], history[-1][0]) if history else None
+        return self.history_rows(history)
+
+    @staticmethod
+    def history_rows(history):
+        """
+        Преобразование записей истории в сообщения ленты.
+        Записи приходят в обратном порядке, поэтому перебираются с конца.
+        
+        Returns:
+            list: Пары (пользователь, AI) в виде (текст, от пользователя, ID)
+        """
+        rows = []
+        for message_id, model, user_message, ai_response, timestamp, tokens in reversed(history):
+            rows.append((user_message, True, message_id))
+            rows.append((ai_response, False, message_id))
+        return rows
+
+    def show_similar(self, message, message_id=None):
+        """
+        Показ диалогов, похожих по смыслу на выбранное сообщение.
+        Поиск выполняется по локальному векторному индексу без обращения к API.
+        
+        Args:
+            message (str): Текст сообщения, для которого ищутся похожие
+            message_id (int): ID сообщения, исключаемого из результатов
+        """
+        page = self.page
+        try:
+            matches = self.cache.find_similar(message, top_k=5, exclude_id=message_id, archive=self.archiver)
+        except Exception as e:
+            self.logger.error("Ошибка поиска похожих диалогов: %s", e)
+            matches = []
+
+        # Формирование списка найденных диалогов
+        if matches:
+            results = [
+                ft.Container(
+                    content=ft.Column([
+                        ft.Text(f"{row[4]} · {row[1]} · близость {score:.2f}",
+                                size=12, color=ft.Colors.GREY_400),
+                        ft.Text(row[2], weight=ft.FontWeight.BOLD, max_lines=2),
+                        ft.Text(row[3], max_lines=3),
+                    ], tight=True),
+                    padding=10,
+                    border_radius=8,
+                    bgcolor=ft.Colors.GREY_800,
+                )
+                for score, row in matches
+            ]
+        else:
+            results = [ft.Text("Похожие диалоги не найдены")]
+
+        def close_similar(e):
+            dialog.open = False
+            page.update()
+            if dialog in page.overlay:
+                page.overlay.remove(dialog)
+
+        dialog = ft.AlertDialog(
+            title=ft.Text("Похожие диалоги"),
+            content=ft.Column(results, scroll=ft.ScrollMode.AUTO, tight=True, width=500),
+            actions=[ft.TextButton("Закрыть", on_click=close_similar)],
+        )
+        page.overlay.append(dialog)
+        dialog.open = True
+        page.update()
+
+    def compress_old_messages(self):
+        """
+        Фоновое сжатие крупных сообщений, сохраненных до появления сжатия.
+        Выполняется в отдельном потоке небольшими транзакциями.
+        """
+        try:
+            stats = self.cache.compress_existing_messages()
+            if stats['rows_compressed']:
+                self.logger.info(
+                    "Сжато сообщений: %d, сэкономлено: %.1f КБ",
+                    stats['rows_compressed'], stats['bytes_saved'] / 1024
+                )
+        except Exception as e:
+            self.logger.error("Ошибка сжатия истории: %s", e)
 
     def update_balance(self):
         """
@@ -119,7 +313,7 @@ class ChatApp:
             # Обработка ошибки получения баланса
             self.balance_text.value = "Баланс: н/д"         # Установка текста ошибки
             self.balance_text.color = ft.Colors.RED_400     # Установка красного цвета для ошибки
-            self.logger.error(f"Ошибка обновления баланса: {e}")
+            self.logger.error("Ошибка обновления баланса: %s", e)
 
     def main(self, page: ft.Page):
         """
@@ -129,16 +323,34 @@ class ChatApp:
         Args:
             page (ft.Page): Объект страницы Flet для размещения элементов интерфейса
         """
+        self.page = page                   # Сохранение страницы для обработчиков вне main
+
+        # Профилировщик: детерминированный режим работает в цикле событий страницы
+        self.profiler = Profiler(self.logger.logs_dir, run_task=page.run_task)
+
         # Применение базовых настроек страницы из конфигурации стилей
         for key, value in AppStyles.PAGE_SETTINGS.items():
             setattr(page, key, value)
 
         AppStyles.set_window_size(page)    # Установка размеров окна приложения
 
+        # Объединение обновлений страницы: не чаще одного обновления за кадр
+        self.updates = UpdateScheduler(page, interval=float(os.getenv("UI_FRAME_INTERVAL", 1 / 30)))
+        if os.getenv("UI_UPDATE_STATS") == "1":
+            self.updates.instrument(self.logger)  # Учет всех обновлений и их объема (для диагностики)
+
+        # Отображение ответов AI в формате Markdown: разбор кэшируется по содержимому,
+        # крупные блоки кода подсвечиваются в фоне и обновляются через планировщик
+        self.markdown = MarkdownRenderer(on_highlighted=self.updates.mark)
+
         # Инициализация выпадающего списка для выбора модели AI
         models = self.api_client.available_models
-        self.model_dropdown = ModelSelector(models)
-        self.model_dropdown.value = models[0] if models else None
+        self.model_dropdown = ModelSelector(
+            models,
+            scheduler=self.updates,
+            usage={model: usage['count'] for model, usage in self.analytics.model_usage.items()}
+        )
+        self.model_dropdown.value = models[0]['id'] if models else None
 
         async def send_message_click(e):
             """
@@ -147,77 +359,130 @@ class ChatApp:
             if not self.message_input.value:
                 return
 
+            trace_started = time.perf_counter()    # Начало участка трассы всего обработчика
+            request_id = uuid.uuid4().hex[:12]     # Идентификатор запроса для связи записей лога
+            updates_before = self.updates.stats()  # Для учета обновлений страницы за сообщение
             try:
                 # Визуальная индикация процесса
                 self.message_input.border_color = ft.Colors.BLUE_400
-                page.update()
 
-                # Сохранение данных сообщения
+                # Сохранение данных сообщения; диалог и модель фиксируются до ожидания ответа,
+                # так как пользователь может переключить их, пока запрос выполняется
                 start_time = time.time()
                 user_message = self.message_input.value
                 self.message_input.value = ""
-                page.update()
+                conversation_id = self.current_conversation_id
+                model_id = self.model_dropdown.value
 
-                # Добавление сообщения пользователя
-                self.chat_history.controls.append(
-                    MessageBubble(message=user_message, is_user=True)
-                )
+                # Добавление сообщения пользователя и индикатора загрузки;
+                # изменения отправляются одним обновлением до ожидания ответа
+                user_row = self.chat_history.append_message(user_message, is_user=True)
+                self.chat_history.show_loading()
+                self.updates.mark(self.message_input, self.chat_history)
+                with self.tracer.span('ui.update'):
+                    self.updates.flush()
+                self.chat_history.scroll_to_end()
 
-                # Индикатор загрузки
-                loading = ft.ProgressRing()
-                self.chat_history.controls.append(loading)
-                page.update()
+                # Асинхронная отправка запроса с измерением фаз
+                timings = {}
+                submitted = time.perf_counter()
+
+                def request():
+                    # Время ожидания свободного потока исполнителя
+                    http_started = time.perf_counter()
+                    timings['queue_time'] = http_started - submitted
+                    self.tracer.record('executor.wait', submitted, http_started)
+                    with self.tracer.span('http.send_message', model=model_id) as span:
+                        response = self.api_client.send_message(
+                            user_message,
+                            model_id,
+                            timings=timings,
+                            request_id=request_id
+                        )
+                        span.set(**timings)
+                    # Фазы HTTP-запроса как вложенные участки
+                    if 'connect_time' in timings:
+                        self.tracer.record('http.connect', http_started, http_started + timings['connect_time'])
+                    if 'generation_time' in timings:
+                        first_token = http_started + timings['ttft']
+                        self.tracer.record('http.generation', first_token, first_token + timings['generation_time'],
+                                           parse_time=timings.get('parse_time'))
+                    return response
 
-                # Асинхронная отправка запроса
                 loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self.api_client.send_message(
-                        user_message,
-                        self.model_dropdown.value
-                    )
-                )
+                response = await loop.run_in_executor(None, request)
 
                 # Удаление индикатора загрузки
-                self.chat_history.controls.remove(loading)
+                self.chat_history.hide_loading()
 
                 # Обработка ответа
                 if "error" in response:
                     response_text = f"Ошибка: {response['error']}"
                     tokens_used = 0
-                    self.logger.error(f"Ошибка API: {response['error']}")
+                    self.logger.error("Ошибка API: %s", response['error'], model=model_id, request_id=request_id)
+                    self.metrics.inc('chat_requests', model=model_id, status='error')
                 else:
                     response_text = response["choices"][0]["message"]["content"]
                     tokens_used = response.get("usage", {}).get("total_tokens", 0)
+                    self.metrics.inc('chat_requests', model=model_id, status='ok')
+                    self.model_dropdown.record_use(model_id)  # Использованные модели выше в поиске
+                    if 'ttft' in timings:
+                        self.metrics.observe('chat_time_to_first_token_seconds', timings['ttft'], model=model_id)
 
                 # Сохранение в кэш
-                self.cache.save_message(
-                    model=self.model_dropdown.value,
-                    user_message=user_message,
-                    ai_response=response_text,
-                    tokens_used=tokens_used
-                )
+                db_started = time.perf_counter()
+                with self.tracer.span('ChatCache.save_message'):
+                    message_id = self.cache.save_message(
+                        model=model_id,
+                        user_message=user_message,
+                        ai_response=response_text,
+                        tokens_used=tokens_used,
+                        conversation_id=conversation_id
+                    )
+                timings['db_write_time'] = time.perf_counter() - db_started
 
-                # Добавление ответа в чат
-                self.chat_history.controls.append(
-                    MessageBubble(message=response_text, is_user=False)
-                )
+                # Добавление ответа в чат, только если открыт диалог, в котором был задан вопрос;
+                # сообщение пользователя получает ID сохраненной записи,
+                # чтобы поиск похожих диалогов не находил это же сообщение
+                if self.current_conversation_id == conversation_id:
+                    if self.chat_history.set_message_id(user_row, message_id):
+                        self.chat_history.append_message(response_text, is_user=False, message_id=message_id)
+                    else:
+                        # Диалог открывался заново во время запроса - лента загружается из базы
+                        self.load_chat_history()
 
                 # Обновление аналитики
                 response_time = time.time() - start_time
-                self.analytics.track_message(
-                    model=self.model_dropdown.value,
-                    message_length=len(user_message),
-                    response_time=response_time,
-                    tokens_used=tokens_used
-                )
+                self.metrics.observe('chat_request_duration_seconds', response_time, model=model_id)
+                with self.tracer.span('Analytics.track_message'):
+                    self.analytics.track_message(
+                        model=model_id,
+                        message_length=len(user_message),
+                        response_time=response_time,
+                        tokens_used=tokens_used,
+                        timings=timings
+                    )
 
-                # Логирование метрик
-                self.monitor.log_metrics(self.logger)
-                page.update()
+                # Структурированная запись о запросе и логирование метрик
+                self.logger.info(
+                    "Запрос обработан",
+                    model=model_id,
+                    request_id=request_id,
+                    latency=round(response_time, 3),
+                    ttft=timings.get('ttft'),
+                    tokens=tokens_used
+                )
+                with self.tracer.span('monitor.log_metrics'):
+                    self.monitor.log_metrics(self.logger)
+                with self.tracer.span('ui.refresh_sidebar'):
+                    refresh_sidebar()              # Диалог поднимается вверх списка
+                self.updates.mark(self.chat_history, self.sidebar)
+                with self.tracer.span('ui.update'):
+                    self.updates.flush()
+                self.chat_history.scroll_to_end()  # Прокрутка к ответу, если лента была в конце
 
             except Exception as e:
-                self.logger.error(f"Ошибка отправки сообщения: {e}")
+                self.logger.error("Ошибка отправки сообщения: %s", e, request_id=request_id)
                 self.message_input.border_color = ft.Colors.RED_500
 
                 # Показ уведомления об ошибке
@@ -232,7 +497,24 @@ class ChatApp:
                 )
                 page.overlay.append(snack)
                 snack.open = True
-                page.update()
+                self.updates.mark()
+                self.updates.flush()
+
+            finally:
+                # Участок всего обработчика включает все вложенные участки выше
+                self.tracer.record('send_message_click', trace_started, time.perf_counter())
+                # Количество и объем обновлений страницы за обработку сообщения
+                updates_after = self.updates.stats()
+                self.metrics.observe(
+                    'chat_ui_updates_per_message',
+                    (updates_after['updates_sent'] - updates_before['updates_sent'])
+                    or (updates_after['flushes'] - updates_before['flushes'])
+                )
+                if updates_after['bytes_sent']:
+                    self.metrics.observe(
+                        'chat_ui_update_bytes_per_message',
+                        updates_after['bytes_sent'] - updates_before['bytes_sent']
+                    )
 
         def show_error_snack(page, message: str):
             """Показ уведомления об ошибке"""
@@ -251,17 +533,74 @@ class ChatApp:
         async def show_analytics(e):
             """Показ статистики использования"""
             stats = self.analytics.get_statistics()    # Получение статистики
+            dedup = self.cache.get_dedup_report()      # Экономия места за счет дедупликации
+            quantiles = self.analytics.get_quantiles()  # Перцентили по моделям
+            phases = self.analytics.get_phase_timings()  # Средние фазы запроса по моделям
+
+            # Строки перцентилей времени ответа и токенов для каждой модели
+            quantile_rows = []
+            for model_id, metrics in sorted(quantiles.items()):
+                response_time = metrics.get('response_time', {})
+                tokens = metrics.get('tokens', {})
+                if not response_time:
+                    continue
+                quantile_rows.append(ft.Text(
+                    f"{model_id}: ответ p50/p90/p99 "
+                    f"{response_time[50]:.2f}/{response_time[90]:.2f}/{response_time[99]:.2f} с, "
+                    f"токены {tokens[50]:.0f}/{tokens[90]:.0f}/{tokens[99]:.0f}",
+                    size=12
+                ))
+
+            # Строки средних фаз запроса: куда уходит время ответа
+            for model_id, model_phases in sorted(phases.items()):
+                parts = [
+                    f"{label} {model_phases[phase]:.2f} с"
+                    for phase, label in (
+                        ('queue_time', 'очередь'),
+                        ('connect_time', 'соединение'),
+                        ('ttft', 'первый токен'),
+                        ('generation_time', 'генерация'),
+                        ('parse_time', 'разбор'),
+                        ('db_write_time', 'запись в БД'),
+                    )
+                    if phase in model_phases
+                ]
+                if 'tokens_per_second' in model_phases:
+                    parts.append(f"{model_phases['tokens_per_second']:.1f} ток/с")
+                quantile_rows.append(ft.Text(f"{model_id}: " + ", ".join(parts), size=12))
 
-            # Создание диалога статистики
+            # Прореженные временные ряды для графиков (строятся вне потока интерфейса)
+            loop = asyncio.get_event_loop()
+            timeseries = await loop.run_in_executor(None, lambda: {
+                "Среднее время ответа, с": self.analytics.get_timeseries('response_time'),
+                "Токены за час": self.analytics.get_timeseries('tokens'),
+                "Сообщения за час": self.analytics.get_timeseries('messages'),
+            })
+
+            # Создание диалога статистики: сводка и графики на отдельных вкладках
             dialog = ft.AlertDialog(
                 title=ft.Text("Аналитика"),
-                content=ft.Column([
-                    ft.Text(f"Всего сообщений: {stats['total_messages']}"),
-                    ft.Text(f"Всего токенов: {stats['total_tokens']}"),
-                    ft.Text(f"Среднее токенов/сообщение: {stats['tokens_per_message']:.2f}"),
-                    ft.Text(f"Сообщений в минуту: {stats['messages_per_minute']:.2f}")
-                ]),
+                content=ft.Tabs(
+                    tabs=[
+                        ft.Tab(
+                            text="Сводка",
+                            content=ft.Column([
+                                ft.Text(f"Всего сообщений: {stats['total_messages']}"),
+                                ft.Text(f"Всего токенов: {stats['total_tokens']}"),
+                                ft.Text(f"Среднее токенов/сообщение: {stats['tokens_per_message']:.2f}"),
+                                ft.Text(f"Сообщений в минуту: {stats['messages_per_minute']:.2f}"),
+                                ft.Text(f"Сэкономлено дедупликацией: {dedup['saved_bytes'] / 1024:.1f} КБ"),
+                                *quantile_rows,
+                            ], scroll=ft.ScrollMode.AUTO),
+                        ),
+                        ft.Tab(text="Графики", content=AnalyticsDashboard(timeseries)),
+                    ],
+                    width=600,
+                    height=500,
+                ),
                 actions=[
+                    # Экспорт трассы доступен только при включенной трассировке
+                    *([ft.TextButton("Экспорт трассы", on_click=export_trace)] if self.tracer.enabled else []),
                     ft.TextButton("Закрыть", on_click=lambda e: close_dialog(dialog)),
                 ],
             )
@@ -270,17 +609,80 @@ class ChatApp:
             dialog.open = True                    # Открытие диалога
             page.update()                         # Обновление страницы
 
+        async def export_trace(e):
+            """
+            Сохранение записанной трассы в формате Chrome Trace Event.
+            """
+            try:
+                filepath = os.path.join(
+                    self.exports_dir,
+                    f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                )
+                count = self.tracer.export_chrome_trace(filepath)
+                self.logger.info("Трасса сохранена: %s (%s участков)", filepath, count)
+                snack = ft.SnackBar(
+                    content=ft.Text(f"Трасса сохранена: {filepath} (откройте в chrome://tracing)"),
+                    duration=5000,
+                )
+                page.overlay.append(snack)
+                snack.open = True
+                page.update()
+            except Exception as e:
+                self.logger.error("Ошибка экспорта трассы: %s", e)
+                show_error_snack(page, f"Ошибка экспорта трассы: {str(e)}")
+
+        def start_profiling(seconds, mode):
+            """
+            Запуск записи профиля с уведомлением о начале и результате.
+            """
+            def on_complete(result):
+                if isinstance(result, Exception):
+                    self.logger.error("Ошибка профилирования: %s", result)
+                    show_error_snack(page, f"Ошибка профилирования: {str(result)}")
+                    return
+                self.logger.info("Профиль сохранен: %s", ', '.join(result))
+                snack = ft.SnackBar(content=ft.Text(f"Профиль сохранен: {result[0]}"), duration=5000)
+                page.overlay.append(snack)
+                snack.open = True
+                page.update()
+
+            try:
+                base_path = self.profiler.start(seconds, mode, on_complete=on_complete)
+            except ValueError as e:
+                self.logger.error("Ошибка профилирования: %s", e)
+                return
+            if base_path is None:
+                return                            # Запись уже идет
+            self.logger.info("Профилирование (%s, %s с): %s", mode, seconds, base_path)
+            snack = ft.SnackBar(content=ft.Text(f"Профилирование {seconds} с..."), duration=3000)
+            page.overlay.append(snack)
+            snack.open = True
+            page.update()
+
+        def on_keyboard(e: ft.KeyboardEvent):
+            """
+            Скрытые сочетания клавиш профилирования:
+            Ctrl+Shift+P - выборочный режим, Ctrl+Shift+D - детерминированный.
+            """
+            if e.ctrl and e.shift and e.key in ("P", "D"):
+                start_profiling(
+                    float(os.getenv("PROFILE_SECONDS", "10")),
+                    'sampling' if e.key == "P" else 'deterministic'
+                )
+
+        page.on_keyboard_event = on_keyboard
+
         async def clear_history(e):
             """
             Очистка истории чата.
             """
             try:
-                self.cache.clear_history()          # Очистка кэша
+                self.cache.clear_history(archive=self.archiver)  # Очистка кэша и архива
                 self.analytics.clear_data()         # Очистка аналитики
-                self.chat_history.controls.clear()  # Очистка истории чата
+                self.chat_history.clear()           # Очистка истории чата
                 
             except Exception as e:
-                self.logger.error(f"Ошибка очистки истории: {e}")
+                self.logger.error("Ошибка очистки истории: %s", e)
                 show_error_snack(page, f"Ошибка очистки истории: {str(e)}")
 
         async def confirm_clear_history(e):
@@ -311,36 +713,131 @@ class ChatApp:
 
         async def save_dialog(e):
             """
-            Сохранение истории диалога в JSON файл.
+            Выбор параметров экспорта истории диалога.
             """
+            format_dropdown = ft.Dropdown(
+                label="Формат",
+                value="json",
+                options=[
+                    ft.dropdown.Option(key="json", text="JSON"),
+                    ft.dropdown.Option(key="ndjson", text="NDJSON"),
+                    ft.dropdown.Option(key="ndjson.gz", text="NDJSON (gzip)"),
+                ],
+            )
+            model_dropdown = ft.Dropdown(
+                label="Модель",
+                value="",
+                options=[ft.dropdown.Option(key="", text="Все модели")] + [
+                    ft.dropdown.Option(key=model['id'], text=model['name'])
+                    for model in self.api_client.available_models
+                ],
+            )
+            current_only = ft.Checkbox(label="Только текущий диалог", value=True)
+            include_archive = ft.Checkbox(
+                label="Включая архив",
+                value=True,
+                visible=self.archiver.get_summary()['messages'] > 0  # Только при наличии архива
+            )
+            start_field = ft.TextField(label="С даты (ГГГГ-ММ-ДД)")
+            end_field = ft.TextField(label="По дату (ГГГГ-ММ-ДД)")
+
+            async def export_confirmed(e):
+                try:
+                    # Разбор границ периода (дата окончания включается целиком)
+                    start = datetime.strptime(start_field.value, '%Y-%m-%d') if start_field.value else None
+                    end = (datetime.strptime(end_field.value, '%Y-%m-%d') + timedelta(days=1)
+                           if end_field.value else None)
+                except ValueError:
+                    show_error_snack(page, "Некорректный формат даты, ожидается ГГГГ-ММ-ДД")
+                    return
+                close_dialog(dialog)
+                await run_export(
+                    fmt=format_dropdown.value,
+                    start=start,
+                    end=end,
+                    model=model_dropdown.value or None,
+                    conversation_id=self.current_conversation_id if current_only.value else None,
+                    include_archive=include_archive.visible and include_archive.value
+                )
+
+            dialog = ft.AlertDialog(
+                modal=True,
+                title=ft.Text("Экспорт истории"),
+                content=ft.Column(
+                    [format_dropdown, model_dropdown, current_only, include_archive, start_field, end_field],
+                    tight=True
+                ),
+                actions=[
+                    ft.TextButton("Отмена", on_click=lambda e: close_dialog(dialog)),
+                    ft.TextButton("Экспорт", on_click=export_confirmed),
+                ],
+                actions_alignment=ft.MainAxisAlignment.END,
+            )
+            page.overlay.append(dialog)
+            dialog.open = True
+            page.update()
+
+        async def run_export(fmt, start, end, model, conversation_id, include_archive=False):
+            """
+            Потоковый экспорт истории в рабочем потоке с индикатором прогресса.
+            """
+            progress_bar = ft.ProgressBar(width=400, value=None)
+            progress_text = ft.Text("Подготовка...")
+            cancel_event = threading.Event()  # Отмена именно этого экспорта
+
+            def on_progress(exported, total):
+                # Вызывается из рабочего потока экспорта: обновление отправляет
+                # планировщик в цикле событий страницы
+                progress_bar.value = min(exported / total, 1) if total else 1
+                progress_text.value = f"Экспортировано {exported} из {total}"
+                self.updates.mark(progress_bar, progress_text)
+
+            progress_dialog = ft.AlertDialog(
+                modal=True,
+                title=ft.Text("Экспорт истории"),
+                content=ft.Column([progress_bar, progress_text], tight=True),
+                actions=[
+                    ft.TextButton("Отменить", on_click=lambda e: cancel_event.set()),
+                ],
+            )
+            page.overlay.append(progress_dialog)
+            progress_dialog.open = True
+            page.update()
+
             try:
-                # Получение истории из кэша
-                history = self.cache.get_chat_history()
-
-                # Форматирование данных для сохранения
-                dialog_data = []
-                for msg in history:
-                    dialog_data.append({
-                        "timestamp": msg[4],
-                        "model": msg[1],
-                        "user_message": msg[2],
-                        "ai_response": msg[3],
-                        "tokens_used": msg[5]
-                    })
-
-                # Создание имени файла
-                filename = f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                filepath = os.path.join(self.exports_dir, filename)
-
-                # Сохранение в JSON
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(dialog_data, f, ensure_ascii=False, indent=2, default=str)
+                # Создание имени файла (расширение добавляется по формату)
+                filename = f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+                # Экспорт выполняется вне цикла событий, интерфейс остается отзывчивым
+                loop = asyncio.get_event_loop()
+                result = await loop.run_in_executor(
+                    None,
+                    lambda: self.exporter.export(
+                        filename,
+                        fmt=fmt,
+                        start=start,
+                        end=end,
+                        model=model,
+                        conversation_id=conversation_id,
+                        include_archive=include_archive,
+                        progress_callback=on_progress,
+                        cancel_event=cancel_event
+                    )
+                )
+                close_dialog(progress_dialog)
+
+                if result['status'] == 'cancelled':
+                    show_error_snack(page, "Экспорт отменен")
+                    return
+
+                filepath = result['filepath']
 
                 # Создание диалога успешного сохранения
                 dialog = ft.AlertDialog(
                     modal=True,
                     title=ft.Text("Диалог сохранен"),
                     content=ft.Column([
+                        ft.Text(f"Сообщений: {result['exported']}"),
                         ft.Text("Путь сохранения:"),
                         ft.Text(filepath, selectable=True, weight=ft.FontWeight.BOLD),
                     ]),
@@ -357,9 +854,66 @@ class ChatApp:
                 page.update()
 
             except Exception as e:
-                self.logger.error(f"Ошибка сохранения: {e}")
+                close_dialog(progress_dialog)
+                self.logger.error("Ошибка сохранения: %s", e)
                 show_error_snack(page, f"Ошибка сохранения: {str(e)}")
 
+        async def import_history(e: ft.FilePickerResultEvent):
+            """
+            Импорт истории из выбранного файла экспорта в рабочем потоке.
+            """
+            if not e.files:
+                return
+
+            filepath = e.files[0].path
+            progress_text = ft.Text("Чтение файла...")
+
+            def on_progress(rows_read):
+                # Вызывается из рабочего потока импорта: обновление отправляет
+                # планировщик в цикле событий страницы
+                progress_text.value = f"Прочитано записей: {rows_read}"
+                self.updates.mark(progress_text)
+
+            progress_dialog = ft.AlertDialog(
+                modal=True,
+                title=ft.Text("Импорт истории"),
+                content=ft.Column([ft.ProgressBar(width=400), progress_text], tight=True),
+            )
+            page.overlay.append(progress_dialog)
+            progress_dialog.open = True
+            page.update()
+
+            try:
+                loop = asyncio.get_event_loop()
+                stats = await loop.run_in_executor(
+                    None,
+                    lambda: self.importer.import_file(filepath, progress_callback=on_progress)
+                )
+                close_dialog(progress_dialog)
+                self.logger.info(
+                    "Импорт %s: добавлено %d, дубликатов %d, %.0f строк/с",
+                    filepath, stats['rows_imported'], stats['duplicates'], stats['rows_per_second']
+                )
+                refresh_sidebar()
+
+                snack = ft.SnackBar(
+                    content=ft.Text(
+                        f"Импортировано сообщений: {stats['rows_imported']}, "
+                        f"пропущено дубликатов: {stats['duplicates']} "
+                        f"({stats['rows_per_second']:.0f} строк/с)"
+                    ),
+                    bgcolor=ft.Colors.GREY_900,
+                    duration=5000,
+                )
+                page.overlay.append(snack)
+                snack.open = True
+                page.update()
+
+            except Exception as e:
+                close_dialog(progress_dialog)
+                self.logger.error("Ошибка импорта: %s", e)
+                show_error_snack(page, f"Ошибка импорта: {str(e)}")
+
         def close_dialog(dialog):
             """Закрытие диалогового окна"""
             dialog.open = False                   # Закрытие диалога
@@ -368,9 +922,117 @@ class ChatApp:
             if dialog in page.overlay:            # Удаление из overlay
                 page.overlay.remove(dialog)
 
+        def refresh_sidebar():
+            """Обновление списка диалогов в боковой панели"""
+            self.sidebar.set_conversations(
+                self.cache.list_conversations(),
+                self.current_conversation_id
+            )
+
+        def select_conversation(conversation_id):
+            """
+            Переключение на другой диалог.
+            Загружается только последняя страница выбранного диалога.
+            """
+            self.current_conversation_id = conversation_id
+            self.chat_history.clear()             # Очистка отображаемых сообщений
+            self.load_chat_history()              # Загрузка сообщений выбранного диалога
+            refresh_sidebar()
+            page.update()
+
+        def create_conversation():
+            """Создание нового диалога и переключение на него"""
+            try:
+                select_conversation(self.cache.create_conversation())
+            except Exception as e:
+                self.logger.error("Ошибка создания диалога: %s", e)
+                show_error_snack(page, f"Ошибка создания диалога: {str(e)}")
+
+        def rename_conversation(conversation_id, title):
+            """Переименование диалога через диалоговое окно"""
+            title_field = ft.TextField(value=title, autofocus=True)
+
+            def rename_confirmed(e):
+                new_title = title_field.value.strip()
+                if new_title:
+                    self.cache.rename_conversation(conversation_id, new_title)
+                    refresh_sidebar()
+                close_dialog(dialog)
+
+            dialog = ft.AlertDialog(
+                modal=True,
+                title=ft.Text("Переименование диалога"),
+                content=title_field,
+                actions=[
+                    ft.TextButton("Отмена", on_click=lambda e: close_dialog(dialog)),
+                    ft.TextButton("Сохранить", on_click=rename_confirmed),
+                ],
+                actions_alignment=ft.MainAxisAlignment.END,
+            )
+            page.overlay.append(dialog)
+            dialog.open = True
+            page.update()
+
+        def archive_conversation(conversation_id):
+            """Перемещение диалога в архив"""
+            try:
+                self.cache.archive_conversation(conversation_id)
+                if conversation_id == self.current_conversation_id:
+                    select_conversation(self.cache.get_default_conversation())
+                else:
+                    refresh_sidebar()
+                    page.update()
+            except Exception as e:
+                self.logger.error("Ошибка архивации диалога: %s", e)
+                show_error_snack(page, f"Ошибка архивации диалога: {str(e)}")
+
+        def delete_conversation(conversation_id):
+            """Удаление диалога с подтверждением"""
+            def delete_confirmed(e):
+                try:
+                    self.cache.delete_conversation(conversation_id, archive=self.archiver)
+                    close_dialog(dialog)
+                    if conversation_id == self.current_conversation_id:
+                        select_conversation(self.cache.get_default_conversation())
+                    else:
+                        refresh_sidebar()
+                        page.update()
+                except Exception as e:
+                    self.logger.error("Ошибка удаления диалога: %s", e)
+                    show_error_snack(page, f"Ошибка удаления диалога: {str(e)}")
+
+            dialog = ft.AlertDialog(
+                modal=True,
+                title=ft.Text("Удаление диалога"),
+                content=ft.Text("Удалить диалог и все его сообщения?"),
+                actions=[
+                    ft.TextButton("Отмена", on_click=lambda e: close_dialog(dialog)),
+                    ft.TextButton("Удалить", on_click=delete_confirmed),
+                ],
+                actions_alignment=ft.MainAxisAlignment.END,
+            )
+            page.overlay.append(dialog)
+            dialog.open = True
+            page.update()
+
         # Создание компонентов интерфейса
         self.message_input = ft.TextField(**AppStyles.MESSAGE_INPUT) # Поле ввода
-        self.chat_history = ft.ListView(**AppStyles.CHAT_HISTORY)    # История чата
+        self.chat_history = VirtualChatView(                         # История чата (виртуализированная)
+            on_find_similar=self.show_similar,
+            on_load_older=self.load_older_history,
+            renderer=self.markdown,
+            **AppStyles.CHAT_HISTORY
+        )
+
+        # Создание боковой панели со списком диалогов
+        self.sidebar = ConversationSidebar(
+            on_select=select_conversation,
+            on_create=create_conversation,
+            on_rename=rename_conversation,
+            on_archive=archive_conversation,
+            on_delete=delete_conversation
+        )
+        refresh_sidebar()
 
         # Загрузка существующей истории
         self.load_chat_history()
@@ -381,6 +1043,17 @@ class ChatApp:
             **AppStyles.SAVE_BUTTON         # Применение стилей
         )
 
+        # Диалог выбора файла для импорта истории
+        import_picker = ft.FilePicker(on_result=import_history)
+        page.overlay.append(import_picker)
+
+        import_button = ft.ElevatedButton(
+            on_click=lambda e: import_picker.pick_files(
+                allowed_extensions=["json", "jsonl", "gz"]
+            ),
+            **AppStyles.IMPORT_BUTTON       # Применение стилей
+        )
+
         clear_button = ft.ElevatedButton(
             on_click=confirm_clear_history, # Привязка функции очистки
             **AppStyles.CLEAR_BUTTON        # Применение стилей
@@ -402,6 +1075,7 @@ class ChatApp:
         control_buttons = ft.Row(  
             controls=[                      # Размещение кнопок в ряд
                 save_button,
+                import_button,
                 analytics_button,
                 clear_button
             ],
@@ -452,11 +1126,45 @@ class ChatApp:
             **AppStyles.MAIN_COLUMN               # Применение стилей к главной колонке
         )
 
-        # Добавление основной колонки на страницу
-        page.add(self.main_column)
+        # Добавление боковой панели и основной колонки на страницу
+        page.add(
+            ft.Row(
+                controls=[self.sidebar, self.main_column],
+                expand=True,
+                vertical_alignment=ft.CrossAxisAlignment.START
+            )
+        )
         
-        # Запуск монитора
-        self.monitor.get_metrics()
+        # Запуск фонового сбора метрик производительности
+        self.monitor.start(interval=float(os.getenv("MONITOR_INTERVAL", "5")))
+
+        # Измерение задержки цикла событий и обнаружение медленных обработчиков
+        page.run_task(self.loop_monitor.probe)
+
+        # Фоновое сжатие крупных сообщений старого формата
+        threading.Thread(target=self.compress_old_messages, daemon=True).start()
+
+        # Периодический перенос старой истории в архив (если задана политика хранения)
+        self.archiver.start(logger=AppLogger('archive'))
+
+        # Локальный эндпоинт метрик для сбора внешней системой мониторинга
+        # (там же - запуск профилирования запросом POST /profile?seconds=N&mode=...
+        # с заголовком "Authorization: Bearer $PROFILE_TOKEN", если токен задан)
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            self.metrics.start_collecting(logger=AppLogger('metrics'))
+            MetricsServer(self.metrics, int(metrics_port), profiler=self.profiler,
+                          profile_token=os.getenv("PROFILE_TOKEN")).start()
+            self.logger.info("Метрики доступны по адресу http://127.0.0.1:%s/metrics", metrics_port)
+
+        # Диагностика роста памяти (снимки tracemalloc замедляют выделения, поэтому по желанию)
+        if os.getenv("MEMORY_DIAGNOSTICS") == "1":
+            self.setup_memory_diagnostics(page)
+
+        # Профилирование с момента запуска (PROFILE_MODE=sampling|deterministic, PROFILE_SECONDS)
+        profile_mode = os.getenv("PROFILE_MODE")
+        if profile_mode:
+            start_profiling(float(os.getenv("PROFILE_SECONDS", "10")), profile_mode)
         
         # Логирование запуска
         self.logger.info("Приложение запущено")
@@ -2,11 +2,18 @@
 UI package initialization.
 Contains UI components and styles for the application.
 """
-from .components import MessageBubble, ModelSelector
+from .components import MessageBubble, VirtualChatView, ModelSelector, ConversationSidebar, AnalyticsDashboard
+from .markdown import MarkdownRenderer
 from .styles import AppStyles
+from .updates import UpdateScheduler
 
 __all__ = [
     'MessageBubble',
+    'VirtualChatView',
     'ModelSelector',
-    'AppStyles'
+    'ConversationSidebar',
+    'AnalyticsDashboard',
+    'MarkdownRenderer',
+    'AppStyles',
+    'UpdateScheduler'
 ]
\ No newline at end of file
@@ -9,7 +9,9 @@ import asyncio                     # Библиотека для асинхро
 import random
 import string
 import aiohttp
+from datetime import datetime      # Библиотека для подписей оси времени на графиках
 from utils.cache import CacheManager
+from utils.model_search import ModelSearchIndex  # Поисковый индекс списка моделей
 
 class MessageBubble(ft.Container):
     """
@@ -17,12 +19,20 @@ class MessageBubble(ft.Container):
     
     Наследуется от ft.Container для создания стилизованного контейнера сообщения.
     Отображает сообщения пользователя и AI с разными стилями и позиционированием.
+    Пузырек можно перепривязать к другому сообщению (см. set_message),
+    что позволяет VirtualChatView повторно использовать созданные элементы.
+    Ответы AI отображаются в формате Markdown, если передан renderer.
     
     Args:
         message (str): Текст сообщения для отображения
         is_user (bool): Флаг, указывающий, является ли это сообщением пользователя
+        message_id (int): ID сообщения в базе данных (если известен)
+        on_find_similar: Обработчик действия "Найти похожие диалоги",
+                         вызывается с аргументами (message, message_id)
+        renderer (MarkdownRenderer): Отображение Markdown для ответов AI (необязательно)
     """
-    def __init__(self, message: str, is_user: bool):
+    def __init__(self, message: str, is_user: bool, message_id: int = None, on_find_similar=None,
+                 renderer=None):
         # Инициализация родительского класса Container
         super().__init__()
         
@@ -32,6 +42,62 @@ class MessageBubble(ft.Container):
         # Настройка скругления углов пузырька
         self.border_radius = 10
         
+        # Текст сообщения с настройками отображения
+        self.text = ft.Text(
+            color=ft.Colors.WHITE,            # Белый цвет текста
+            size=16,                         # Размер шрифта
+            selectable=True,                 # Возможность выделения текста
+            weight=ft.FontWeight.W_400       # Нормальная толщина шрифта
+        )
+        
+        # Тело сообщения: простой текст или элементы Markdown
+        self.renderer = renderer
+        self.body = ft.Column(controls=[self.text], tight=True)
+        self.message = None
+        self.is_user = None
+        
+        # Создание содержимого пузырька
+        self.content = ft.Column(
+            controls=[self.body],
+            tight=True  # Плотное расположение элементов в колонке
+        )
+        
+        # Кнопка поиска похожих диалогов (только при наличии обработчика);
+        # текст и ID берутся из атрибутов, так как пузырек может быть перепривязан
+        if on_find_similar:
+            self.content.controls.append(
+                ft.IconButton(
+                    on_click=lambda e: on_find_similar(self.message, self.message_id),
+                    **AppStyles.FIND_SIMILAR_BUTTON
+                )
+            )
+        
+        self.set_message(message, is_user, message_id)
+
+    def set_message(self, message: str, is_user: bool, message_id: int = None):
+        """
+        Привязка пузырька к сообщению: текст, стиль и положение отправителя.
+        
+        Args:
+            message (str): Текст сообщения
+            is_user (bool): Сообщение пользователя (True) или AI (False)
+            message_id (int): ID сообщения в базе данных (если известен)
+        """
+        self.message_id = message_id
+        if message == self.message and is_user == self.is_user:
+            return  # То же сообщение - элементы уже построены
+        self.message = message
+        self.is_user = is_user
+        
+        # Ответы AI - в формате Markdown (разбор кэшируется в renderer)
+        if self.renderer is not None:
+            self.renderer.discard(self.body.controls)
+        if is_user or self.renderer is None:
+            self.text.value = message
+            self.body.controls = [self.text]
+        else:
+            self.body.controls = self.renderer.build(message)
+        
         # Установка цвета фона в зависимости от отправителя:
         # - Синий для сообщений пользователя
         # - Серый для сообщений AI
@@ -52,21 +118,249 @@ class MessageBubble(ft.Container):
             top=5,                           # Отступ сверху
             bottom=5                         # Отступ снизу
         )
+
+
+class VirtualChatView(ft.ListView):
+    """
+    Виртуализированная лента сообщений чата.
+    
+    Все сообщения хранятся как легкие кортежи (текст, от пользователя, ID),
+    а элементы MessageBubble существуют только для окна из window_size сообщений
+    рядом с областью просмотра. При прокрутке к краю окно сдвигается на step
+    сообщений: пузырьки сообщений, оставшихся в окне, не изменяются, а пузырьки,
+    ушедшие из окна, возвращаются в пул и перепривязываются к вошедшим в окно
+    сообщениям. Поэтому размер дерева элементов и стоимость page.update()
+    не зависят от длины диалога.
+    
+    Когда окно доходит до самого старого загруженного сообщения, вызывается
+    on_load_older для загрузки предыдущей страницы истории.
+    """
+    
+    def __init__(self, on_find_similar=None, on_load_older=None, renderer=None,
+                 window_size: int = 40, step: int = 20, **kwargs):
+        """
+        Инициализация ленты.
         
-        # Создание содержимого пузырька
-        self.content = ft.Column(
-            controls=[
-                # Текст сообщения с настройками отображения
-                ft.Text(
-                    value=message,                    # Текст сообщения
-                    color=ft.Colors.WHITE,            # Белый цвет текста
-                    size=16,                         # Размер шрифта
-                    selectable=True,                 # Возможность выделения текста
-                    weight=ft.FontWeight.W_400       # Нормальная толщина шрифта
-                )
-            ],
-            tight=True  # Плотное расположение элементов в колонке
-        )
+        Args:
+            on_find_similar: Обработчик "Найти похожие диалоги" для пузырьков
+            on_load_older: Функция без аргументов, возвращающая список более старых
+                           сообщений [(текст, от пользователя, ID), ...] в хронологическом
+                           порядке (пустой список - истории больше нет)
+            renderer (MarkdownRenderer): Отображение Markdown для ответов AI в пузырьках
+            window_size (int): Максимальное количество пузырьков в дереве элементов
+            step (int): На сколько сообщений сдвигается окно при прокрутке к краю
+            **kwargs: Параметры ft.ListView (auto_scroll не используется:
+                      прокрутка к новым сообщениям выполняется самой лентой)
+        """
+        kwargs.pop('auto_scroll', None)
+        super().__init__(**kwargs)
+        self.on_find_similar = on_find_similar
+        self.on_load_older = on_load_older
+        self.renderer = renderer
+        self.window_size = window_size
+        self.step = step
+        self.rows = []          # Все сообщения ленты: (текст, от пользователя, ID)
+        self.start = 0          # Индекс первого сообщения окна
+        self.pool = []          # Освобожденные пузырьки для повторного использования
+        self.loading = None     # Индикатор ожидания ответа (после последнего сообщения)
+        self.at_bottom = True   # Показан ли конец ленты (для прокрутки к новым сообщениям)
+        self.history_exhausted = on_load_older is None
+        self.on_scroll = self.handle_scroll
+        self.on_scroll_interval = 100  # Не чаще одного события прокрутки за 100 мс
+    
+    @property
+    def end(self) -> int:
+        """
+        Индекс сообщения, следующего за последним сообщением окна.
+        """
+        return self.start + len(self._bubbles())
+    
+    def _bubbles(self) -> list:
+        """
+        Внутренняя функция получения пузырьков окна (без индикатора загрузки).
+        """
+        if self.loading is not None and self.controls and self.controls[-1] is self.loading:
+            return self.controls[:-1]
+        return self.controls
+    
+    def _acquire(self, index: int, bubble: MessageBubble = None) -> MessageBubble:
+        """
+        Внутренняя функция получения пузырька для сообщения: переданный пузырек
+        окна, пузырек из пула или новый.
+        """
+        message, is_user, message_id = self.rows[index]
+        if bubble is None and self.pool:
+            # Предпочтение пузырьку, который уже показывает это сообщение (возврат
+            # прокруткой, перезагрузка диалога): его элементы не строятся заново
+            position = -1
+            if message_id is not None:
+                for i in range(len(self.pool) - 1, -1, -1):
+                    if self.pool[i].message_id == message_id:
+                        position = i
+                        break
+            bubble = self.pool.pop(position)
+        if bubble is not None:
+            bubble.set_message(message, is_user, message_id)
+        else:
+            bubble = MessageBubble(
+                message, is_user, message_id,
+                on_find_similar=self.on_find_similar,
+                renderer=self.renderer
+            )
+        bubble.key = f"row-{index}"  # Ключ для прокрутки к сообщению (scroll_to)
+        return bubble
+    
+    def _release(self, bubbles):
+        """
+        Внутренняя функция возврата пузырьков в пул (размер пула не больше окна).
+        """
+        self.pool.extend(bubbles[:max(self.window_size - len(self.pool), 0)])
+    
+    def _render(self, start: int):
+        """
+        Внутренняя функция построения окна, начинающегося с сообщения start.
+        
+        Пузырьки сообщений, остающихся в окне, сохраняются (обновляется только ключ);
+        в пул возвращаются пузырьки ушедших сообщений, и только вошедшие сообщения
+        получают пузырьки из пула.
+        """
+        window = {self.start + offset: bubble for offset, bubble in enumerate(self._bubbles())}
+        self.start = max(min(start, len(self.rows) - self.window_size), 0)
+        end = min(self.start + self.window_size, len(self.rows))
+        self._release([bubble for index, bubble in window.items() if not self.start <= index < end])
+        self.controls = [self._acquire(i, window.get(i)) for i in range(self.start, end)]
+        if self.loading is not None:
+            self.controls.append(self.loading)
+    
+    def set_rows(self, rows: list):
+        """
+        Замена всех сообщений ленты (например, при выборе диалога); показывается конец ленты.
+        
+        Args:
+            rows (list): Сообщения [(текст, от пользователя, ID), ...] в хронологическом порядке
+        """
+        # Индексы прежних сообщений не относятся к новым: все пузырьки возвращаются в пул
+        self._release(self._bubbles())
+        self.controls = [self.loading] if self.loading is not None else []
+        self.rows = list(rows)
+        self.history_exhausted = self.on_load_older is None
+        self.at_bottom = True
+        self._render(len(self.rows) - self.window_size)
+    
+    def clear(self):
+        """
+        Удаление всех сообщений ленты.
+        """
+        self.loading = None
+        self.set_rows([])
+    
+    def append_message(self, message: str, is_user: bool, message_id: int = None):
+        """
+        Добавление нового сообщения в конец ленты.
+        
+        Если окно показывает конец ленты, сообщение сразу получает пузырек,
+        а самые старые пузырьки окна освобождаются; иначе сообщение только
+        запоминается и будет показано при прокрутке вниз.
+        
+        Returns:
+            tuple: Запись сообщения в ленте (для set_message_id)
+        """
+        showing_end = self.end == len(self.rows)
+        row = (message, is_user, message_id)
+        self.rows.append(row)
+        if not showing_end:
+            return row
+        bubbles = self._bubbles()
+        bubbles.append(self._acquire(len(self.rows) - 1))
+        excess = len(bubbles) - self.window_size
+        if excess > 0:
+            self._release(bubbles[:excess])
+            bubbles = bubbles[excess:]
+            self.start += excess
+        self.controls = bubbles + ([self.loading] if self.loading is not None else [])
+        return row
+    
+    def set_message_id(self, row: tuple, message_id: int) -> bool:
+        """
+        Привязка ID из базы данных к сообщению ленты (например, к сообщению
+        пользователя, добавленному до сохранения ответа).
+        
+        Args:
+            row (tuple): Запись сообщения (результат append_message)
+            message_id (int): ID сообщения в базе данных
+            
+        Returns:
+            bool: False, если записи уже нет в ленте (лента перезагружена)
+        """
+        # Запись ищется с конца: к началу ленты могли добавиться более старые сообщения
+        for index in range(len(self.rows) - 1, -1, -1):
+            if self.rows[index] is row:
+                break
+        else:
+            return False
+        message, is_user, _ = row
+        self.rows[index] = (message, is_user, message_id)
+        if self.start <= index < self.end:
+            self._bubbles()[index - self.start].message_id = message_id
+        return True
+    
+    def show_loading(self):
+        """
+        Показ индикатора ожидания ответа после последнего сообщения.
+        """
+        if self.loading is None:
+            self.loading = ft.ProgressRing()
+            self.controls.append(self.loading)
+    
+    def hide_loading(self):
+        """
+        Скрытие индикатора ожидания ответа.
+        """
+        if self.loading is not None:
+            if self.loading in self.controls:
+                self.controls.remove(self.loading)
+            self.loading = None
+    
+    def scroll_to_end(self):
+        """
+        Прокрутка к последнему сообщению, если пользователь находится в конце ленты.
+        Вызывается после page.update(), когда новые элементы уже на странице.
+        """
+        if self.at_bottom and self.page is not None:
+            self.scroll_to(offset=-1, duration=200)
+    
+    async def handle_scroll(self, e: ft.OnScrollEvent):
+        """
+        Сдвиг окна при прокрутке к его краю; положение просмотра сохраняется
+        прокруткой к сообщению, бывшему на краю окна до сдвига.
+        Обработчик асинхронный: он выполняется в цикле событий вместе
+        с обработчиком отправки сообщений, поэтому лента не изменяется параллельно.
+        """
+        if e.pixels is None or e.max_scroll_extent is None:
+            return
+        margin = e.viewport_dimension or 0
+        self.at_bottom = self.end == len(self.rows) and e.pixels >= e.max_scroll_extent - 50
+        
+        if e.pixels <= e.min_scroll_extent + margin:
+            # Прокрутка к началу окна: более старые сообщения
+            if self.start == 0 and not self.history_exhausted:
+                older = self.on_load_older()
+                if older:
+                    self.rows[:0] = older
+                    self.start += len(older)
+                else:
+                    self.history_exhausted = True
+            if self.start > 0:
+                anchor = self.start
+                self._render(self.start - self.step)
+                self.update()
+                self.scroll_to(key=f"row-{anchor}")
+        elif e.pixels >= e.max_scroll_extent - margin and self.end < len(self.rows):
+            # Прокрутка к концу окна: более новые сообщения
+            anchor = self.end - 1
+            self._render(self.start + self.step)
+            self.update()
+            self.scroll_to(key=f"row-{anchor}")
 
 
 class ModelSelector(ft.Dropdown):
@@ -75,12 +369,20 @@ class ModelSelector(ft.Dropdown):
     
     Наследуется от ft.Dropdown для создания кастомного выпадающего списка
     с дополнительным полем поиска для фильтрации моделей.
+    Поиск выполняется по заранее построенному индексу (ModelSearchIndex)
+    после паузы в наборе текста; в список попадают только лучшие совпадения
+    с учетом частоты и недавности использования моделей.
     
     Args:
         models (list): Список доступных моделей в формате:
                       [{"id": "model-id", "name": "Model Name"}, ...]
+        scheduler (UpdateScheduler): Планировщик обновлений страницы (необязательно)
+        usage (dict): Накопленное количество использований моделей {ID модели: количество}
+        limit (int): Максимальное количество моделей в списке
+        debounce (float): Пауза в наборе текста перед поиском в секундах
     """
-    def __init__(self, models: list):
+    def __init__(self, models: list, scheduler=None, usage: dict = None,
+                 limit: int = 50, debounce: float = 0.15):
         # Инициализация родительского класса Dropdown
         super().__init__()
         
@@ -92,19 +394,26 @@ class ModelSelector(ft.Dropdown):
         self.label = None                    # Убираем текстовую метку
         self.hint_text = "Выбор модели"      # Текст-подсказка
         
-        # Создание списка опций из предоставленных моделей
-        self.options = [
+        # Полный список опций создается один раз; при поиске выбираются готовые опции
+        self.all_options = [
             ft.dropdown.Option(
                 key=model['id'],             # ID модели как ключ
                 text=model['name']           # Название модели как отображаемый текст
             ) for model in models
         ]
+        self.scheduler = scheduler
+        self.limit = limit
+        self.debounce = debounce
+        self.pending_search = None           # Отложенный поиск (перезапускается при каждом вводе)
         
-        # Сохранение полного списка опций для фильтрации
-        self.all_options = self.options.copy()
+        # Поисковый индекс с учетом накопленного использования моделей
+        self.search_index = ModelSearchIndex(models)
+        for model_id, count in sorted((usage or {}).items(), key=lambda item: item[1]):
+            self.search_index.record_use(model_id, count)
         
         # Установка начального значения (первая модель из списка)
         self.value = models[0]['id'] if models else None
+        self.options = self.ranked_options("")
         
         # Создание поля поиска для фильтрации моделей
         self.search_field = ft.TextField(
@@ -113,29 +422,229 @@ class ModelSelector(ft.Dropdown):
             **AppStyles.MODEL_SEARCH_FIELD       # Применение стилей из конфигурации
         )
 
-    def filter_options(self, e):
+    def ranked_options(self, search_text: str) -> list:
+        """
+        Лучшие совпадения с запросом в виде опций списка.
+        Выбранная модель остается в списке, даже если не совпадает с запросом.
+        
+        Args:
+            search_text (str): Текст поиска
+        """
+        options = [self.all_options[i] for i in self.search_index.search(search_text, self.limit)]
+        selected = self.search_index.positions.get(self.value)
+        if selected is not None and self.all_options[selected] not in options:
+            options.append(self.all_options[selected])
+        return options
+
+    def record_use(self, model_id: str):
+        """
+        Учет использования модели: часто и недавно используемые модели
+        показываются выше.
+        
+        Args:
+            model_id (str): ID модели
+        """
+        self.search_index.record_use(model_id)
+
+    async def filter_options(self, e):
         """
         Фильтрация списка моделей на основе введенного текста поиска.
+        Поиск откладывается до паузы в наборе текста. Обработчик асинхронный:
+        отложенный поиск планируется в цикле событий страницы, поэтому
+        список изменяется в том же потоке, что и остальной интерфейс.
         
         Args:
             e: Событие изменения текста в поле поиска
         """
-        # Получение текста поиска в нижнем регистре
-        search_text = self.search_field.value.lower() if self.search_field.value else ""
+        if self.pending_search is not None:
+            self.pending_search.cancel()
+        self.pending_search = asyncio.get_running_loop().call_later(
+            self.debounce, self.apply_filter, self.search_field.value or "", e.page
+        )
+
+    def apply_filter(self, search_text: str, page):
+        """
+        Применение результатов поиска к списку моделей.
         
-        # Если поле поиска пустое - показываем все модели
-        if not search_text:
-            self.options = self.all_options
-        else:
-            # Фильтрация моделей по тексту поиска
-            # Ищем совпадения в названии или ID модели
-            self.options = [
-                opt for opt in self.all_options
-                if search_text in opt.text.lower() or search_text in opt.key.lower()
-            ]
+        Args:
+            search_text (str): Текст поиска
+            page (ft.Page): Страница для обновления интерфейса
+        """
+        self.pending_search = None
+        # Ввод изменился после запуска отложенного поиска - результат устарел
+        if search_text != (self.search_field.value or ""):
+            return
+        self.options = self.ranked_options(search_text)
         
         # Обновление интерфейса для отображения отфильтрованного списка
-        e.page.update()
+        # (через планировщик - не чаще одного обновления за кадр)
+        if self.scheduler is not None:
+            self.scheduler.mark(self)
+        else:
+            page.update()
+
+class ConversationSidebar(ft.Container):
+    """
+    Боковая панель со списком диалогов.
+    
+    Позволяет переключаться между диалогами, создавать новые,
+    переименовывать, архивировать и удалять существующие.
+    
+    Args:
+        on_select: Обработчик выбора диалога, вызывается с ID диалога
+        on_create: Обработчик создания нового диалога
+        on_rename: Обработчик переименования, вызывается с (ID, текущее название)
+        on_archive: Обработчик архивации, вызывается с ID диалога
+        on_delete: Обработчик удаления, вызывается с ID диалога
+    """
+    def __init__(self, on_select, on_create, on_rename, on_archive, on_delete):
+        # Инициализация родительского класса Container
+        super().__init__()
+        
+        # Применение стилей из конфигурации к компоненту
+        for key, value in AppStyles.SIDEBAR.items():
+            setattr(self, key, value)
+        
+        # Сохранение обработчиков действий
+        self.on_select = on_select
+        self.on_rename = on_rename
+        self.on_archive = on_archive
+        self.on_delete = on_delete
+        
+        # Список диалогов с прокруткой
+        self.conversations_list = ft.ListView(expand=True, spacing=5)
+        
+        # Содержимое панели: кнопка создания и список диалогов
+        self.content = ft.Column(
+            controls=[
+                ft.ElevatedButton(
+                    on_click=lambda e: on_create(),
+                    **AppStyles.NEW_CONVERSATION_BUTTON
+                ),
+                self.conversations_list
+            ],
+            expand=True
+        )
+
+    def set_conversations(self, conversations: list, current_id: int):
+        """
+        Обновление списка диалогов.
+        
+        Args:
+            conversations (list): Список кортежей (id, title, created_at, updated_at, archived)
+            current_id (int): ID выбранного диалога
+        """
+        self.conversations_list.controls = [
+            self._create_item(conversation_id, title, conversation_id == current_id)
+            for conversation_id, title, _, _, _ in conversations
+        ]
+
+    def _create_item(self, conversation_id: int, title: str, selected: bool):
+        """
+        Внутренняя функция создания элемента списка диалогов.
+        """
+        return ft.ListTile(
+            title=ft.Text(title, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS),
+            selected=selected,
+            dense=True,
+            on_click=lambda e: self.on_select(conversation_id),
+            trailing=ft.PopupMenuButton(
+                icon=ft.icons.MORE_VERT,
+                items=[
+                    ft.PopupMenuItem(
+                        text="Переименовать",
+                        on_click=lambda e: self.on_rename(conversation_id, title)
+                    ),
+                    ft.PopupMenuItem(
+                        text="В архив",
+                        on_click=lambda e: self.on_archive(conversation_id)
+                    ),
+                    ft.PopupMenuItem(
+                        text="Удалить",
+                        on_click=lambda e: self.on_delete(conversation_id)
+                    ),
+                ]
+            )
+        )
+
+class AnalyticsDashboard(ft.Column):
+    """
+    Панель графиков аналитики: время ответа, токены и количество сообщений
+    по времени для каждой модели.
+    
+    Получает уже прореженные ряды (см. Analytics.get_timeseries), поэтому
+    время отрисовки не зависит от объема истории.
+    
+    Args:
+        timeseries (dict): Заголовок графика -> {модель: (x, y)}, где x - время в секундах Unix
+    """
+    def __init__(self, timeseries: dict):
+        # Инициализация родительского класса Column
+        super().__init__(scroll=ft.ScrollMode.AUTO, spacing=10)
+        
+        # Единые цвета моделей для всех графиков
+        models = sorted({model for series in timeseries.values() for model in series})
+        colors = {
+            model: AppStyles.CHART_COLORS[i % len(AppStyles.CHART_COLORS)]
+            for i, model in enumerate(models)
+        }
+        
+        # Легенда: цвет линии и идентификатор модели
+        self.controls.append(ft.Row(
+            controls=[
+                ft.Row([
+                    ft.Container(width=12, height=12, bgcolor=colors[model], border_radius=2),
+                    ft.Text(model, size=12)
+                ], spacing=4)
+                for model in models
+            ],
+            wrap=True
+        ))
+        
+        for title, series in timeseries.items():
+            self.controls.append(ft.Text(title, weight=ft.FontWeight.BOLD))
+            self.controls.append(self._create_chart(series, colors))
+
+    @staticmethod
+    def _create_chart(series: dict, colors: dict):
+        """
+        Внутренняя функция создания линейного графика по рядам моделей.
+        """
+        all_x = [float(value) for x, _ in series.values() for value in x]
+        if not all_x:
+            return ft.Text("Нет данных", color=ft.Colors.GREY_500)
+        min_x, max_x = min(all_x), max(all_x)
+        
+        # Подписи оси времени: начало, середина и конец периода
+        labels = [
+            ft.ChartAxisLabel(
+                value=value,
+                label=ft.Text(datetime.fromtimestamp(value).strftime('%d.%m %H:%M'), size=10)
+            )
+            for value in sorted({min_x, (min_x + max_x) / 2, max_x})
+        ]
+        
+        return ft.LineChart(
+            data_series=[
+                ft.LineChartData(
+                    data_points=[
+                        ft.LineChartDataPoint(float(x_value), float(y_value))
+                        for x_value, y_value in zip(x, y)
+                    ],
+                    color=colors[model],
+                    stroke_width=2,
+                    curved=False,
+                )
+                for model, (x, y) in series.items()
+            ],
+            min_x=min_x,
+            max_x=max_x,
+            bottom_axis=ft.ChartAxis(labels=labels, labels_size=24),
+            left_axis=ft.ChartAxis(labels_size=40),
+            horizontal_grid_lines=ft.ChartGridLines(color=ft.Colors.GREY_800, width=1),
+            interactive=True,
+            **AppStyles.ANALYTICS_CHART
+        )
 
 class RegistrationComponent(ft.UserControl):
     def __init__(self, page, register_callback):
@@ -0,0 +1,287 @@
+"""
+Отображение ответов AI в формате Markdown
+"""
+
+# Импорт необходимых библиотек
+import re          # Библиотека регулярных выражений для выделения блоков кода
+import hashlib     # Библиотека для ключей кэша по содержимому
+import threading   # Библиотека для обеспечения потокобезопасности кэшей
+from collections import OrderedDict                 # Упорядоченный словарь для вытеснения LRU
+from concurrent.futures import ThreadPoolExecutor   # Фоновая подсветка синтаксиса
+import flet as ft  # Фреймворк для создания пользовательского интерфейса
+from pygments import lex                            # Разбор кода на лексемы
+from pygments.lexers import get_lexer_by_name       # Выбор лексера по языку блока
+from pygments.lexers.special import TextLexer       # Лексер для неизвестных языков
+from pygments.styles import get_style_by_name       # Цветовая схема подсветки
+from pygments.util import ClassNotFound
+from ui.styles import AppStyles    # Импорт стилей приложения
+
+# Блок кода: ```язык ... ``` (или ~~~), ограничители в начале строки
+FENCE_PATTERN = re.compile(
+    r'^(?P<fence>`{3,}|~{3,})[ \t]*(?P<language>[\w+#.-]*)[^\n]*\n(?P<code>.*?)\n?^(?P=fence)[ \t]*$',
+    re.MULTILINE | re.DOTALL
+)
+
+# Блоки кода от этого размера (в символах) подсвечиваются в фоновом потоке;
+# меньшие блоки остаются в Markdown и подсвечиваются клиентом
+HIGHLIGHT_THRESHOLD = 1500
+
+# Цветовая схема подсветки крупных блоков (близка к теме блоков кода Markdown)
+HIGHLIGHT_STYLE = 'monokai'
+
+
+class MarkdownRenderer:
+    """
+    Отображение ответов AI в формате Markdown с кэшированием.
+
+    Обеспечивает:
+    - Разбор ответа на фрагменты Markdown и крупные блоки кода; результат
+      кэшируется по хэшу содержимого (LRU), поэтому повторное отображение
+      сообщения (прокрутка, перепривязка пузырьков, смена диалога) не разбирает
+      текст заново
+    - Подсветку синтаксиса крупных блоков кода в фоновом потоке: до готовности
+      блок показывается моноширинным текстом без подсветки, затем элемент
+      обновляется; результат подсветки также кэшируется (LRU)
+    - Статистику попаданий в кэш (см. stats)
+    """
+
+    def __init__(self, on_highlighted=None, capacity: int = 256, highlight_capacity: int = 64,
+                 threshold: int = HIGHLIGHT_THRESHOLD):
+        """
+        Инициализация отображения.
+
+        Args:
+            on_highlighted: Функция обновления элемента после фоновой подсветки,
+                            вызывается с элементом из рабочего потока
+                            (по умолчанию - control.update())
+            capacity (int): Количество разобранных сообщений в кэше
+            highlight_capacity (int): Количество подсвеченных блоков кода в кэше
+            threshold (int): Размер блока кода, начиная с которого он подсвечивается в фоне
+        """
+        self.on_highlighted = on_highlighted
+        self.capacity = capacity
+        self.highlight_capacity = highlight_capacity
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.segments = OrderedDict()     # Хэш текста -> фрагменты сообщения
+        self.highlights = OrderedDict()   # Хэш блока кода -> подсвеченные фрагменты
+        self.pending = {}                 # Хэш блока кода -> элементы, ожидающие подсветки
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='highlight')
+        self.style = get_style_by_name(HIGHLIGHT_STYLE)
+
+        # Статистика
+        self.hits = 0                     # Сообщения, найденные в кэше разбора
+        self.misses = 0                   # Сообщения, разобранные заново
+        self.highlighted = 0              # Блоки кода, подсвеченные в фоне
+
+    @staticmethod
+    def content_key(*parts) -> bytes:
+        """
+        Ключ кэша по содержимому.
+
+        Returns:
+            bytes: SHA-1 дайджест частей, разделенных служебным символом
+        """
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).digest()
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, capacity: int):
+        """
+        Внутренняя функция добавления в кэш с вытеснением давно не использованных записей.
+        """
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > capacity:
+            cache.popitem(last=False)
+
+    def parse(self, text: str) -> tuple:
+        """
+        Разбор сообщения на фрагменты (с кэшированием по содержимому).
+
+        Args:
+            text (str): Текст сообщения
+
+        Returns:
+            tuple: Фрагменты в порядке следования:
+                - ('markdown', текст) - Markdown, включая небольшие блоки кода
+                - ('code', язык, код) - крупный блок кода
+        """
+        key = self.content_key(text)
+        with self.lock:
+            segments = self.segments.get(key)
+            if segments is not None:
+                self.segments.move_to_end(key)
+                self.hits += 1
+                return segments
+            self.misses += 1
+
+        segments = []
+        position = 0
+        for match in FENCE_PATTERN.finditer(text):
+            code = match.group('code')
+            if len(code) < self.threshold:
+                continue
+            if text[position:match.start()].strip():
+                segments.append(('markdown', text[position:match.start()]))
+            segments.append(('code', match.group('language').lower(), code))
+            position = match.end()
+        if text[position:].strip() or not segments:
+            segments.append(('markdown', text[position:]))
+        segments = tuple(segments)
+
+        with self.lock:
+            self._remember(self.segments, key, segments, self.capacity)
+        return segments
+
+    def highlight(self, language: str, code: str) -> tuple:
+        """
+        Подсветка синтаксиса блока кода.
+
+        Args:
+            language (str): Язык блока (пустая строка или неизвестный язык - без подсветки)
+            code (str): Код
+
+        Returns:
+            tuple: Фрагменты (текст, цвет "#rrggbb" или None, жирный, курсив);
+                   соседние фрагменты одного стиля объединены
+        """
+        try:
+            lexer = get_lexer_by_name(language) if language else TextLexer()
+        except ClassNotFound:
+            lexer = TextLexer()
+
+        spans = []
+        for token, value in lex(code, lexer):
+            style = self.style.style_for_token(token)
+            span_style = (f"#{style['color']}" if style['color'] else None, style['bold'], style['italic'])
+            if spans and spans[-1][1:] == span_style:
+                spans[-1] = (spans[-1][0] + value,) + span_style
+            else:
+                spans.append((value,) + span_style)
+
+        # Лексер добавляет перевод строки в конец кода
+        if spans and spans[-1][0].endswith('\n') and not code.endswith('\n'):
+            spans[-1] = (spans[-1][0][:-1],) + spans[-1][1:]
+        return tuple(spans)
+
+    def _highlight_worker(self, key: bytes, language: str, code: str):
+        """
+        Внутренняя функция фоновой подсветки: результат сохраняется в кэш
+        и применяется ко всем ожидающим элементам.
+        """
+        try:
+            spans = self.highlight(language, code)
+        except Exception:
+            spans = None
+        with self.lock:
+            if spans is not None:
+                self._remember(self.highlights, key, spans, self.highlight_capacity)
+                self.highlighted += 1
+            controls = self.pending.pop(key, [])
+        if spans is None:
+            return
+        for control in controls:
+            # Элемент мог быть заменен (пузырек перепривязан к другому сообщению)
+            if control.data != key:
+                continue
+            control.spans = self.create_spans(spans)
+            control.value = None
+            if control.page is not None:
+                if self.on_highlighted is not None:
+                    self.on_highlighted(control)
+                else:
+                    control.update()
+
+    @staticmethod
+    def create_spans(spans) -> list:
+        """
+        Создание элементов текста из подсвеченных фрагментов.
+        """
+        return [
+            ft.TextSpan(
+                text,
+                ft.TextStyle(
+                    color=color,
+                    weight=ft.FontWeight.BOLD if bold else None,
+                    italic=italic or None
+                )
+            )
+            for text, color, bold, italic in spans
+        ]
+
+    def create_code_block(self, language: str, code: str) -> ft.Control:
+        """
+        Создание элемента крупного блока кода. Если подсветки еще нет в кэше,
+        блок показывается без подсветки, а подсветка запускается в фоне.
+
+        Args:
+            language (str): Язык блока
+            code (str): Код
+        """
+        key = self.content_key(language, code)
+        text = ft.Text(code, data=key, **AppStyles.CODE_BLOCK_TEXT)
+
+        with self.lock:
+            spans = self.highlights.get(key)
+            if spans is not None:
+                self.highlights.move_to_end(key)
+            else:
+                waiting = self.pending.get(key)
+                if waiting is None:
+                    self.pending[key] = [text]
+                    self.executor.submit(self._highlight_worker, key, language, code)
+                else:
+                    waiting.append(text)
+
+        if spans is not None:
+            text.spans = self.create_spans(spans)
+            text.value = None
+        return ft.Container(content=text, **AppStyles.CODE_BLOCK)
+
+    def build(self, text: str) -> list:
+        """
+        Создание элементов для отображения сообщения.
+
+        Args:
+            text (str): Текст сообщения в формате Markdown
+
+        Returns:
+            list: Элементы ft.Markdown и блоки кода в порядке следования
+        """
+        controls = []
+        for segment in self.parse(text):
+            if segment[0] == 'markdown':
+                controls.append(ft.Markdown(segment[1], **AppStyles.MARKDOWN))
+            else:
+                controls.append(self.create_code_block(segment[1], segment[2]))
+        return controls
+
+    @staticmethod
+    def discard(controls):
+        """
+        Отказ от фоновой подсветки блоков кода, которые больше не отображаются
+        (например, пузырек перепривязан к другому сообщению).
+
+        Args:
+            controls (list): Элементы, ранее созданные методом build
+        """
+        for control in controls:
+            if isinstance(control, ft.Container) and isinstance(control.content, ft.Text):
+                control.content.data = None
+
+    def stats(self) -> dict:
+        """
+        Статистика кэшей.
+
+        Returns:
+            dict: hits, misses, cached, highlighted, highlights_cached, pending
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached': len(self.segments),
+                'highlighted': self.highlighted,
+                'highlights_cached': len(self.highlights),
+                'pending': len(self.pending),
+            }
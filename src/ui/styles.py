@@ -75,6 +75,20 @@ class AppStyles:
         "height": 40,                        # Высота кнопки
     }
 
+    # Настройки кнопки импорта истории
+    IMPORT_BUTTON = {
+        "text": "Импорт",                    # Текст на кнопке
+        "icon": ft.icons.UPLOAD_FILE,        # Иконка загрузки файла
+        "style": ft.ButtonStyle(             # Стиль оформления кнопки
+            color=ft.Colors.WHITE,           # Цвет текста
+            bgcolor=ft.Colors.BLUE_700,      # Цвет фона
+            padding=10,                      # Внутренние отступы
+        ),
+        "tooltip": "Импортировать историю из файла экспорта",  # Всплывающая подсказка
+        "width": 130,                        # Ширина кнопки
+        "height": 40,                        # Высота кнопки
+    }
+
     # Настройки кнопки очистки истории
     CLEAR_BUTTON = {
         "text": "Очистить",                  # Текст на кнопке
@@ -103,6 +117,56 @@ class AppStyles:
         "height": 40,                        # Высота кнопки
     }
 
+    # Настройки кнопки поиска похожих диалогов в пузырьке сообщения
+    FIND_SIMILAR_BUTTON = {
+        "icon": ft.icons.MANAGE_SEARCH,      # Иконка поиска
+        "icon_color": ft.Colors.GREY_400,    # Приглушенный цвет иконки
+        "icon_size": 16,                     # Небольшой размер, чтобы не отвлекать от текста
+        "tooltip": "Найти похожие диалоги",  # Всплывающая подсказка
+    }
+
+    # Настройки отображения ответов AI в формате Markdown
+    MARKDOWN = {
+        "selectable": True,                  # Возможность выделения текста
+        "extension_set": ft.MarkdownExtensionSet.GITHUB_WEB,  # Таблицы, списки задач и т.п.
+        "code_theme": ft.MarkdownCodeTheme.MONOKAI,  # Подсветка небольших блоков кода
+        "auto_follow_links": True,           # Открытие ссылок в браузере
+    }
+
+    # Настройки контейнера крупного блока кода (подсветка выполняется в фоне)
+    CODE_BLOCK = {
+        "bgcolor": "#272822",                # Фон схемы monokai
+        "padding": 10,                       # Внутренние отступы
+        "border_radius": 6,                  # Скругление углов
+    }
+
+    # Настройки текста крупного блока кода
+    CODE_BLOCK_TEXT = {
+        "font_family": "monospace",          # Моноширинный шрифт
+        "size": 14,                          # Размер шрифта
+        "selectable": True,                  # Возможность выделения текста
+        "color": "#F8F8F2",                  # Цвет текста без подсветки (схема monokai)
+    }
+
+    # Настройки графиков панели аналитики
+    ANALYTICS_CHART = {
+        "height": 180,                       # Высота графика
+        "width": 560,                        # Ширина графика
+        "bgcolor": ft.Colors.GREY_900,       # Цвет фона
+        "border": ft.border.all(1, ft.Colors.GREY_700),  # Тонкая серая граница
+        "tooltip_bgcolor": ft.Colors.GREY_800,  # Цвет фона подсказки
+    }
+
+    # Цвета линий графиков для разных моделей (по кругу)
+    CHART_COLORS = [
+        ft.Colors.BLUE_400,
+        ft.Colors.GREEN_400,
+        ft.Colors.ORANGE_400,
+        ft.Colors.PURPLE_300,
+        ft.Colors.RED_400,
+        ft.Colors.TEAL_300,
+    ]
+
     # Настройки строки с полем ввода и кнопкой отправки
     INPUT_ROW = {
         "spacing": 10,                                    # Отступ между элементами
@@ -169,6 +233,29 @@ class AppStyles:
         "width": 400,                                    # Ширина колонки
     }
 
+    # Настройки боковой панели со списком диалогов
+    SIDEBAR = {
+        "width": 220,                        # Ширина панели
+        "padding": 10,                       # Внутренние отступы
+        "bgcolor": ft.Colors.GREY_900,       # Цвет фона
+        "border_radius": 8,                  # Радиус скругления углов
+        "border": ft.border.all(1, ft.Colors.GREY_700),  # Тонкая серая граница
+    }
+
+    # Настройки кнопки создания нового диалога
+    NEW_CONVERSATION_BUTTON = {
+        "text": "Новый диалог",              # Текст на кнопке
+        "icon": ft.icons.ADD,                # Иконка добавления
+        "style": ft.ButtonStyle(             # Стиль оформления кнопки
+            color=ft.Colors.WHITE,           # Цвет текста
+            bgcolor=ft.Colors.BLUE_700,      # Цвет фона
+            padding=10,                      # Внутренние отступы
+        ),
+        "tooltip": "Начать новый диалог",    # Всплывающая подсказка
+        "width": 200,                        # Ширина кнопки
+        "height": 40,                        # Высота кнопки
+    }
+
     # Настройки текста отображения баланса
     BALANCE_TEXT = {
         "size": 16,                          # Размер шрифта
@@ -192,6 +279,6 @@ class AppStyles:
         Args:
             page (ft.Page): Объект страницы приложения
         """
-        page.window.width = 600              # Фиксированная ширина окна
+        page.window.width = 850              # Фиксированная ширина окна (с панелью диалогов)
         page.window.height = 800             # Фиксированная высота окна
         page.window.resizable = False        # Запрет изменения размера пользователем
@@ -0,0 +1,147 @@
+"""
+Планировщик обновлений страницы Flet
+"""
+
+# Импорт необходимых библиотек
+import json        # Библиотека для оценки объема команд, отправляемых клиенту
+import time        # Библиотека для ограничения частоты обновлений
+import threading   # Библиотека для пометок из потоков исполнителя
+from flet.core.protocol import CommandEncoder  # Сериализация команд протокола Flet
+
+# Минимальный интервал между обновлениями страницы (около 30 кадров в секунду)
+DEFAULT_FRAME_INTERVAL = 1 / 30
+
+
+class UpdateScheduler:
+    """
+    Объединение обновлений страницы с ограничением частоты.
+
+    Обеспечивает:
+    - Пометку измененных элементов (mark) вместо немедленного page.update():
+      все пометки за интервал кадра отправляются клиенту одним обновлением
+    - Немедленную отправку накопленных изменений в важные моменты (flush),
+      например перед прокруткой к только что добавленному элементу
+    - Учет обновлений и объема отправленных клиенту команд
+      (см. instrument и stats)
+
+    Пометки можно делать из любого потока: отправка всегда выполняется
+    в цикле событий страницы.
+    """
+
+    def __init__(self, page, interval: float = DEFAULT_FRAME_INTERVAL):
+        """
+        Инициализация планировщика.
+
+        Args:
+            page (ft.Page): Страница, изменения которой отправляются клиенту
+            interval (float): Минимальный интервал между обновлениями в секундах
+        """
+        self.page = page
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.dirty = {}           # Помеченные элементы (словарь сохраняет порядок пометок)
+        self.full = False         # Помечена вся страница
+        self.scheduled = False    # Отправка уже запланирована
+        self.last_flush = 0.0     # Время последней отправки (time.monotonic())
+
+        # Статистика
+        self.marks = 0            # Количество пометок (вызовов mark)
+        self.flushes = 0          # Количество обновлений, выполненных планировщиком
+        self.updates_sent = 0     # Все отправки команд клиенту (если включен instrument)
+        self.bytes_sent = 0       # Объем отправленных команд в байтах (если включен instrument)
+
+    def mark(self, *controls):
+        """
+        Пометка элементов как измененных; обновление будет отправлено
+        не позже чем через интервал кадра.
+
+        Args:
+            *controls: Измененные элементы (без аргументов - вся страница)
+        """
+        with self.lock:
+            self.marks += 1
+            if controls:
+                for control in controls:
+                    self.dirty[control] = None
+            else:
+                self.full = True
+            if self.scheduled:
+                return
+            self.scheduled = True
+        delay = max(self.last_flush + self.interval - time.monotonic(), 0)
+        loop = self.page.loop
+        loop.call_soon_threadsafe(loop.call_later, delay, self.flush)
+
+    def flush(self):
+        """
+        Немедленная отправка всех накопленных изменений одним обновлением.
+        """
+        with self.lock:
+            full, dirty = self.full, list(self.dirty)
+            self.full = False
+            self.dirty = {}
+            self.scheduled = False
+        if not full and not dirty:
+            return
+        self.last_flush = time.monotonic()
+        self.flushes += 1
+        if full:
+            self.page.update()
+        else:
+            self.page.update(*dirty)
+
+    def instrument(self, logger=None):
+        """
+        Включение учета всех обновлений страницы (в том числе в обход планировщика)
+        и объема отправленных клиенту команд в формате протокола Flet.
+
+        Обновления считаются на границе page.update. Объем команд доступен только
+        через внутреннее соединение страницы Flet: если в установленной версии Flet
+        его нет, объем не учитывается, а в лог записывается предупреждение.
+        Команды дополнительно сериализуются для подсчета байтов, поэтому
+        учет включается только для диагностики.
+
+        Args:
+            logger (AppLogger): Логгер для предупреждения (необязательно)
+
+        Returns:
+            bool: True, если учитывается и объем команд
+        """
+        if getattr(self.page, 'update_scheduler_instrumented', False):
+            return False
+        update = self.page.update
+
+        def counting_update(*controls):
+            self.updates_sent += 1
+            return update(*controls)
+
+        self.page.update = counting_update
+        self.page.update_scheduler_instrumented = True
+
+        conn = getattr(self.page, '_Page__conn', None)
+        send_commands = getattr(conn, 'send_commands', None)
+        if not callable(send_commands):
+            if logger is not None:
+                logger.warning("Flet page connection is not accessible, update sizes are not measured")
+            return False
+
+        def counting_send_commands(session_id, commands):
+            self.bytes_sent += len(json.dumps(commands, cls=CommandEncoder, separators=(',', ':')))
+            return send_commands(session_id, commands)
+
+        conn.send_commands = counting_send_commands
+        return True
+
+    def stats(self) -> dict:
+        """
+        Статистика обновлений.
+
+        Returns:
+            dict: marks, flushes, updates_sent, bytes_sent
+        """
+        return {
+            'marks': self.marks,
+            'flushes': self.flushes,
+            'updates_sent': self.updates_sent,
+            'bytes_sent': self.bytes_sent,
+        }
@@ -3,13 +3,38 @@ Utils package initialization.
 Contains utility modules for the application.
 """
 from .analytics import Analytics
+from .archive import HistoryArchiver
 from .cache import ChatCache
+from .export import HistoryExporter
+from .importer import HistoryImporter
 from .logger import AppLogger
+from .loop_monitor import EventLoopMonitor
+from .memory import MemoryDiagnostics
+from .metrics import MetricsRegistry, MetricsServer
+from .model_search import ModelSearchIndex
 from .monitor import PerformanceMonitor
+from .profiler import Profiler
+from .search import SemanticIndex
+from .session_store import SessionStore
+from .sketch import QuantileSketch
+from .tracing import Tracer
 
 __all__ = [
     'Analytics',
+    'HistoryArchiver',
     'ChatCache',
+    'HistoryExporter',
+    'HistoryImporter',
     'AppLogger',
-    'PerformanceMonitor'
+    'EventLoopMonitor',
+    'MemoryDiagnostics',
+    'MetricsRegistry',
+    'MetricsServer',
+    'ModelSearchIndex',
+    'PerformanceMonitor',
+    'Profiler',
+    'SemanticIndex',
+    'SessionStore',
+    'QuantileSketch',
+    'Tracer'
 ]
\ No newline at end of file
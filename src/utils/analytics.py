@@ -1,6 +1,20 @@
 # Импорт необходимых библиотек
 import time                  # Библиотека для работы с временными метками и измерения интервалов
 from datetime import datetime  # Библиотека для работы с датой и временем в удобном формате
+import numpy as np             # Библиотека для векторных вычислений
+from .session_store import SessionStore  # Столбцовое хранилище метрик сессии
+from .sketch import QuantileSketch       # Потоковый скетч квантилей
+from .downsample import lttb, minmax_buckets  # Прореживание временных рядов
+from .cache import ANALYTICS_ROLLUPS          # Форматы интервалов агрегатов
+
+# Формат начала часового интервала агрегатов (местное время)
+HOURLY_BUCKET_FORMAT = ANALYTICS_ROLLUPS['analytics_rollup_hourly']
+
+# Метрики, для которых ведутся скетчи квантилей
+SKETCH_METRICS = ('response_time', 'tokens')
+
+# Метрики временных рядов панели аналитики
+TIMESERIES_METRICS = ('response_time', 'tokens', 'messages')
 
 class Analytics:
     """
@@ -24,12 +38,13 @@ class Analytics:
         Создает необходимые структуры данных для хранения:
         - Времени начала сессии
         - Статистики использования моделей
-        - Детальных данных о каждом сообщении
+        - Детальных данных о каждом сообщении (в столбцовом хранилище)
         """
         self.cache = cache
         self.start_time = time.time()
         self.model_usage = {}
-        self.session_data = []
+        self.session_data = SessionStore()
+        self.sketches = {}  # Скетчи текущего дня: (день, модель, метрика) -> QuantileSketch
         
         # Загрузка исторических данных из базы
         self._load_historical_data()
@@ -37,32 +52,26 @@ class Analytics:
     def _load_historical_data(self):
         """
         Загрузка исторических данных из базы данных.
-        Обновляет статистику использования моделей и сессионные данные.
+        
+        Статистика моделей читается из дневных агрегатов (по одной строке
+        на модель и день), поэтому время запуска не зависит от количества
+        сообщений. Для баз без агрегатов они однократно перестраиваются.
         """
-        history = self.cache.get_analytics_history()
+        if self.cache.analytics_rollups_missing():
+            self.cache.rebuild_analytics_rollups()
+        if self.cache.sketches_missing():
+            self._rebuild_sketches()
         
-        for record in history:
-            timestamp, model, message_length, response_time, tokens_used = record
-            
-            # Обновление статистики моделей
-            if model not in self.model_usage:
-                self.model_usage[model] = {
-                    'count': 0,
-                    'tokens': 0
-                }
-            self.model_usage[model]['count'] += 1
-            self.model_usage[model]['tokens'] += tokens_used
-            
-            # Добавление в сессионные данные
-            self.session_data.append({
-                'timestamp': datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S.%f'),
-                'model': model,
-                'message_length': message_length,
-                'response_time': response_time,
-                'tokens_used': tokens_used
-            })
+        for model, count, tokens, _, response_time_sum, response_time_sq_sum in self.cache.get_model_usage_rollup():
+            self.model_usage[model] = {
+                'count': count,
+                'tokens': tokens,
+                'response_time_sum': response_time_sum,
+                'response_time_sq_sum': response_time_sq_sum
+            }
 
-    def track_message(self, model: str, message_length: int, response_time: float, tokens_used: int):
+    def track_message(self, model: str, message_length: int, response_time: float, tokens_used: int,
+                      timings: dict = None):
         """
         Отслеживание метрик отдельного сообщения.
         
@@ -74,31 +83,213 @@ class Analytics:
             message_length (int): Длина сообщения в символах
             response_time (float): Время ответа в секундах
             tokens_used (int): Количество использованных токенов
+            timings (dict): Фазы запроса в секундах (см. PHASE_TIMINGS в utils.cache)
         """
         timestamp = datetime.now()
         
-        # Сохранение в базу данных
-        self.cache.save_analytics(timestamp, model, message_length, response_time, tokens_used)
+        # Обновление скетчей квантилей в памяти
+        sketches = self._update_sketches(timestamp.strftime('%Y-%m-%d'), model, {
+            'response_time': response_time,
+            'tokens': tokens_used
+        })
+        
+        # Сохранение в базу данных (запись, агрегаты и скетчи - одной транзакцией)
+        self.cache.save_analytics(timestamp, model, message_length, response_time, tokens_used, timings,
+                                  sketches=sketches)
         
         # Инициализация статистики для новой модели при первом использовании
         if model not in self.model_usage:
             self.model_usage[model] = {
-                'count': 0,    # Счетчик использований
-                'tokens': 0    # Счетчик токенов
+                'count': 0,                  # Счетчик использований
+                'tokens': 0,                 # Счетчик токенов
+                'response_time_sum': 0.0,    # Сумма времени ответа
+                'response_time_sq_sum': 0.0  # Сумма квадратов времени ответа
             }
 
         # Обновление статистики использования модели
-        self.model_usage[model]['count'] += 1          # Увеличение счетчика сообщений
-        self.model_usage[model]['tokens'] += tokens_used  # Добавление использованных токенов
+        usage = self.model_usage[model]
+        usage['count'] += 1                                       # Увеличение счетчика сообщений
+        usage['tokens'] += tokens_used                            # Добавление использованных токенов
+        usage['response_time_sum'] += response_time               # Накопление времени ответа
+        usage['response_time_sq_sum'] += response_time * response_time
 
         # Сохранение подробной информации о сообщении
-        self.session_data.append({
-            'timestamp': timestamp,           # Время отправки сообщения
-            'model': model,                   # Использованная модель
-            'message_length': message_length, # Длина сообщения
-            'response_time': response_time,   # Время ответа
-            'tokens_used': tokens_used        # Количество токенов
-        })
+        self.session_data.append(
+            timestamp.timestamp(),  # Время отправки сообщения
+            model,                  # Использованная модель
+            message_length,         # Длина сообщения
+            response_time,          # Время ответа
+            tokens_used             # Количество токенов
+        )
+
+    def _rebuild_sketches(self):
+        """
+        Внутренняя функция однократного построения дневных скетчей
+        по записям аналитики, сохраненным до появления скетчей.
+        """
+        sketches = {}
+        for timestamp, model, _, response_time, tokens_used in self.cache.get_analytics_history():
+            day = str(timestamp)[:10]
+            for metric, value in (('response_time', response_time), ('tokens', tokens_used)):
+                sketches.setdefault((day, model, metric), QuantileSketch()).add(value or 0)
+        for (day, model, metric), sketch in sketches.items():
+            self.cache.save_sketch(day, model, metric, sketch.to_bytes())
+
+    def _update_sketches(self, day, model, values) -> list:
+        """
+        Внутренняя функция добавления значений метрик в дневные скетчи модели.
+        
+        В памяти хранятся только скетчи текущего дня; скетчи за прошедшие дни
+        вытесняются при смене даты.
+        
+        Returns:
+            list: Обновленные скетчи для сохранения [(день, модель, метрика, bytes), ...]
+        """
+        updated = []
+        for key in [key for key in self.sketches if key[0] != day]:
+            del self.sketches[key]
+        for metric, value in values.items():
+            key = (day, model, metric)
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                # Продолжение скетча, сохраненного в предыдущем запуске приложения
+                stored = self.cache.get_sketches(metric, start=day, model=model)
+                if stored and stored[0][0] == day:
+                    sketch = QuantileSketch.from_bytes(stored[0][2])
+                else:
+                    sketch = QuantileSketch()
+                self.sketches[key] = sketch
+            sketch.add(value)
+            updated.append((day, model, metric, sketch.to_bytes()))
+        return updated
+
+    def get_timeseries(self, metric='response_time', max_points=300, start=None, end=None,
+                       method='lttb') -> dict:
+        """
+        Получение временных рядов метрики по моделям для графиков.
+        
+        Ряды строятся по часовым агрегатам и прореживаются на стороне приложения,
+        поэтому объем данных для интерфейса не зависит от количества записей:
+        суммарно по всем моделям возвращается не более max_points точек.
+        
+        Args:
+            metric (str): 'response_time' (среднее за час), 'tokens' или 'messages' (сумма за час)
+            max_points (int): Максимальное суммарное количество точек
+            start (str): Нижняя граница времени (включительно)
+            end (str): Верхняя граница времени (не включительно)
+            method (str): 'lttb' или 'minmax' - способ прореживания
+            
+        Returns:
+            dict: Модель -> (x, y), где x - время в секундах Unix, y - значения метрики
+        """
+        if metric not in TIMESERIES_METRICS:
+            raise ValueError(f"Unknown timeseries metric: {metric}")
+        
+        rows = {}
+        for bucket, model, count, tokens_sum, _, response_time_sum, _ in self.cache.get_analytics_rollup(
+                'hourly', start, end):
+            if metric == 'response_time':
+                value = response_time_sum / count if count else 0
+            elif metric == 'tokens':
+                value = tokens_sum
+            else:
+                value = count
+            series = rows.setdefault(model, ([], []))
+            series[0].append(bucket)
+            series[1].append(value)
+        
+        if not rows:
+            return {}
+        allocation = self._allocate_points(
+            {model: len(values) for model, (_, values) in rows.items()},
+            max_points,
+            minimum=2 if method == 'minmax' else 3
+        )
+        result = {}
+        for model, points in allocation.items():
+            buckets, values = rows[model]
+            # Интервалы агрегатов записаны в местном времени: strptime + timestamp()
+            # дают верное время Unix (разбор через datetime64 считал бы их временем UTC)
+            x = np.array([datetime.strptime(bucket, HOURLY_BUCKET_FORMAT).timestamp() for bucket in buckets])
+            if method == 'minmax':
+                result[model] = minmax_buckets(x, values, points // 2)
+            else:
+                result[model] = lttb(x, values, points)
+        return result
+
+    @staticmethod
+    def _allocate_points(sizes: dict, max_points: int, minimum: int) -> dict:
+        """
+        Внутренняя функция распределения суммарного бюджета точек между рядами.
+        
+        Короткие ряды получают все свои точки, остаток поровну делится между
+        рядами, которые нужно прореживать. Если на каждый из них приходится
+        меньше minimum точек, не помещающиеся ряды с наименьшим количеством
+        точек не выводятся - сумма никогда не превышает max_points.
+        
+        Args:
+            sizes (dict): Модель -> количество точек ряда
+            max_points (int): Суммарный бюджет точек
+            minimum (int): Минимальное количество точек прореживаемого ряда
+            
+        Returns:
+            dict: Модель -> количество точек (только выводимые модели)
+        """
+        budget = max_points
+        remaining = sorted(sizes, key=sizes.get)
+        allocation = {}
+        while remaining and sizes[remaining[0]] <= budget // len(remaining):
+            model = remaining.pop(0)
+            allocation[model] = sizes[model]
+            budget -= sizes[model]
+        while remaining and budget // len(remaining) < minimum:
+            remaining.pop(0)
+        for model in remaining:
+            allocation[model] = budget // len(remaining)
+        return allocation
+
+    def get_quantiles(self, model=None, start=None, end=None, q=(50, 90, 99)) -> dict:
+        """
+        Получение перцентилей времени ответа и токенов на сообщение по моделям.
+        
+        Дневные скетчи за период объединяются слиянием, поэтому результат
+        не требует чтения отдельных записей аналитики.
+        
+        Args:
+            model (str): Идентификатор модели (None - все модели)
+            start (str): Первый день периода (включительно), формат YYYY-MM-DD
+            end (str): Последний день периода (не включительно), формат YYYY-MM-DD
+            q (tuple): Перцентили
+            
+        Returns:
+            dict: Модель -> {метрика -> {перцентиль -> значение}}
+        """
+        merged = {}
+        for metric in SKETCH_METRICS:
+            for _, sketch_model, data in self.cache.get_sketches(metric, start, end, model):
+                sketch = merged.setdefault(sketch_model, {}).setdefault(metric, QuantileSketch())
+                sketch.merge(QuantileSketch.from_bytes(data))
+        return {
+            sketch_model: {metric: sketch.percentiles(q) for metric, sketch in metrics.items()}
+            for sketch_model, metrics in merged.items()
+        }
+
+    def get_phase_timings(self, model=None, start=None, end=None) -> dict:
+        """
+        Получение средних значений фаз запроса по моделям.
+        
+        Показывает, на что уходит время ответа: ожидание потока, соединение,
+        время до первого токена, генерация, разбор ответа и запись в базу.
+        
+        Args:
+            model (str): Идентификатор модели (None - все модели)
+            start (str): Первый день периода (включительно), формат YYYY-MM-DD
+            end (str): Последний день периода (не включительно), формат YYYY-MM-DD
+            
+        Returns:
+            dict: Модель -> {фаза -> среднее значение}
+        """
+        return self.cache.get_phase_timings(start, end, model)
 
     def get_statistics(self) -> dict:
         """
@@ -114,7 +305,10 @@ class Analytics:
                 - session_duration: длительность сессии в секундах
                 - messages_per_minute: среднее количество сообщений в минуту
                 - tokens_per_message: среднее количество токенов на сообщение
+                - avg_response_time: среднее время ответа в секундах
+                - response_time_percentiles: перцентили p50/p90/p99 времени ответа за сессию
                 - model_usage: статистика использования каждой модели
+                  (включая avg_response_time и response_time_std)
         """
         # Расчет общей длительности сессии
         total_time = time.time() - self.start_time
@@ -124,6 +318,18 @@ class Analytics:
         
         # Подсчет общего количества сообщений по всем моделям
         total_messages = sum(model['count'] for model in self.model_usage.values())
+        
+        # Суммарное время ответа по всем моделям
+        total_response_time = sum(model['response_time_sum'] for model in self.model_usage.values())
+        
+        # Среднее и стандартное отклонение времени ответа для каждой модели
+        # рассчитываются по накопленным суммам без обращения к отдельным записям
+        for usage in self.model_usage.values():
+            count = usage['count']
+            mean = usage['response_time_sum'] / count if count else 0
+            variance = usage['response_time_sq_sum'] / count - mean * mean if count else 0
+            usage['avg_response_time'] = mean
+            usage['response_time_std'] = max(variance, 0) ** 0.5
 
         # Формирование и возврат статистики
         return {
@@ -140,19 +346,31 @@ class Analytics:
             # Если сообщений нет, возвращаем 0 чтобы избежать деления на ноль
             'tokens_per_message': total_tokens / total_messages if total_messages > 0 else 0,
             
+            # Среднее время ответа по всем сообщениям
+            'avg_response_time': total_response_time / total_messages if total_messages > 0 else 0,
+            
+            # Перцентили времени ответа за текущую сессию
+            'response_time_percentiles': self.session_data.percentiles('response_time'),
+            
             # Полная статистика использования моделей
             'model_usage': self.model_usage
         }
 
-    def export_data(self) -> list:
+    def export_data(self) -> dict:
         """
-        Экспорт всех собранных данных сессии.
+        Экспорт собранных данных текущей сессии в виде столбцов.
+        
+        Данные возвращаются не списком записей, а словарем столбцов хранилища
+        сессии (SessionStore.view). Историческая статистика хранится
+        в агрегатах базы данных (ChatCache.get_analytics_rollup), а не в памяти.
         
         Returns:
-            list: Список словарей с подробной информацией о каждом сообщении
-                 включая временные метки, использованные модели и метрики.
+            dict: Столбцы метрик сессии (массивы NumPy только для чтения, без копирования):
+                 timestamp (секунды Unix), model (коды), message_length, response_time,
+                 tokens_used и список models для расшифровки кодов моделей:
+                 models[model[i]] - идентификатор модели i-го сообщения.
         """
-        return self.session_data
+        return self.session_data.view()
 
     def clear_data(self):
         """
@@ -164,4 +382,5 @@ class Analytics:
         - Сбрасывает время начала сессии
         """
         self.model_usage.clear()    # Очистка статистики по моделям
-        self.session_data.clear()   # Очистка истории сообщений
\ No newline at end of file
+        self.session_data.clear()   # Очистка истории сообщений
+        self.sketches.clear()       # Очистка скетчей текущего дня
\ No newline at end of file
@@ -0,0 +1,430 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для работы с файлами и директориями
+import json        # Библиотека для записи сообщений и индекса архива
+import gzip        # Библиотека для сжатия сегментов архива
+import time        # Библиотека для пауз между пакетами
+import threading   # Библиотека для запуска фоновой задачи
+from datetime import datetime, timedelta  # Библиотека для расчета границы хранения
+
+# Политика хранения по умолчанию: ограничения выключены (None)
+DEFAULT_RETENTION_POLICY = {
+    'max_age_days': None,   # Максимальный возраст сообщений в днях
+    'max_rows': None,       # Максимальное количество сообщений в базе
+    'max_size_mb': None,    # Максимальный объем текстов сообщений в базе в мегабайтах
+}
+
+
+class HistoryArchiver:
+    """
+    Класс для переноса старой истории чата в архив согласно политике хранения.
+
+    Обеспечивает:
+    - Ограничение истории по возрасту, количеству строк или объему сообщений
+    - Перенос старых сообщений в сжатые сегменты (один файл на месяц),
+      в которые данные только дописываются
+    - Небольшой индекс сегментов для поиска и экспорта без чтения всего архива
+    - Получение архивных сообщений по ID: перенесенные сообщения остаются
+      в векторном индексе и находятся поиском похожих диалогов
+    - Работу в фоновом потоке небольшими транзакциями с паузами
+    - Удаление сообщений диалога из архива при удалении диалога или истории
+
+    Сегмент - это файл YYYY-MM.jsonl.gz из последовательных gzip-блоков,
+    каждая строка которого - одно сообщение в формате JSON.
+    """
+
+    def __init__(self, cache, archive_dir='archive', policy=None):
+        """
+        Инициализация архиватора.
+
+        Args:
+            cache (ChatCache): Экземпляр класса для работы с базой данных
+            archive_dir (str): Директория для хранения сегментов архива
+            policy (dict): Политика хранения (ключи как в DEFAULT_RETENTION_POLICY)
+        """
+        self.cache = cache
+        self.archive_dir = archive_dir
+        self.policy = dict(DEFAULT_RETENTION_POLICY, **(policy or {}))
+        self.index_path = os.path.join(archive_dir, 'index.json')
+        self.lock = threading.Lock()         # Блокировка записи в архив
+        self.stop_event = threading.Event()  # Событие остановки фоновой задачи
+        self.thread = None
+        self.last_storage = None             # Объем сообщений при предыдущем пакете (политика объема)
+
+        os.makedirs(archive_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    @staticmethod
+    def policy_from_env() -> dict:
+        """
+        Чтение политики хранения из переменных окружения
+        RETENTION_MAX_AGE_DAYS, RETENTION_MAX_ROWS и RETENTION_MAX_SIZE_MB.
+
+        Returns:
+            dict: Политика хранения
+        """
+        policy = {}
+        for key, env_name, cast in (
+            ('max_age_days', 'RETENTION_MAX_AGE_DAYS', float),
+            ('max_rows', 'RETENTION_MAX_ROWS', int),
+            ('max_size_mb', 'RETENTION_MAX_SIZE_MB', float),
+        ):
+            value = os.getenv(env_name)
+            if value:
+                policy[key] = cast(value)
+        return policy
+
+    def is_enabled(self) -> bool:
+        """
+        Возвращает True, если задано хотя бы одно ограничение хранения.
+        """
+        return any(value is not None for value in self.policy.values())
+
+    def _load_index(self) -> dict:
+        """
+        Внутренняя функция загрузки индекса сегментов.
+        """
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'segments': {}}
+
+    def _save_index(self):
+        """
+        Внутренняя функция атомарного сохранения индекса сегментов.
+        """
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _append_to_segments(self, rows: list):
+        """
+        Внутренняя функция дописывания сообщений в месячные сегменты и обновления индекса.
+
+        Args:
+            rows (list): Список словарей сообщений
+        """
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(str(row['timestamp'])[:7], []).append(row)
+
+        for month, month_rows in by_month.items():
+            filename = f"{month}.jsonl.gz"
+            # Режим 'ab' дописывает новый gzip-блок в конец существующего файла
+            with gzip.open(os.path.join(self.archive_dir, filename), 'ab') as f:
+                for row in month_rows:
+                    f.write((json.dumps(row, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+
+            # Обновление сводной информации о сегменте
+            segment = self.index['segments'].setdefault(month, {
+                'file': filename,
+                'count': 0,
+                'first_timestamp': str(month_rows[0]['timestamp']),
+                'last_timestamp': str(month_rows[0]['timestamp']),
+                'models': [],
+                'min_id': month_rows[0]['id'],
+                'max_id': month_rows[0]['id'],
+            })
+            segment['count'] += len(month_rows)
+            for row in month_rows:
+                timestamp = str(row['timestamp'])
+                segment['first_timestamp'] = min(segment['first_timestamp'], timestamp)
+                segment['last_timestamp'] = max(segment['last_timestamp'], timestamp)
+                # Диапазон ID для поиска сообщений по ID (в сегментах старого формата его нет)
+                if 'min_id' in segment:
+                    segment['min_id'] = min(segment['min_id'], row['id'])
+                    segment['max_id'] = max(segment['max_id'], row['id'])
+                if row['model'] not in segment['models']:
+                    segment['models'].append(row['model'])
+
+        self._save_index()
+
+    def purge(self, conversation_id=None) -> list:
+        """
+        Удаление сообщений из архива (при удалении диалога или очистке истории).
+
+        Сегменты, содержащие сообщения диалога, переписываются без них
+        (через временный файл с атомарной заменой), пустые сегменты удаляются,
+        сводная информация в индексе пересчитывается.
+
+        Args:
+            conversation_id (int): ID диалога (None - удалить весь архив)
+
+        Returns:
+            list: ID удаленных сообщений
+        """
+        removed = []
+        with self.lock:
+            for month in sorted(self.index['segments']):
+                segment = self.index['segments'][month]
+                path = os.path.join(self.archive_dir, segment['file'])
+                kept = []
+                if os.path.exists(path):
+                    with gzip.open(path, 'rt', encoding='utf-8') as f:
+                        for line in f:
+                            row = json.loads(line)
+                            if conversation_id is None or row.get('conversation_id') == conversation_id:
+                                removed.append(row['id'])
+                            else:
+                                kept.append(row)
+                if len(kept) == segment['count'] and os.path.exists(path):
+                    continue  # В сегменте нет сообщений диалога
+
+                if not kept:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    del self.index['segments'][month]
+                    continue
+                tmp_path = path + '.tmp'
+                with gzip.open(tmp_path, 'wb') as f:
+                    for row in kept:
+                        f.write((json.dumps(row, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+                os.replace(tmp_path, path)
+                timestamps = [str(row['timestamp']) for row in kept]
+                segment.update({
+                    'count': len(kept),
+                    'first_timestamp': min(timestamps),
+                    'last_timestamp': max(timestamps),
+                    'models': list(dict.fromkeys(row['model'] for row in kept)),
+                    'min_id': min(row['id'] for row in kept),
+                    'max_id': max(row['id'] for row in kept),
+                })
+            self._save_index()
+        return removed
+
+    def _select_batch(self, batch_size) -> list:
+        """
+        Внутренняя функция выбора следующего пакета сообщений для архивации.
+
+        Сначала соблюдаются ограничения по количеству строк и объему текстов
+        сообщений (архивируются самые старые сообщения), затем ограничение по возрасту.
+        Объем измеряется только по сообщениям: таблицы аналитики и служебные данные
+        архивацией не уменьшаются. Если пакет не уменьшил объем, архивация по объему
+        прекращается.
+
+        Args:
+            batch_size (int): Максимальный размер пакета
+
+        Returns:
+            list: Список словарей сообщений (пустой, если политика соблюдена)
+        """
+        max_rows = self.policy['max_rows']
+        if max_rows is not None:
+            excess = self.cache.count_messages() - max_rows
+            if excess > 0:
+                return self.cache.get_oldest_messages(limit=min(batch_size, excess))
+
+        max_size_mb = self.policy['max_size_mb']
+        if max_size_mb is not None:
+            storage = self.cache.get_message_storage_size()
+            progressed = self.last_storage is None or storage < self.last_storage
+            if storage > max_size_mb * 1024 * 1024 and progressed:
+                self.last_storage = storage
+                return self.cache.get_oldest_messages(limit=batch_size)
+
+        max_age_days = self.policy['max_age_days']
+        if max_age_days is not None:
+            cutoff = datetime.now() - timedelta(days=max_age_days)
+            return self.cache.get_oldest_messages(limit=batch_size, before=cutoff)
+
+        return []
+
+    def run_once(self, batch_size=200, pause=0.1) -> int:
+        """
+        Перенос в архив всех сообщений, нарушающих политику хранения.
+
+        Сообщения переносятся пакетами от самых старых: сначала пакет дописывается
+        в архив, затем удаляется из базы в отдельной короткой транзакции
+        (векторный индекс сообщений сохраняется, см. get_messages).
+        При сбое между этими шагами сообщение может попасть в архив дважды,
+        но не будет потеряно.
+
+        Args:
+            batch_size (int): Количество сообщений в одном пакете
+            pause (float): Пауза между пакетами в секундах
+
+        Returns:
+            int: Количество перенесенных в архив сообщений
+        """
+        if not self.is_enabled():
+            return 0
+
+        archived = 0
+        self.last_storage = None
+        while not self.stop_event.is_set():
+            rows = self._select_batch(batch_size)
+            if not rows:
+                break
+
+            with self.lock:
+                self._append_to_segments(rows)
+            self.cache.delete_messages([row['id'] for row in rows], unindex=False)
+            archived += len(rows)
+            time.sleep(pause)  # Уступаем базу основному потоку
+
+        if archived:
+            self.cache.reclaim_space()
+        return archived
+
+    def start(self, interval=3600, logger=None):
+        """
+        Запуск периодического переноса истории в архив в фоновом потоке.
+
+        Args:
+            interval (float): Интервал между проверками в секундах
+            logger (AppLogger): Логгер для записи результатов (необязательно)
+        """
+        if not self.is_enabled() or self.thread is not None:
+            return
+
+        def worker():
+            while not self.stop_event.is_set():
+                try:
+                    archived = self.run_once()
+                    if archived and logger:
+                        logger.info("Archived %s messages to %s", archived, self.archive_dir)
+                except Exception as e:
+                    if logger:
+                        logger.error("History archiving failed: %s", e)
+                self.stop_event.wait(interval)
+
+        self.thread = threading.Thread(target=worker, name='HistoryArchiver', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Остановка фоновой задачи архивации.
+        """
+        self.stop_event.set()
+
+    def _matching_segments(self, start=None, end=None, model=None) -> list:
+        """
+        Внутренняя функция выбора сегментов по индексу (в хронологическом порядке).
+        """
+        segments = []
+        for month in sorted(self.index['segments']):
+            segment = self.index['segments'][month]
+            if start and segment['last_timestamp'] < start:
+                continue
+            if end and segment['first_timestamp'] >= end:
+                continue
+            if model and model not in segment['models']:
+                continue
+            segments.append(segment)
+        return segments
+
+    def estimate_count(self, start=None, end=None, model=None) -> int:
+        """
+        Оценка сверху количества архивных сообщений по индексу (без распаковки).
+
+        Args:
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+
+        Returns:
+            int: Количество сообщений в подходящих сегментах
+        """
+        start = str(start) if start is not None else None
+        end = str(end) if end is not None else None
+        return sum(segment['count'] for segment in self._matching_segments(start, end, model))
+
+    def iter_messages(self, start=None, end=None, model=None, conversation_id=None):
+        """
+        Последовательное чтение сообщений из архива.
+
+        Сегменты, не попадающие в диапазон дат или не содержащие модель,
+        пропускаются по индексу без распаковки.
+
+        Args:
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+            conversation_id (int): ID диалога
+
+        Yields:
+            dict: Сообщение из архива
+        """
+        # Время хранится строкой вида str(datetime), поэтому границы сравниваются как строки
+        start = str(start) if start is not None else None
+        end = str(end) if end is not None else None
+        for segment in self._matching_segments(start, end, model):
+
+            with gzip.open(os.path.join(self.archive_dir, segment['file']), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    timestamp = str(row['timestamp'])
+                    if start and timestamp < start:
+                        continue
+                    if end and timestamp >= end:
+                        continue
+                    if model and row['model'] != model:
+                        continue
+                    if conversation_id is not None and row.get('conversation_id') != conversation_id:
+                        continue
+                    yield row
+
+    def get_messages(self, message_ids) -> dict:
+        """
+        Получение архивных сообщений по ID (например, найденных векторным поиском).
+        Распаковываются только сегменты, диапазон ID которых содержит искомые.
+
+        Args:
+            message_ids (list): Список ID сообщений
+
+        Returns:
+            dict: ID -> сообщение (отсутствующие в архиве ID пропускаются)
+        """
+        wanted = set(message_ids)
+        found = {}
+        for month in sorted(self.index['segments']):
+            if not wanted:
+                break
+            segment = self.index['segments'][month]
+            if 'min_id' in segment and not any(segment['min_id'] <= i <= segment['max_id'] for i in wanted):
+                continue
+            with gzip.open(os.path.join(self.archive_dir, segment['file']), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row['id'] in wanted:
+                        found[row['id']] = row
+                        wanted.discard(row['id'])
+        return found
+
+    def search(self, text, limit=50) -> list:
+        """
+        Поиск сообщений в архиве по подстроке (без учета регистра).
+
+        Args:
+            text (str): Искомый текст
+            limit (int): Максимальное количество результатов
+
+        Returns:
+            list: Список найденных сообщений
+        """
+        needle = text.lower()
+        results = []
+        for row in self.iter_messages():
+            if needle in (row['user_message'] or '').lower() or needle in (row['ai_response'] or '').lower():
+                results.append(row)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def get_summary(self) -> dict:
+        """
+        Получение сводной информации об архиве.
+
+        Returns:
+            dict: Количество сегментов, сообщений и объем архива в байтах
+        """
+        segments = self.index['segments'].values()
+        return {
+            'segments': len(segments),
+            'messages': sum(segment['count'] for segment in segments),
+            'size_bytes': sum(
+                os.path.getsize(os.path.join(self.archive_dir, segment['file']))
+                for segment in segments
+                if os.path.exists(os.path.join(self.archive_dir, segment['file']))
+            ),
+        }
@@ -4,10 +4,64 @@ import json        # Библиотека для работы с JSON форма
 from datetime import datetime  # Библиотека для работы с датой и временем
 import threading   # Библиотека для обеспечения потокобезопасности
 import os
+import time
+import hashlib      # Библиотека для вычисления хэша содержимого сообщений
+import shutil       # Библиотека для проверки свободного места на диске
+from .search import SemanticIndex  # Локальный векторный индекс для поиска похожих сообщений
+from .compression import compress_text, decompress_text, COMPRESSION_THRESHOLD, CODEC_BLOB_REF
 
 #константы путей к файлам
 AUTH_CACHE_FILE = 'auth_cache.json'
 CHAT_DB_NAME = 'chat_cache.db'
+DEFAULT_CONVERSATION_TITLE = 'Новый диалог'
+
+#столбцы сообщения в порядке, возвращаемом методами чтения истории
+MESSAGE_COLUMNS = 'id, model, user_message, ai_response, timestamp, tokens_used'
+
+#время ожидания блокировки базы другим соединением (в секундах)
+BUSY_TIMEOUT = 10.0
+
+#индексы таблицы messages; при массовом импорте они удаляются и создаются заново
+MESSAGE_INDEXES = {
+    #составной индекс: выборка страницы диалога и удаление диалога
+    #затрагивают только строки этого диалога
+    'idx_messages_conversation_timestamp': 'ON messages (conversation_id, timestamp)',
+    #индекс по времени: выборка самых старых сообщений для архивации
+    'idx_messages_timestamp': 'ON messages (timestamp)',
+}
+
+#минимальный размер текста в байтах для хранения в дедуплицирующем хранилище blobs;
+#для коротких текстов ссылка и строка хранилища занимают больше, чем сам текст
+DEDUP_THRESHOLD = 256
+
+#выражение, извлекающее хэш из ссылки на blob (NULL для обычных значений)
+BLOB_REF_SQL = "CASE WHEN typeof({col}) = 'blob' AND substr({col}, 1, 1) = x'02' THEN substr({col}, 2) END"
+
+#таблицы агрегатов аналитики и формат временного интервала (strftime) для каждой
+ANALYTICS_ROLLUPS = {
+    'analytics_rollup_hourly': '%Y-%m-%d %H:00:00',
+    'analytics_rollup_daily': '%Y-%m-%d',
+}
+
+#сохранение дневного скетча квантилей (день, модель, метрика, скетч)
+SAVE_SKETCH_SQL = '''
+    INSERT OR REPLACE INTO analytics_sketches (day, model, metric, sketch)
+    VALUES (?, ?, ?, ?)
+'''
+
+#фазы запроса, сохраняемые в analytics_messages (секунды; tokens_per_second - токенов в секунду)
+PHASE_TIMINGS = (
+    'queue_time',         # Ожидание свободного потока исполнителя
+    'connect_time',       # Соединение и получение заголовков ответа
+    'ttft',               # Время до первого токена
+    'generation_time',    # От первого до последнего токена
+    'tokens_per_second',  # Скорость генерации выходных токенов
+    'parse_time',         # Разбор ответа
+    'db_write_time',      # Запись сообщения в базу
+)
+
+#количество свободных страниц, возвращаемых ОС за один шаг инкрементальной очистки
+RECLAIM_PAGES = 1000
 
 class CacheManager:
     """
@@ -80,10 +134,14 @@ class ChatCache:
     - Очистку истории
     """
     
-    def __init__(self):
+    def __init__(self, deduplicate=False):
         """
         Инициализация системы кэширования.
         
+        Args:
+            deduplicate (bool): Хранить крупные тексты один раз в хранилище blobs
+                               (повторяющиеся запросы и ответы не дублируются)
+        
         Создает:
         - Файл базы данных SQLite
         - Потокобезопасное хранилище соединений
@@ -91,6 +149,11 @@ class ChatCache:
         """
         #имя файла SQLite базы данных
         self.db_name = 'chat_cache.db'
+        self.deduplicate = deduplicate
+        
+        #счетчики обращений к хранилищу blobs: текст уже сохранен / добавлен впервые
+        self.blob_hits = 0
+        self.blob_misses = 0
         
         #создание потокобезопасного хранилища соединений
         #каждый поток будет иметь свое собственное соединение с базой
@@ -99,6 +162,74 @@ class ChatCache:
         #создание необходимых таблиц при инициализации
         self.create_tables()
 
+        #векторный индекс сообщений хранится рядом с базой данных
+        self.search_index = SemanticIndex(os.path.splitext(self.db_name)[0] + '_index')
+        
+        #дозаполнение индекса в фоновом потоке, чтобы не задерживать запуск;
+        #сообщения, сохраненные после запуска, индексирует save_message
+        conn = self.get_connection()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM messages').fetchone()[0]
+        threading.Thread(
+            target=self._backfill_search_index,
+            args=(last_id,),
+            name='SearchBackfill',
+            daemon=True
+        ).start()
+
+    def _backfill_search_index(self, last_id):
+        """
+        Внутренняя функция дозаполнения векторного индекса.
+        
+        Вызывается при запуске в фоновом потоке: индексирует сообщения базы
+        с ID не больше last_id, которых нет в индексе (индекс пуст после
+        обновления приложения, индексация после импорта прервана закрытием
+        приложения и т.п.).
+        
+        Args:
+            last_id (int): Наибольший ID сообщения на момент запуска
+        """
+        cursor = self.get_connection().cursor()
+        message_ids = [row[0] for row in cursor.execute('SELECT id FROM messages WHERE id <= ?', (last_id,))]
+        missing = self.search_index.missing(message_ids)
+        #пакетами, чтобы число параметров запроса не превышало ограничений SQLite
+        for i in range(0, len(missing), 500):
+            batch = missing[i:i + 500]
+            placeholders = ','.join('?' for _ in batch)
+            cursor.execute(f'''
+                SELECT id, user_message, ai_response FROM messages
+                WHERE id IN ({placeholders}) ORDER BY id ASC
+            ''', batch)
+            self._index_rows(cursor)
+        if missing:
+            self.search_index.flush()
+
+    def _index_rows(self, cursor):
+        """
+        Внутренняя функция добавления в векторный индекс строк (id, user_message, ai_response)
+        из курсора без сохранения метаданных после каждой строки.
+        """
+        for message_id, user_message, ai_response in cursor:
+            user_message = self._decode_text(user_message) or ''
+            ai_response = self._decode_text(ai_response) or ''
+            self.search_index.add(message_id, f"{user_message} {ai_response}", persist=False)
+
+    def index_messages_after(self, last_id):
+        """
+        Добавление в векторный индекс всех сообщений с ID больше заданного.
+        Используется после массового импорта.
+        
+        Args:
+            last_id (int): ID, после которого начинается индексация
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, user_message, ai_response FROM messages WHERE id > ? ORDER BY id ASC',
+            (last_id,)
+        )
+        self._index_rows(cursor)
+        self.search_index.flush()
+
     def get_connection(self):
         """
         Получение соединения с базой данных для текущего потока.
@@ -113,13 +244,21 @@ class ChatCache:
         #проверяем, есть ли уже соединение в текущем потоке
         if not hasattr(self.local, 'connection'):
             #если соединения нет - создаем новое
-            self.local.connection = sqlite3.connect(self.db_name)
+            #ожидание блокировки вместо немедленной ошибки "database is locked"
+            self.local.connection = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
         return self.local.connection
 
     def create_tables(self):
         """
         Создание необходимых таблиц в базе данных.
         
+        Создает таблицу conversations (диалоги) со следующими полями:
+        - id: уникальный идентификатор диалога
+        - title: название диалога
+        - created_at: время создания
+        - updated_at: время последнего сообщения или изменения
+        - archived: признак архивного диалога
+        
         Создает таблицу messages со следующими полями:
         - id: уникальный идентификатор сообщения
         - model: идентификатор использованной модели
@@ -127,12 +266,33 @@ class ChatCache:
         - ai_response: ответ AI модели
         - timestamp: время создания сообщения
         - tokens_used: количество использованных токенов
+        - conversation_id: ID диалога, к которому относится сообщение
         """
         #создаем новое соединение с базой
-        conn = sqlite3.connect(self.db_name)
+        conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
         cursor = conn.cursor()
         
+        #включение инкрементального auto-vacuum, чтобы освобожденные после удаления
+        #страницы можно было вернуть ОС без полной перезаписи файла.
+        #для новой базы режим применяется сразу; существующую нужно один раз
+        #перестроить, что выполняется в фоне (см. enable_incremental_vacuum)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        #журнал WAL: длительное чтение (экспорт, индексация, фоновые миграции)
+        #не блокирует запись сообщений из основного потока; режим сохраняется в файле базы
+        cursor.execute('PRAGMA journal_mode = WAL')
+        
         #SQL запросы для создания таблиц
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,  -- Уникальный ID диалога
+                title TEXT,                           -- Название диалога
+                created_at DATETIME,                  -- Время создания
+                updated_at DATETIME,                  -- Время последнего изменения
+                archived INTEGER DEFAULT 0            -- Признак архивного диалога
+            )
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,  -- Уникальный ID сообщения
@@ -140,10 +300,75 @@ class ChatCache:
                 user_message TEXT,                    -- Текст от пользователя
                 ai_response TEXT,                     -- Ответ от AI
                 timestamp DATETIME,                   -- Время создания
-                tokens_used INTEGER                   -- Использовано токенов
+                tokens_used INTEGER,                  -- Использовано токенов
+                conversation_id INTEGER REFERENCES conversations(id),  -- ID диалога
+                content_hash BLOB                     -- Хэш содержимого для дедупликации
             )
         ''')
         
+        #миграция баз, созданных до появления диалогов
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(messages)')]
+        if 'conversation_id' not in columns:
+            cursor.execute('''
+                ALTER TABLE messages
+                ADD COLUMN conversation_id INTEGER REFERENCES conversations(id)
+            ''')
+        
+        #существующие сообщения без диалога переносятся в диалог по умолчанию
+        cursor.execute('SELECT 1 FROM messages WHERE conversation_id IS NULL LIMIT 1')
+        if cursor.fetchone():
+            now = datetime.now()
+            cursor.execute('''
+                INSERT INTO conversations (title, created_at, updated_at, archived)
+                VALUES (?, ?, ?, 0)
+            ''', (DEFAULT_CONVERSATION_TITLE, now, now))
+            cursor.execute(
+                'UPDATE messages SET conversation_id = ? WHERE conversation_id IS NULL',
+                (cursor.lastrowid,)
+            )
+        
+        #миграция баз, созданных до появления хэша содержимого (для дедупликации при импорте)
+        if 'content_hash' not in columns:
+            cursor.execute('ALTER TABLE messages ADD COLUMN content_hash BLOB')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_messages_content_hash
+            ON messages (content_hash)
+        ''')
+        
+        self.create_message_indexes(cursor)
+        
+        #хранилище текстов с адресацией по содержимому (дедупликация)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash BLOB PRIMARY KEY,     -- SHA-1 исходного текста
+                data BLOB,                 -- Текст (возможно, сжатый)
+                refcount INTEGER           -- Количество сообщений, ссылающихся на текст
+            ) WITHOUT ROWID
+        ''')
+        
+        #счетчики ссылок поддерживаются триггерами, поэтому любое удаление
+        #сообщений (clear_history, удаление диалога, архивация) освобождает тексты
+        refs = (f"({BLOB_REF_SQL.format(col='{row}.user_message')}, "
+                f"{BLOB_REF_SQL.format(col='{row}.ai_response')})")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS messages_blob_refs_insert
+            AFTER INSERT ON messages
+            BEGIN
+                UPDATE blobs SET refcount = refcount + 1
+                WHERE hash IN {refs.format(row='NEW')};
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS messages_blob_refs_delete
+            AFTER DELETE ON messages
+            BEGIN
+                UPDATE blobs SET refcount = refcount - 1
+                WHERE hash IN {refs.format(row='OLD')};
+                DELETE FROM blobs
+                WHERE refcount <= 0 AND hash IN {refs.format(row='OLD')};
+            END
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS analytics_messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -155,10 +380,89 @@ class ChatCache:
             )
         ''')
         
+        #миграция: столбцы фаз запроса (NULL для записей без измерений)
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(analytics_messages)')]
+        for phase in PHASE_TIMINGS:
+            if phase not in columns:
+                cursor.execute(f'ALTER TABLE analytics_messages ADD COLUMN {phase} REAL')
+        
+        #агрегаты аналитики по моделям за час и за день: количество сообщений,
+        #суммы токенов, длин, времени ответа и квадратов времени ответа
+        #(последние позволяют получить среднее и стандартное отклонение)
+        for table in ANALYTICS_ROLLUPS:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT,                    -- Начало интервала
+                    model TEXT,                     -- Идентификатор модели
+                    count INTEGER,                  -- Количество сообщений
+                    tokens_sum INTEGER,             -- Сумма токенов
+                    message_length_sum INTEGER,     -- Сумма длин сообщений
+                    response_time_sum REAL,         -- Сумма времени ответа
+                    response_time_sq_sum REAL,      -- Сумма квадратов времени ответа
+                    PRIMARY KEY (bucket, model)
+                ) WITHOUT ROWID
+            ''')
+        
+        #дневные агрегаты фаз запроса по моделям: у части запросов некоторые фазы
+        #не измеряются (например, скорость при ошибке), поэтому счетчик ведется по каждой фазе
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_phase_rollup_daily (
+                bucket TEXT,        -- День
+                model TEXT,         -- Идентификатор модели
+                phase TEXT,         -- Фаза из PHASE_TIMINGS
+                count INTEGER,      -- Количество измерений
+                value_sum REAL,     -- Сумма значений
+                PRIMARY KEY (bucket, model, phase)
+            ) WITHOUT ROWID
+        ''')
+        
+        #дневные скетчи квантилей метрик по моделям (см. utils.sketch);
+        #скетчи за несколько дней объединяются слиянием
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_sketches (
+                day TEXT,           -- День (YYYY-MM-DD)
+                model TEXT,         -- Идентификатор модели
+                metric TEXT,        -- Метрика: response_time или tokens
+                sketch BLOB,        -- Сериализованный QuantileSketch
+                PRIMARY KEY (day, model, metric)
+            ) WITHOUT ROWID
+        ''')
+        
         conn.commit()  #сохранение изменений в базе
         conn.close()   #закрытие соединения
 
-    def save_message(self, model, user_message, ai_response, tokens_used):
+    @staticmethod
+    def create_message_indexes(cursor):
+        """
+        Создание индексов таблицы messages (если их еще нет).
+        
+        Args:
+            cursor (sqlite3.Cursor): Курсор открытого соединения
+        """
+        for name, definition in MESSAGE_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+
+    @staticmethod
+    def content_hash(timestamp, model, user_message, ai_response):
+        """
+        Вычисление хэша содержимого сообщения.
+        
+        Одинаковые сообщения (например, при повторном импорте одного файла)
+        дают одинаковый хэш, что позволяет пропускать дубликаты.
+        
+        Args:
+            timestamp: Время создания сообщения
+            model (str): Идентификатор модели
+            user_message (str): Текст сообщения пользователя
+            ai_response (str): Ответ AI модели
+            
+        Returns:
+            bytes: SHA-1 дайджест (20 байт)
+        """
+        key = '\x1f'.join((str(timestamp), model or '', user_message or '', ai_response or ''))
+        return hashlib.sha1(key.encode('utf-8')).digest()
+
+    def save_message(self, model, user_message, ai_response, tokens_used, conversation_id=None):
         """
         Сохранение нового сообщения в базу данных.
         
@@ -167,60 +471,754 @@ class ChatCache:
             user_message (str): Текст сообщения пользователя
             ai_response (str): Ответ AI модели
             tokens_used (int): Количество использованных токенов
+            conversation_id (int): ID диалога (по умолчанию - последний активный диалог)
+            
+        Returns:
+            int: ID сохраненного сообщения
         """
         conn = self.get_connection()  #получение соединения для текущего потока
         cursor = conn.cursor()
         
-        #вставка новой записи в таблицу messages
-        cursor.execute('''
-            INSERT INTO messages (model, user_message, ai_response, timestamp, tokens_used)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (model, user_message, ai_response, datetime.now(), tokens_used))
-        conn.commit()  #сохранение изменений
+        if conversation_id is None:
+            conversation_id = self.get_default_conversation()
+        timestamp = datetime.now()
+        
+        #тексты в хранилище blobs, сообщение и время активности диалога сохраняются
+        #одной транзакцией: при ошибке не остается текстов без ссылок на них
+        try:
+            #вставка новой записи в таблицу messages
+            cursor.execute('''
+                INSERT INTO messages (model, user_message, ai_response, timestamp, tokens_used,
+                                      conversation_id, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (model, self.encode_text(user_message, cursor), self.encode_text(ai_response, cursor),
+                  timestamp, tokens_used, conversation_id,
+                  self.content_hash(timestamp, model, user_message, ai_response)))
+            message_id = cursor.lastrowid
+            
+            #обновление времени последней активности диалога
+            cursor.execute(
+                'UPDATE conversations SET updated_at = ? WHERE id = ?',
+                (timestamp, conversation_id)
+            )
+            conn.commit()  #сохранение изменений
+        except BaseException:
+            conn.rollback()
+            raise
+        
+        #инкрементальное обновление векторного индекса
+        self.search_index.add(message_id, f"{user_message} {ai_response}")
+        return message_id
+
+    def find_similar(self, text, top_k=5, exclude_id=None, archive=None):
+        """
+        Поиск сообщений, похожих по смыслу на заданный текст.
+        
+        Args:
+            text (str): Текст запроса (например, содержимое сообщения)
+            top_k (int): Максимальное количество результатов
+            exclude_id (int): ID сообщения, исключаемого из выдачи
+            archive (HistoryArchiver): Архив, в котором ищутся сообщения,
+                                       перенесенные из базы (необязательно)
+            
+        Returns:
+            list: Список кортежей (score, row), где row имеет тот же формат,
+                 что и записи get_chat_history, в порядке убывания близости
+        """
+        matches = self.search_index.search(text, top_k=top_k, exclude_id=exclude_id)
+        if not matches:
+            return []
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' for _ in matches)
+        cursor.execute(f'''
+            SELECT {MESSAGE_COLUMNS} FROM messages
+            WHERE id IN ({placeholders})
+        ''', [message_id for message_id, _ in matches])
+        rows = {row[0]: self._decode_row(row) for row in cursor.fetchall()}
+        
+        #сообщения, перенесенные в архив, остаются в векторном индексе
+        missing = [message_id for message_id, _ in matches if message_id not in rows]
+        if missing and archive is not None:
+            for message_id, row in archive.get_messages(missing).items():
+                rows[message_id] = (message_id, row['model'], row['user_message'],
+                                    row['ai_response'], row['timestamp'], row['tokens_used'])
+        
+        #сохранение порядка по убыванию близости, пропуск удаленных сообщений
+        return [
+            (score, rows[message_id])
+            for message_id, score in matches
+            if message_id in rows
+        ]
 
-    def get_chat_history(self, limit=50):
+    def get_chat_history(self, limit=50, conversation_id=None, before=None):
         """
         Получение последних сообщений из истории чата.
         
         Args:
             limit (int): Максимальное количество возвращаемых сообщений
+            conversation_id (int): ID диалога (None - сообщения всех диалогов)
+            before (tuple): Ключ (timestamp, id) последнего сообщения предыдущей
+                            страницы: вернуть только более старые сообщения
+                            (для постраничной загрузки более старой истории)
             
         Returns:
-            list: Список кортежей с данными сообщений, отсортированных
-                 по времени в обратном порядке (новые сначала)
+            list: Список кортежей (id, model, user_message, ai_response,
+                 timestamp, tokens_used), отсортированных
+                 по времени и ID в обратном порядке (новые сначала)
         """
         conn = self.get_connection()  #получение соединения для текущего потока
         cursor = conn.cursor()
         
-        #получение последних сообщений с ограничением по количеству
+        conditions, params = [], []
+        if conversation_id is not None:
+            conditions.append('conversation_id = ?')
+            params.append(conversation_id)
+        if before is not None:
+            #ключ страницы включает ID: сообщения с одинаковым временем
+            #на границе страниц (импорт, секундная точность) не пропускаются
+            conditions.append('(timestamp, id) < (?, ?)')
+            params.extend(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        #страница читается по индексу (conversation_id, timestamp) или (timestamp):
+        #ID строки входит в индекс, поэтому сортировка по нему не требует отдельного прохода
+        cursor.execute(f'''
+            SELECT {MESSAGE_COLUMNS} FROM messages
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', (*params, limit))
+        return [self._decode_row(row) for row in cursor.fetchall()]  #возврат всех найденных записей
+
+    def _decode_row(self, row):
+        """
+        Внутренняя функция распаковки текстов сообщения.
+        
+        Тексты распаковываются только при чтении строк для отображения
+        или экспорта; остальные запросы (подсчеты, удаление, аналитика)
+        сжатые данные не затрагивают.
+        
+        Args:
+            row (tuple): Строка в порядке MESSAGE_COLUMNS
+            
+        Returns:
+            tuple: Строка с распакованными user_message и ai_response
+        """
+        return row[:2] + (self._decode_text(row[2]), self._decode_text(row[3])) + row[4:]
+
+    def _decode_text(self, value):
+        """
+        Внутренняя функция получения исходного текста из значения столбца.
+        
+        Разрешает ссылки на хранилище blobs и распаковывает сжатые данные.
+        
+        Args:
+            value (str | bytes | None): Значение столбца user_message или ai_response
+            
+        Returns:
+            str | None: Исходный текст
+        """
+        if isinstance(value, bytes) and value[:1] == CODEC_BLOB_REF:
+            cursor = self.get_connection().cursor()
+            cursor.execute('SELECT data FROM blobs WHERE hash = ?', (value[1:],))
+            row = cursor.fetchone()
+            value = row[0] if row else None
+        return decompress_text(value)
+
+    def encode_text(self, text, cursor):
+        """
+        Подготовка текста к записи в столбец user_message или ai_response.
+        
+        Крупный текст сжимается. При включенной дедупликации он сохраняется
+        в хранилище blobs (один раз на одинаковое содержимое), а в столбец
+        записывается ссылка. Счетчики ссылок ведут триггеры таблицы messages.
+        
+        Args:
+            text (str): Исходный текст
+            cursor (sqlite3.Cursor): Курсор транзакции, в которой вставляется сообщение
+            
+        Returns:
+            str | bytes: Значение для записи в столбец
+        """
+        if not self.deduplicate or not isinstance(text, str):
+            return compress_text(text)
+        raw = text.encode('utf-8')
+        if len(raw) < DEDUP_THRESHOLD:
+            return compress_text(text)
+        digest = hashlib.sha1(raw).digest()
+        cursor.execute(
+            'INSERT OR IGNORE INTO blobs (hash, data, refcount) VALUES (?, ?, 0)',
+            (digest, compress_text(text))
+        )
+        if cursor.rowcount:
+            self.blob_misses += 1
+        else:
+            self.blob_hits += 1
+        return CODEC_BLOB_REF + digest
+
+    def create_conversation(self, title=DEFAULT_CONVERSATION_TITLE):
+        """
+        Создание нового диалога.
+        
+        Args:
+            title (str): Название диалога
+            
+        Returns:
+            int: ID созданного диалога
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
         cursor.execute('''
-            SELECT * FROM messages
-            ORDER BY timestamp DESC
+            INSERT INTO conversations (title, created_at, updated_at, archived)
+            VALUES (?, ?, ?, 0)
+        ''', (title, now, now))
+        conn.commit()
+        return cursor.lastrowid
+
+    def list_conversations(self, include_archived=False):
+        """
+        Получение списка диалогов.
+        
+        Args:
+            include_archived (bool): Включать ли архивные диалоги
+            
+        Returns:
+            list: Список кортежей (id, title, created_at, updated_at, archived),
+                 отсортированных по времени последней активности (новые сначала)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, title, created_at, updated_at, archived
+            FROM conversations
+            {'' if include_archived else 'WHERE archived = 0'}
+            ORDER BY updated_at DESC
+        ''')
+        return cursor.fetchall()
+
+    def rename_conversation(self, conversation_id, title):
+        """
+        Переименование диалога.
+        
+        Args:
+            conversation_id (int): ID диалога
+            title (str): Новое название
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'UPDATE conversations SET title = ? WHERE id = ?',
+            (title, conversation_id)
+        )
+        conn.commit()
+
+    def archive_conversation(self, conversation_id, archived=True):
+        """
+        Перемещение диалога в архив или возврат из архива.
+        
+        Args:
+            conversation_id (int): ID диалога
+            archived (bool): True - в архив, False - вернуть из архива
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'UPDATE conversations SET archived = ? WHERE id = ?',
+            (1 if archived else 0, conversation_id)
+        )
+        conn.commit()
+
+    def delete_conversation(self, conversation_id, archive=None):
+        """
+        Удаление диалога вместе со всеми его сообщениями.
+        
+        Благодаря индексу по conversation_id затрагиваются только строки
+        удаляемого диалога, без перезаписи всей таблицы.
+        
+        Args:
+            conversation_id (int): ID диалога
+            archive (HistoryArchiver): Архив, из которого также удаляются
+                                       перенесенные сообщения диалога (необязательно)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id FROM messages WHERE conversation_id = ?',
+            (conversation_id,)
+        )
+        message_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('DELETE FROM messages WHERE conversation_id = ?', (conversation_id,))
+        cursor.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
+        conn.commit()
+        if archive is not None:
+            message_ids += archive.purge(conversation_id)
+        self.search_index.remove(message_ids)  #удаление сообщений из векторного индекса
+        self.reclaim_space()                   #возврат освободившихся страниц
+
+    def get_default_conversation(self):
+        """
+        Получение последнего активного (неархивного) диалога.
+        Если такого нет - создается новый.
+        
+        Returns:
+            int: ID диалога
+        """
+        conversations = self.list_conversations()
+        if conversations:
+            return conversations[0][0]
+        return self.create_conversation()
+
+    @staticmethod
+    def _build_filters(start=None, end=None, model=None, conversation_id=None):
+        """
+        Внутренняя функция построения условия WHERE для фильтров истории.
+        
+        Args:
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+            conversation_id (int): ID диалога
+            
+        Returns:
+            tuple: (строка условия WHERE или пустая строка, список параметров)
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('m.timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('m.timestamp < ?')
+            params.append(end)
+        if model:
+            conditions.append('m.model = ?')
+            params.append(model)
+        if conversation_id is not None:
+            conditions.append('m.conversation_id = ?')
+            params.append(conversation_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+
+    def count_messages(self, start=None, end=None, model=None, conversation_id=None):
+        """
+        Получение количества сохраненных сообщений.
+        
+        Args:
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+            conversation_id (int): ID диалога
+        
+        Returns:
+            int: Количество сообщений, подходящих под фильтры
+                (без фильтров - во всех диалогах)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        where, params = self._build_filters(start, end, model, conversation_id)
+        cursor.execute(f'SELECT COUNT(*) FROM messages AS m {where}', params)
+        return cursor.fetchone()[0]
+
+    def iter_messages(self, start=None, end=None, model=None, conversation_id=None,
+                      batch_size=500):
+        """
+        Потоковое чтение сообщений для экспорта.
+        
+        Строки читаются из курсора порциями по batch_size, поэтому расход памяти
+        не зависит от размера истории. Тексты распаковываются по одной строке.
+        
+        Args:
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+            conversation_id (int): ID диалога
+            batch_size (int): Количество строк, читаемых из курсора за раз
+            
+        Yields:
+            dict: Сообщение с полями timestamp, model, user_message, ai_response,
+                 tokens_used, conversation_id, conversation_title
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        where, params = self._build_filters(start, end, model, conversation_id)
+        cursor.execute(f'''
+            SELECT m.timestamp, m.model, m.user_message, m.ai_response, m.tokens_used,
+                   m.conversation_id, c.title
+            FROM messages AS m
+            LEFT JOIN conversations AS c ON c.id = m.conversation_id
+            {where}
+            ORDER BY m.timestamp ASC, m.id ASC
+        ''', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    "timestamp": row[0],
+                    "model": row[1],
+                    "user_message": self._decode_text(row[2]),
+                    "ai_response": self._decode_text(row[3]),
+                    "tokens_used": row[4],
+                    "conversation_id": row[5],
+                    "conversation_title": row[6]
+                }
+
+    def get_database_size(self):
+        """
+        Получение объема данных базы без учета свободных страниц.
+        
+        Returns:
+            int: Объем занятых страниц в байтах
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def get_message_storage_size(self):
+        """
+        Получение объема текстов сообщений (для политики хранения по объему).
+        
+        В отличие от get_database_size не учитывает таблицы аналитики
+        и служебные данные, которые архивацией не уменьшаются.
+        
+        Returns:
+            int: Суммарный размер столбцов user_message и ai_response в байтах
+                 (в хранимом виде: сжатые тексты и ссылки на blobs - по их размеру)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(COALESCE(length(CAST(user_message AS BLOB)), 0)
+                              + COALESCE(length(CAST(ai_response AS BLOB)), 0)), 0)
+            FROM messages
+        ''')
+        return cursor.fetchone()[0]
+
+    def get_oldest_messages(self, limit=200, before=None):
+        """
+        Получение самых старых сообщений (для переноса в архив).
+        
+        Args:
+            limit (int): Максимальное количество сообщений
+            before (datetime): Только сообщения старше указанного времени
+            
+        Returns:
+            list: Список словарей с полями id, conversation_id, model,
+                 user_message, ai_response, timestamp, tokens_used
+                 в порядке возрастания времени
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        #выборка идет по индексу времени, поэтому условие добавляется только при наличии границы
+        where = 'WHERE timestamp < ?' if before is not None else ''
+        params = (before, limit) if before is not None else (limit,)
+        cursor.execute(f'''
+            SELECT {MESSAGE_COLUMNS}, conversation_id FROM messages
+            {where}
+            ORDER BY timestamp ASC, id ASC
             LIMIT ?
-        ''', (limit,))
-        return cursor.fetchall()  #возврат всех найденных записей
+        ''', params)
+        return [
+            {
+                "id": row[0],
+                "conversation_id": row[6],
+                "model": row[1],
+                "user_message": row[2],
+                "ai_response": row[3],
+                "timestamp": row[4],
+                "tokens_used": row[5]
+            }
+            for row in map(self._decode_row, cursor.fetchall())
+        ]
 
-    def save_analytics(self, timestamp, model, message_length, response_time, tokens_used):
+    def delete_messages(self, message_ids, unindex=True):
+        """
+        Удаление сообщений по списку ID в одной транзакции.
+        
+        Args:
+            message_ids (list): Список ID удаляемых сообщений
+            unindex (bool): Удалять ли сообщения из векторного индекса
+                            (False при переносе в архив: они остаются доступны поиску)
+        """
+        if not message_ids:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany(
+            'DELETE FROM messages WHERE id = ?',
+            [(message_id,) for message_id in message_ids]
+        )
+        conn.commit()
+        if unindex:
+            self.search_index.remove(message_ids)  #удаление сообщений из векторного индекса
+
+    def save_analytics(self, timestamp, model, message_length, response_time, tokens_used, timings=None,
+                       sketches=None):
         """
         Сохранение данных аналитики в базу данных.
         
+        Запись, агрегаты и скетчи сохраняются одной транзакцией (одна фиксация на сообщение).
+        
         Args:
             timestamp (datetime): Время создания записи
             model (str): Идентификатор использованной модели
             message_length (int): Длина сообщения
             response_time (float): Время ответа
             tokens_used (int): Количество использованных токенов
+            timings (dict): Фазы запроса (ключи из PHASE_TIMINGS, необязательно)
+            sketches (list): Обновленные скетчи [(день, модель, метрика, bytes), ...] (необязательно)
         """
         conn = self.get_connection()
         cursor = conn.cursor()
+        timings = {phase: value for phase, value in (timings or {}).items()
+                   if phase in PHASE_TIMINGS and value is not None}
         
-        cursor.execute('''
+        cursor.execute(f'''
             INSERT INTO analytics_messages
-            (timestamp, model, message_length, response_time, tokens_used)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (timestamp, model, message_length, response_time, tokens_used))
+            (timestamp, model, message_length, response_time, tokens_used, {', '.join(PHASE_TIMINGS)})
+            VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(PHASE_TIMINGS))})
+        ''', (timestamp, model, message_length, response_time, tokens_used,
+              *(timings.get(phase) for phase in PHASE_TIMINGS)))
+        
+        #агрегаты фаз запроса
+        cursor.executemany('''
+            INSERT INTO analytics_phase_rollup_daily AS r (bucket, model, phase, count, value_sum)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (bucket, model, phase) DO UPDATE SET
+                count = r.count + 1,
+                value_sum = r.value_sum + excluded.value_sum
+        ''', [(timestamp.strftime('%Y-%m-%d'), model, phase, value) for phase, value in timings.items()])
+        
+        #обновление агрегатов в той же транзакции, что и вставка записи
+        for table, bucket_format in ANALYTICS_ROLLUPS.items():
+            cursor.execute(f'''
+                INSERT INTO {table} AS r
+                (bucket, model, count, tokens_sum, message_length_sum,
+                 response_time_sum, response_time_sq_sum)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (bucket, model) DO UPDATE SET
+                    count = r.count + 1,
+                    tokens_sum = r.tokens_sum + excluded.tokens_sum,
+                    message_length_sum = r.message_length_sum + excluded.message_length_sum,
+                    response_time_sum = r.response_time_sum + excluded.response_time_sum,
+                    response_time_sq_sum = r.response_time_sq_sum + excluded.response_time_sq_sum
+            ''', (timestamp.strftime(bucket_format), model, tokens_used, message_length,
+                  response_time, response_time * response_time))
+        
+        #скетчи квантилей - в той же транзакции
+        cursor.executemany(SAVE_SKETCH_SQL, sketches or [])
         conn.commit()
 
+    def get_model_usage_rollup(self):
+        """
+        Получение итоговой статистики по моделям из дневных агрегатов.
+        
+        Returns:
+            list: Список кортежей (model, count, tokens_sum, message_length_sum,
+                 response_time_sum, response_time_sq_sum)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT model, SUM(count), SUM(tokens_sum), SUM(message_length_sum),
+                   SUM(response_time_sum), SUM(response_time_sq_sum)
+            FROM analytics_rollup_daily
+            GROUP BY model
+        ''')
+        return cursor.fetchall()
+
+    def get_phase_timings(self, start=None, end=None, model=None):
+        """
+        Средние значения фаз запроса по моделям из дневных агрегатов.
+        
+        Args:
+            start (str): Первый день (включительно), формат YYYY-MM-DD
+            end (str): Последний день (не включительно), формат YYYY-MM-DD
+            model (str): Идентификатор модели (None - все модели)
+            
+        Returns:
+            dict: Модель -> {фаза -> среднее значение}
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('bucket >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('bucket < ?')
+            params.append(end)
+        if model:
+            conditions.append('model = ?')
+            params.append(model)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT model, phase, SUM(value_sum) / SUM(count)
+            FROM analytics_phase_rollup_daily
+            {where}
+            GROUP BY model, phase
+        ''', params)
+        result = {}
+        for row_model, phase, average in cursor.fetchall():
+            result.setdefault(row_model, {})[phase] = average
+        return result
+
+    def get_analytics_rollup(self, granularity='hourly', start=None, end=None, model=None):
+        """
+        Получение агрегатов аналитики за период.
+        
+        Args:
+            granularity (str): 'hourly' или 'daily'
+            start (str): Нижняя граница интервала (включительно)
+            end (str): Верхняя граница интервала (не включительно)
+            model (str): Идентификатор модели (None - все модели)
+            
+        Returns:
+            list: Список кортежей (bucket, model, count, tokens_sum, message_length_sum,
+                 response_time_sum, response_time_sq_sum) по возрастанию времени
+        """
+        table = f'analytics_rollup_{granularity}'
+        if table not in ANALYTICS_ROLLUPS:
+            raise ValueError(f"Unknown rollup granularity: {granularity}")
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('bucket >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('bucket < ?')
+            params.append(end)
+        if model:
+            conditions.append('model = ?')
+            params.append(model)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT bucket, model, count, tokens_sum, message_length_sum,
+                   response_time_sum, response_time_sq_sum
+            FROM {table}
+            {where}
+            ORDER BY bucket ASC
+        ''', params)
+        return cursor.fetchall()
+
+    def rebuild_analytics_rollups(self):
+        """
+        Полное перестроение агрегатов аналитики по таблице analytics_messages.
+        
+        Нужно для баз, созданных до появления агрегатов, и для восстановления
+        после ручного редактирования данных. Выполняется одной транзакцией.
+        
+        Returns:
+            int: Количество обработанных записей аналитики
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            for table, bucket_format in ANALYTICS_ROLLUPS.items():
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(f'''
+                    INSERT INTO {table}
+                    (bucket, model, count, tokens_sum, message_length_sum,
+                     response_time_sum, response_time_sq_sum)
+                    SELECT strftime('{bucket_format}', timestamp), model, COUNT(*),
+                           COALESCE(SUM(tokens_used), 0), COALESCE(SUM(message_length), 0),
+                           COALESCE(SUM(response_time), 0),
+                           COALESCE(SUM(response_time * response_time), 0)
+                    FROM analytics_messages
+                    GROUP BY 1, 2
+                ''')
+            cursor.execute('DELETE FROM analytics_phase_rollup_daily')
+            for phase in PHASE_TIMINGS:
+                cursor.execute(f'''
+                    INSERT INTO analytics_phase_rollup_daily (bucket, model, phase, count, value_sum)
+                    SELECT strftime('%Y-%m-%d', timestamp), model, ?, COUNT({phase}), SUM({phase})
+                    FROM analytics_messages
+                    WHERE {phase} IS NOT NULL
+                    GROUP BY 1, 2
+                ''', (phase,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        cursor.execute('SELECT COUNT(*) FROM analytics_messages')
+        return cursor.fetchone()[0]
+
+    def analytics_rollups_missing(self):
+        """
+        Возвращает True, если записи аналитики есть, а агрегатов нет
+        (база создана до появления агрегатов).
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        has_records = cursor.execute('SELECT 1 FROM analytics_messages LIMIT 1').fetchone()
+        has_rollups = cursor.execute('SELECT 1 FROM analytics_rollup_daily LIMIT 1').fetchone()
+        return bool(has_records) and not has_rollups
+
+    def sketches_missing(self):
+        """
+        Возвращает True, если записи аналитики есть, а скетчей квантилей нет
+        (база создана до их появления).
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        has_records = cursor.execute('SELECT 1 FROM analytics_messages LIMIT 1').fetchone()
+        has_sketches = cursor.execute('SELECT 1 FROM analytics_sketches LIMIT 1').fetchone()
+        return bool(has_records) and not has_sketches
+
+    def save_sketch(self, day, model, metric, sketch):
+        """
+        Сохранение скетча квантилей метрики модели за день.
+        
+        Args:
+            day (str): День в формате YYYY-MM-DD
+            model (str): Идентификатор модели
+            metric (str): Имя метрики
+            sketch (bytes): Сериализованный скетч (QuantileSketch.to_bytes)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(SAVE_SKETCH_SQL, (day, model, metric, sketch))
+        conn.commit()
+
+    def get_sketches(self, metric, start=None, end=None, model=None):
+        """
+        Получение дневных скетчей метрики за период.
+        
+        Args:
+            metric (str): Имя метрики
+            start (str): Первый день (включительно), формат YYYY-MM-DD
+            end (str): Последний день (не включительно), формат YYYY-MM-DD
+            model (str): Идентификатор модели (None - все модели)
+            
+        Returns:
+            list: Список кортежей (day, model, sketch)
+        """
+        conditions, params = ['metric = ?'], [metric]
+        if start is not None:
+            conditions.append('day >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('day < ?')
+            params.append(end)
+        if model:
+            conditions.append('model = ?')
+            params.append(model)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT day, model, sketch FROM analytics_sketches
+            WHERE {' AND '.join(conditions)}
+            ORDER BY day ASC
+        ''', params)
+        return cursor.fetchall()
+
     def get_analytics_history(self):
         """
         Получение всей истории аналитики.
@@ -249,22 +1247,216 @@ class ChatCache:
         if hasattr(self.local, 'connection'):
             self.local.connection.close()  #закрытие соединения
             
-    def clear_history(self):
+    def clear_history(self, archive=None):
         """
         Очистка всей истории сообщений.
         
         Удаляет все записи из таблицы messages,
         эффективно очищая всю историю чата.
+        
+        Args:
+            archive (HistoryArchiver): Архив, который очищается вместе
+                                       с историей (необязательно)
         """
         conn = self.get_connection()  # Получение соединения
         cursor = conn.cursor()
         cursor.execute('DELETE FROM messages')  # Удаление всех записей
         conn.commit()  # Сохранение изменений
+        if archive is not None:
+            archive.purge()        # Удаление перенесенных в архив сообщений
+        self.search_index.clear()  # Очистка векторного индекса
+        self.reclaim_space()       # Возврат освободившихся страниц
+
+    def fill_content_hashes(self, batch_size=1000):
+        """
+        Вычисление хэша содержимого для сообщений, сохраненных до его появления.
+        
+        Args:
+            batch_size (int): Количество строк в одной транзакции
+            
+        Returns:
+            int: Количество обновленных строк
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        updated = 0
+        while True:
+            cursor.execute('''
+                SELECT id, timestamp, model, user_message, ai_response FROM messages
+                WHERE content_hash IS NULL
+                LIMIT ?
+            ''', (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                'UPDATE messages SET content_hash = ? WHERE id = ?',
+                [
+                    (self.content_hash(timestamp, model, self._decode_text(user_message),
+                                       self._decode_text(ai_response)), message_id)
+                    for message_id, timestamp, model, user_message, ai_response in rows
+                ]
+            )
+            conn.commit()
+            updated += len(rows)
+        return updated
+
+    def get_dedup_report(self):
+        """
+        Отчет об экономии места за счет дедупликации текстов.
+        
+        Returns:
+            dict: Статистика хранилища blobs:
+                - blobs: количество уникальных текстов
+                - references: количество ссылок на них из сообщений
+                - stored_bytes: объем, занимаемый текстами в хранилище
+                - saved_bytes: объем, который заняли бы повторные копии
+                  (за вычетом размера ссылок)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(refcount), 0),
+                   COALESCE(SUM(length(data)), 0),
+                   COALESCE(SUM((refcount - 1) * length(data)), 0)
+            FROM blobs
+        ''')
+        blobs, references, stored_bytes, duplicate_bytes = cursor.fetchone()
+        reference_size = len(CODEC_BLOB_REF) + hashlib.sha1().digest_size
+        return {
+            'blobs': blobs,
+            'references': references,
+            'stored_bytes': stored_bytes,
+            'saved_bytes': max(duplicate_bytes - references * reference_size, 0)
+        }
 
-    def get_formatted_history(self):
+    def reclaim_space(self, max_pages=RECLAIM_PAGES):
+        """
+        Инкрементальный возврат свободных страниц базы данных ОС.
+        
+        За один вызов освобождается не более max_pages страниц,
+        поэтому операция не блокирует базу надолго.
+        
+        Args:
+            max_pages (int): Максимальное количество освобождаемых страниц
+            
+        Returns:
+            int: Количество свободных страниц, оставшихся в файле
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        #executescript выполняет прагму до конца; через execute модуль sqlite3
+        #делает только один шаг, освобождая одну страницу
+        conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)})')
+        return cursor.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def enable_incremental_vacuum(self):
+        """
+        Однократный перевод существующей базы в режим инкрементального auto-vacuum.
+        
+        Требует полной перезаписи файла (VACUUM) и до двух размеров базы
+        свободного места на диске, поэтому выполняется в фоновом потоке
+        и пропускается, если места недостаточно.
+        
+        Returns:
+            bool: True, если режим включен (в том числе ранее)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return True
+        db_size = os.path.getsize(self.db_name)
+        free = shutil.disk_usage(os.path.dirname(os.path.abspath(self.db_name))).free
+        if free < 2 * db_size:
+            return False
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.commit()
+        try:
+            cursor.execute('VACUUM')
+        except sqlite3.OperationalError:
+            return False  #база занята другим соединением - повтор при следующем запуске
+        return True
+
+    def compress_existing_messages(self, batch_size=200, pause=0.05, stop_event=None):
+        """
+        Сжатие крупных текстов в сообщениях, сохраненных до появления сжатия.
+        
+        Строки обрабатываются небольшими пакетами по возрастанию ID, каждый пакет
+        в отдельной короткой транзакции с паузой между ними, чтобы не блокировать
+        запись из основного потока. После миграции база один раз переводится
+        в режим инкрементального auto-vacuum (см. enable_incremental_vacuum).
+        Предназначено для запуска в фоновом потоке.
+        
+        Args:
+            batch_size (int): Количество строк в одной транзакции
+            pause (float): Пауза между пакетами в секундах
+            stop_event (threading.Event): Событие для досрочной остановки
+            
+        Returns:
+            dict: Статистика миграции:
+                - rows_compressed: количество сжатых строк
+                - bytes_saved: сэкономленный объем в байтах
+                - incremental_vacuum: включен ли инкрементальный auto-vacuum
+                - free_pages: количество свободных страниц после очистки
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        last_id = 0
+        rows_compressed = 0
+        bytes_saved = 0
+        
+        while not (stop_event and stop_event.is_set()):
+            #кандидаты: несжатые тексты (тип text), размер которых в байтах UTF-8
+            #не меньше порога (length от BLOB считает байты, а не символы)
+            cursor.execute('''
+                SELECT id, user_message, ai_response FROM messages
+                WHERE id > ?
+                  AND ((typeof(user_message) = 'text' AND length(CAST(user_message AS BLOB)) >= ?)
+                    OR (typeof(ai_response) = 'text' AND length(CAST(ai_response AS BLOB)) >= ?))
+                ORDER BY id ASC
+                LIMIT ?
+            ''', (last_id, COMPRESSION_THRESHOLD, COMPRESSION_THRESHOLD, batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            
+            updates = []
+            for message_id, user_message, ai_response in batch:
+                new_user = compress_text(user_message)
+                new_response = compress_text(ai_response)
+                if new_user is not user_message or new_response is not ai_response:
+                    updates.append((new_user, new_response, message_id))
+                    for old, new in ((user_message, new_user), (ai_response, new_response)):
+                        if new is not old:
+                            bytes_saved += len(old.encode('utf-8')) - len(new)
+            
+            if updates:
+                cursor.executemany(
+                    'UPDATE messages SET user_message = ?, ai_response = ? WHERE id = ?',
+                    updates
+                )
+                conn.commit()
+                rows_compressed += len(updates)
+            
+            last_id = batch[-1][0]
+            time.sleep(pause)  #уступаем базу основному потоку
+        
+        stopped = stop_event is not None and stop_event.is_set()
+        return {
+            'rows_compressed': rows_compressed,
+            'bytes_saved': bytes_saved,
+            'incremental_vacuum': False if stopped else self.enable_incremental_vacuum(),
+            'free_pages': self.reclaim_space()
+        }
+
+    def get_formatted_history(self, conversation_id=None):
         """
         Получение отформатированной истории диалога.
         
+        Args:
+            conversation_id (int): ID диалога (None - все диалоги)
+        
         Returns:
             list: Список словарей с данными сообщений в формате:
                 {
@@ -279,18 +1471,20 @@ class ChatCache:
         conn = self.get_connection()  # Получение соединения
         cursor = conn.cursor()
         
-        # Получение всех сообщений, отсортированных по времени
-        cursor.execute('''
-            SELECT
-                id,
-                model,
-                user_message,
-                ai_response,
-                timestamp,
-                tokens_used
-            FROM messages
-            ORDER BY timestamp ASC
-        ''')
+        # Получение всех сообщений (всех или одного диалога), отсортированных по времени
+        if conversation_id is None:
+            cursor.execute(f'''
+                SELECT {MESSAGE_COLUMNS}
+                FROM messages
+                ORDER BY timestamp ASC
+            ''')
+        else:
+            cursor.execute(f'''
+                SELECT {MESSAGE_COLUMNS}
+                FROM messages
+                WHERE conversation_id = ?
+                ORDER BY timestamp ASC
+            ''', (conversation_id,))
         
         # Формирование списка словарей с данными сообщений
         history = []
@@ -298,8 +1492,8 @@ class ChatCache:
             history.append({
                 "id": row[0],              # ID сообщения
                 "model": row[1],           # Использованная модель
-                "user_message": row[2],    # Сообщение пользователя
-                "ai_response": row[3],     # Ответ AI
+                "user_message": self._decode_text(row[2]),  # Сообщение пользователя
+                "ai_response": self._decode_text(row[3]),   # Ответ AI
                 "timestamp": row[4],       # Временная метка
                 "tokens_used": row[5]      # Использовано токенов
             })
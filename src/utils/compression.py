@@ -0,0 +1,57 @@
+# Импорт необходимых библиотек
+import zlib   # Библиотека сжатия данных (входит в стандартную библиотеку)
+
+# Минимальный размер текста в байтах, начиная с которого он сжимается.
+# Короткие сообщения почти не сжимаются, а распаковка стоит времени
+COMPRESSION_THRESHOLD = 1024
+
+# Теги кодеков: первый байт BLOB указывает способ сжатия
+CODEC_ZLIB = b'\x01'
+
+# Тег ссылки на текст в хранилище blobs (за ним следует SHA-1 содержимого).
+# Такие значения разрешает ChatCache, decompress_text их не обрабатывает
+CODEC_BLOB_REF = b'\x02'
+
+
+def compress_text(text):
+    """
+    Сжатие текста для хранения в базе данных.
+
+    Args:
+        text (str): Исходный текст
+
+    Returns:
+        str | bytes: Исходная строка, если текст короче порога или сжатие
+                     не дает выигрыша, иначе BLOB вида <тег кодека><данные>
+    """
+    if not isinstance(text, str):
+        return text
+    raw = text.encode('utf-8')
+    if len(raw) < COMPRESSION_THRESHOLD:
+        return text
+    compressed = CODEC_ZLIB + zlib.compress(raw, 6)
+    # Сохраняем сжатую версию только если она действительно меньше
+    return compressed if len(compressed) < len(raw) else text
+
+
+def decompress_text(value):
+    """
+    Распаковка текста, прочитанного из базы данных.
+
+    Args:
+        value (str | bytes | None): Значение столбца
+
+    Returns:
+        str | None: Исходный текст
+
+    Raises:
+        ValueError: Если тег кодека неизвестен
+    """
+    if not isinstance(value, bytes):
+        return value  # Несжатый текст хранится как обычная строка
+    codec, payload = value[:1], value[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    if codec == CODEC_BLOB_REF:
+        raise ValueError("Blob references must be resolved through ChatCache")
+    raise ValueError(f"Unknown compression codec: {codec!r}")
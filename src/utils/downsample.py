@@ -0,0 +1,87 @@
+# Импорт необходимых библиотек
+import numpy as np  # Библиотека для векторных вычислений
+
+
+def lttb(x, y, threshold: int):
+    """
+    Прореживание временного ряда алгоритмом Largest-Triangle-Three-Buckets.
+
+    Ряд делится на threshold - 2 корзины; из каждой выбирается точка,
+    образующая наибольший треугольник с уже выбранной точкой предыдущей
+    корзины и средней точкой следующей. Первая и последняя точки сохраняются.
+    Форма графика (пики и провалы) сохраняется лучше, чем при усреднении.
+
+    Args:
+        x: Значения по оси X (по возрастанию)
+        y: Значения по оси Y
+        threshold (int): Максимальное количество точек результата
+
+    Returns:
+        tuple: Массивы NumPy (x, y) длиной не более threshold
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Границы корзин для внутренних точек (первая и последняя точки - отдельно)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Средняя точка следующей корзины (для последней корзины - последняя точка ряда)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Удвоенные площади треугольников для всех точек корзины одним выражением
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return x[selected], y[selected]
+
+
+def minmax_buckets(x, y, n_buckets: int):
+    """
+    Прореживание временного ряда по минимуму и максимуму в корзинах.
+
+    Из каждой корзины сохраняются точки минимума и максимума в порядке
+    следования, поэтому выбросы никогда не теряются. Результат содержит
+    не более 2 * n_buckets точек.
+
+    Args:
+        x: Значения по оси X (по возрастанию)
+        y: Значения по оси Y
+        n_buckets (int): Количество корзин
+
+    Returns:
+        tuple: Массивы NumPy (x, y)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return x, y
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    indexes = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        low = start + int(np.argmin(y[start:end]))
+        high = start + int(np.argmax(y[start:end]))
+        indexes.extend(sorted({low, high}))
+    indexes = np.array(indexes, dtype=np.int64)
+    return x[indexes], y[indexes]
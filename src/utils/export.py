@@ -0,0 +1,149 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для работы с файлами
+import json        # Библиотека для сериализации сообщений
+import gzip        # Библиотека для сжатия файла экспорта
+
+# Поддерживаемые форматы экспорта и расширения файлов
+EXPORT_FORMATS = {
+    'json': '.json',            # Форматированный JSON-массив (как в прежнем экспорте)
+    'ndjson': '.jsonl',         # Одно сообщение на строку (NDJSON)
+    'ndjson.gz': '.jsonl.gz',   # NDJSON со сжатием gzip
+}
+
+
+class HistoryExporter:
+    """
+    Класс для потокового экспорта истории чата в файл.
+
+    Обеспечивает:
+    - Построчную запись сообщений по мере чтения из базы (память не растет с историей)
+    - Форматы JSON, NDJSON и NDJSON + gzip
+    - Фильтры по дате, модели и диалогу
+    - Экспорт вместе с сообщениями, перенесенными в архив (HistoryArchiver)
+    - Отчет о прогрессе и отмену экспорта
+
+    Предназначен для запуска в рабочем потоке, чтобы не блокировать интерфейс.
+    """
+
+    def __init__(self, cache, exports_dir='exports', archiver=None):
+        """
+        Инициализация экспортера.
+
+        Args:
+            cache (ChatCache): Экземпляр класса для работы с базой данных
+            exports_dir (str): Директория для файлов экспорта
+            archiver (HistoryArchiver): Архив старой истории (необязательно)
+        """
+        self.cache = cache
+        self.exports_dir = exports_dir
+        self.archiver = archiver
+
+    def _iter_archived(self, start=None, end=None, model=None, conversation_id=None):
+        """
+        Внутренняя функция чтения архивных сообщений в формате записей экспорта.
+        """
+        titles = {row[0]: row[1] for row in self.cache.list_conversations(include_archived=True)}
+        for row in self.archiver.iter_messages(start, end, model, conversation_id):
+            yield {
+                "timestamp": row['timestamp'],
+                "model": row['model'],
+                "user_message": row['user_message'],
+                "ai_response": row['ai_response'],
+                "tokens_used": row['tokens_used'],
+                "conversation_id": row.get('conversation_id'),
+                "conversation_title": titles.get(row.get('conversation_id'))
+            }
+
+    def iter_records(self, start=None, end=None, model=None, conversation_id=None,
+                     include_archive=False):
+        """
+        Записи для экспорта в хронологическом порядке: сначала архивные
+        сообщения (они всегда старше оставшихся в базе), затем сообщения базы.
+
+        Yields:
+            dict: Запись с полями timestamp, model, user_message, ai_response,
+                 tokens_used, conversation_id, conversation_title
+        """
+        filters = {'start': start, 'end': end, 'model': model, 'conversation_id': conversation_id}
+        if include_archive and self.archiver is not None:
+            yield from self._iter_archived(**filters)
+        yield from self.cache.iter_messages(**filters)
+
+    def export(self, filename, fmt='json', start=None, end=None, model=None,
+               conversation_id=None, include_archive=False,
+               progress_callback=None, progress_every=500, cancel_event=None) -> dict:
+        """
+        Экспорт истории в файл.
+
+        Данные пишутся во временный файл, который переименовывается только
+        после успешного завершения; при отмене или ошибке он удаляется.
+
+        Args:
+            filename (str): Имя файла без расширения
+            fmt (str): Формат из EXPORT_FORMATS
+            start (datetime | str): Нижняя граница времени (включительно)
+            end (datetime | str): Верхняя граница времени (не включительно)
+            model (str): Идентификатор модели
+            conversation_id (int): ID диалога
+            include_archive (bool): Включать сообщения, перенесенные в архив
+            progress_callback: Функция (exported, total), вызываемая каждые
+                               progress_every сообщений и в конце экспорта
+            progress_every (int): Периодичность вызова progress_callback
+            cancel_event (threading.Event): Событие отмены этого экспорта (необязательно);
+                                            создается вызывающим кодом при запуске экспорта,
+                                            поэтому отмена до начала работы потока не теряется
+
+        Returns:
+            dict: Результат экспорта:
+                - status: 'completed' или 'cancelled'
+                - filepath: путь к файлу (None при отмене)
+                - exported: количество записанных сообщений
+
+        Raises:
+            ValueError: Если формат не поддерживается
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        filters = {'start': start, 'end': end, 'model': model, 'conversation_id': conversation_id}
+        total = self.cache.count_messages(**filters)
+        if include_archive and self.archiver is not None:
+            # Оценка по индексу архива (без распаковки сегментов)
+            total += self.archiver.estimate_count(start, end, model)
+
+        filepath = os.path.join(self.exports_dir, filename + EXPORT_FORMATS[fmt])
+        tmp_path = filepath + '.part'
+        exported = 0
+
+        try:
+            opener = gzip.open if fmt == 'ndjson.gz' else open
+            with opener(tmp_path, 'wt', encoding='utf-8') as f:
+                if fmt == 'json':
+                    f.write('[')
+                for record in self.iter_records(include_archive=include_archive, **filters):
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    if fmt == 'json':
+                        # Элементы массива пишутся по одному с тем же отступом, что и json.dump(indent=2)
+                        item = json.dumps(record, ensure_ascii=False, indent=2, default=str)
+                        f.write((',\n  ' if exported else '\n  ') + item.replace('\n', '\n  '))
+                    else:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                    exported += 1
+                    if progress_callback and exported % progress_every == 0:
+                        progress_callback(exported, total)
+                if fmt == 'json':
+                    f.write('\n]' if exported else ']')
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if cancel_event is not None and cancel_event.is_set():
+            os.remove(tmp_path)
+            return {'status': 'cancelled', 'filepath': None, 'exported': exported}
+
+        os.replace(tmp_path, filepath)
+        if progress_callback:
+            progress_callback(exported, total)
+        return {'status': 'completed', 'filepath': filepath, 'exported': exported}
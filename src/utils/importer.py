@@ -0,0 +1,337 @@
+# Импорт необходимых библиотек
+import io          # Библиотека для работы с потоками ввода-вывода
+import json        # Библиотека для разбора JSON и NDJSON
+import gzip        # Библиотека для чтения сжатых файлов экспорта
+import time        # Библиотека для измерения скорости импорта
+import threading   # Библиотека для фонового пополнения векторного индекса
+from datetime import datetime  # Библиотека для работы с датой и временем
+from .cache import ChatCache, MESSAGE_INDEXES
+
+# Размер порции чтения файла при потоковом разборе JSON-массива
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Признак gzip-файла (первые два байта)
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def iter_export_records(filepath):
+    """
+    Потоковое чтение сообщений из файла экспорта.
+
+    Поддерживает форматы, создаваемые экспортом истории: JSON-массив
+    (в том числе старый формат save_dialog), NDJSON и NDJSON + gzip.
+    Файл не загружается в память целиком: JSON-массив разбирается
+    по одному элементу через JSONDecoder.raw_decode.
+
+    Args:
+        filepath (str): Путь к файлу экспорта
+
+    Yields:
+        dict: Запись сообщения
+    """
+    with open(filepath, 'rb') as raw:
+        is_gzip = raw.read(2) == GZIP_MAGIC
+    binary = gzip.open(filepath, 'rb') if is_gzip else open(filepath, 'rb')
+
+    with io.TextIOWrapper(binary, encoding='utf-8') as f:
+        # Определение формата по первому значимому символу
+        buffer = ''
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            buffer += chunk
+            if buffer.lstrip() or not chunk:
+                break
+        buffer = buffer.lstrip()
+        if not buffer:
+            return
+
+        if not buffer.startswith('['):
+            # NDJSON: одна запись на строку
+            for line in _iter_lines(buffer, f):
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        # JSON-массив: элементы разбираются по одному по мере чтения
+        decoder = json.JSONDecoder()
+        buffer = buffer[1:]
+        position = 0
+        while True:
+            # Пропуск пробелов и разделителей между элементами
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+                yield record
+            except json.JSONDecodeError:
+                # Элемент прочитан не полностью - дочитываем следующую порцию
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+
+
+def _iter_lines(head, f):
+    """
+    Внутренняя функция построчного чтения: сначала уже прочитанное начало файла,
+    затем оставшиеся строки из потока.
+    """
+    lines = head.split('\n')
+    tail = lines.pop()  # Последняя строка может быть неполной
+    yield from lines
+    yield tail + f.readline()
+    yield from f
+
+
+class HistoryImporter:
+    """
+    Класс для массового импорта истории из файлов экспорта.
+
+    Обеспечивает:
+    - Потоковый разбор JSON и NDJSON без загрузки файла в память
+    - Вставку через executemany во временную таблицу большими транзакциями
+    - Перенос в базу короткими транзакциями, не блокирующими сохранение сообщений
+    - Отложенное построение индексов и векторного индекса до конца импорта
+    - Пропуск дубликатов по хэшу содержимого (и в базе, и внутри файла)
+    - Восстановление диалогов: один новый диалог на каждый исходный диалог
+      (ID и название из экспорта), даже если названия совпадают
+    - Отчет о скорости импорта (строк в секунду)
+    """
+
+    def __init__(self, cache, batch_size=5000):
+        """
+        Инициализация импортера.
+
+        Args:
+            cache (ChatCache): Экземпляр класса для работы с базой данных
+            batch_size (int): Количество строк в одном вызове executemany
+        """
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def _prepare_row(self, record, default_title):
+        """
+        Внутренняя функция преобразования записи экспорта в строку временной таблицы.
+        Тексты сохраняются как есть: кодирование (сжатие, дедупликация) выполняется
+        при переносе в messages, чтобы разбор файла не удерживал блокировку базы.
+        """
+        timestamp = str(record.get('timestamp') or datetime.now())
+        model = record.get('model')
+        user_message = record.get('user_message')
+        ai_response = record.get('ai_response')
+        return (
+            model,
+            user_message,
+            ai_response,
+            timestamp,
+            record.get('tokens_used') or 0,
+            record.get('conversation_id'),
+            record.get('conversation_title') or default_title,
+            ChatCache.content_hash(timestamp, model, user_message, ai_response),
+        )
+
+    def _insert_batch(self, cursor, after) -> tuple:
+        """
+        Внутренняя функция переноса очередной порции новых сообщений из временной
+        таблицы в messages (порции идут по времени сообщений).
+
+        Args:
+            cursor (sqlite3.Cursor): Курсор соединения импорта
+            after (tuple): Ключ (timestamp, rowid) последней перенесенной строки
+
+        Returns:
+            tuple: (количество добавленных сообщений, ключ последней строки порции
+                   или None, если строк больше нет)
+        """
+        cursor.execute('''
+            SELECT s.rowid, s.model, s.user_message, s.ai_response, s.timestamp, s.tokens_used,
+                   c.conversation_id, s.content_hash
+            FROM import_staging AS s
+            JOIN import_conversations AS c
+              ON c.source_conversation_id IS s.source_conversation_id
+             AND c.title = s.conversation_title
+            WHERE (s.timestamp, s.rowid) > (?, ?)
+            ORDER BY s.timestamp, s.rowid
+            LIMIT ?
+        ''', (*after, self.batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0, None
+
+        # Совпадения с базой отсекаются по индексу хэша до кодирования текстов,
+        # поэтому в хранилище blobs не попадают тексты отброшенных дубликатов
+        values = []
+        for rowid, model, user_message, ai_response, timestamp, tokens_used, conversation_id, digest in rows:
+            if cursor.execute('SELECT 1 FROM messages WHERE content_hash = ?', (digest,)).fetchone():
+                continue
+            values.append((
+                model,
+                self.cache.encode_text(user_message, cursor),
+                self.cache.encode_text(ai_response, cursor),
+                timestamp, tokens_used, conversation_id, digest
+            ))
+        cursor.executemany('''
+            INSERT INTO messages (model, user_message, ai_response, timestamp, tokens_used,
+                                  conversation_id, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', values)
+        return len(values), (rows[-1][4], rows[-1][0])
+
+    def import_file(self, filepath, progress_callback=None) -> dict:
+        """
+        Импорт истории из файла экспорта.
+
+        Файл сначала разбирается во временную таблицу (она не блокирует основную
+        базу), затем сообщения переносятся порциями по batch_size строк, каждая
+        в своей короткой транзакции: сохранение сообщений из интерфейса во время
+        импорта ждет не дольше одной порции.
+
+        Args:
+            filepath (str): Путь к файлу JSON, NDJSON или NDJSON + gzip
+            progress_callback: Функция (rows_read), вызываемая после каждой порции
+
+        Returns:
+            dict: Статистика импорта:
+                - rows_read: количество прочитанных записей
+                - rows_imported: количество добавленных сообщений
+                - duplicates: количество пропущенных дубликатов
+                - seconds: длительность импорта
+                - rows_per_second: скорость импорта
+        """
+        started = time.perf_counter()
+        conn = self.cache.get_connection()
+        cursor = conn.cursor()
+
+        # Хэши нужны и у ранее сохраненных сообщений, иначе они не будут сравниваться
+        self.cache.fill_content_hashes()
+
+        # Записи без диалога (старый формат экспорта) попадают в отдельный диалог
+        default_title = f"Импорт {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+        # 1. Потоковая загрузка во временную таблицу без индексов
+        cursor.execute('DROP TABLE IF EXISTS temp.import_staging')
+        cursor.execute('''
+            CREATE TEMP TABLE import_staging (
+                model TEXT,
+                user_message TEXT,
+                ai_response TEXT,
+                timestamp DATETIME,
+                tokens_used INTEGER,
+                source_conversation_id INTEGER,
+                conversation_title TEXT,
+                content_hash BLOB
+            )
+        ''')
+        rows_read = 0
+        batch = []
+        for record in iter_export_records(filepath):
+            batch.append(self._prepare_row(record, default_title))
+            if len(batch) >= self.batch_size:
+                cursor.executemany('INSERT INTO import_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                rows_read += len(batch)
+                batch = []
+                if progress_callback:
+                    progress_callback(rows_read)
+        if batch:
+            cursor.executemany('INSERT INTO import_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            rows_read += len(batch)
+
+        # Дубликаты внутри файла схлопываются до переноса (первая запись с каждым хэшем)
+        cursor.execute('''
+            DELETE FROM import_staging
+            WHERE rowid NOT IN (SELECT MIN(rowid) FROM import_staging GROUP BY content_hash)
+        ''')
+        cursor.execute('CREATE INDEX temp.idx_import_staging_timestamp ON import_staging (timestamp)')
+        conn.commit()
+
+        rows_imported = 0
+        last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM messages').fetchone()[0]
+        cursor.execute('''
+            CREATE TEMP TABLE import_conversations (
+                source_conversation_id INTEGER,
+                title TEXT,
+                conversation_id INTEGER
+            )
+        ''')
+        try:
+            # 2. Создание диалога для каждого исходного диалога: ключ - ID из экспорта
+            #    и название (у многих диалогов одинаковое название по умолчанию);
+            #    записи старого формата без ID группируются по названию
+            now = datetime.now()
+            cursor.execute('SELECT DISTINCT source_conversation_id, conversation_title FROM import_staging')
+            for source_id, title in cursor.fetchall():
+                cursor.execute('''
+                    INSERT INTO conversations (title, created_at, updated_at, archived)
+                    VALUES (?, ?, ?, 0)
+                ''', (title, now, now))
+                cursor.execute(
+                    'INSERT INTO import_conversations VALUES (?, ?, ?)',
+                    (source_id, title, cursor.lastrowid)
+                )
+            cursor.execute('''
+                CREATE UNIQUE INDEX temp.idx_import_conversations
+                ON import_conversations (source_conversation_id, title)
+            ''')
+
+            # 3. Индексы по времени удаляются на время вставки и строятся заново один раз
+            for name in MESSAGE_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+            conn.commit()
+
+            # 4. Перенос новых сообщений порциями, каждая порция - отдельная транзакция.
+            #    Прерванный импорт можно повторить: уже перенесенные сообщения
+            #    будут пропущены как дубликаты
+            after = ('', 0)
+            while after is not None:
+                imported, after = self._insert_batch(cursor, after)
+                conn.commit()
+                rows_imported += imported
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            # Индексы, время активности диалогов и хранилище текстов приводятся
+            # в порядок и при ошибке импорта
+            self.cache.create_message_indexes(cursor)
+
+            # Время активности диалогов - по последнему сообщению; пустые диалоги удаляются
+            cursor.execute('''
+                UPDATE conversations
+                SET updated_at = (SELECT MAX(timestamp) FROM messages WHERE conversation_id = conversations.id)
+                WHERE id IN (SELECT conversation_id FROM import_conversations)
+            ''')
+            cursor.execute('''
+                DELETE FROM conversations
+                WHERE id IN (SELECT conversation_id FROM import_conversations)
+                  AND updated_at IS NULL
+            ''')
+
+            # Тексты, на которые не ссылается ни одно сообщение
+            cursor.execute('DELETE FROM blobs WHERE refcount <= 0')
+            conn.commit()
+            cursor.execute('DROP TABLE IF EXISTS temp.import_staging')
+            cursor.execute('DROP TABLE IF EXISTS temp.import_conversations')
+
+        # 5. Векторный индекс пополняется одним проходом после вставки в фоновом потоке:
+        #    токенизация - самая медленная часть и не должна задерживать импорт.
+        #    Если приложение закроется раньше, непроиндексированные сообщения
+        #    будут найдены и проиндексированы при следующем запуске (см. ChatCache)
+        threading.Thread(
+            target=self.cache.index_messages_after,
+            args=(last_id,),
+            name='ImportIndexer',
+            daemon=True
+        ).start()
+
+        seconds = time.perf_counter() - started
+        return {
+            'rows_read': rows_read,
+            'rows_imported': rows_imported,
+            'duplicates': rows_read - rows_imported,
+            'seconds': seconds,
+            'rows_per_second': rows_read / seconds if seconds > 0 else 0,
+        }
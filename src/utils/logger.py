@@ -1,117 +1,441 @@
 # Импорт необходимых библиотек
 import logging     # Стандартная библиотека Python для логирования
+import logging.handlers  # Обработчики очереди для записи логов в фоновом потоке
 import os         # Библиотека для работы с операционной системой и файлами
-from datetime import datetime  # Библиотека для работы с датой и временем
+import sys        # Библиотека для проверки наличия консоли
+import json       # Библиотека для записи структурированных логов
+import glob       # Библиотека для поиска сегментов логов
+import re         # Библиотека регулярных выражений для выбора завершенных сегментов
+import gzip       # Библиотека для сжатия завершенных сегментов
+import shutil     # Библиотека для потокового копирования при сжатии
+import time       # Библиотека для расчета времени ротации и срока хранения
+import queue      # Библиотека очередей для передачи записей фоновому потоку
+import atexit     # Библиотека для сброса очереди логов при завершении
+import threading  # Библиотека для однократной настройки логирования
+from datetime import datetime, timedelta  # Библиотека для работы с датой и временем
+
+# Имя корневого логгера приложения; подсистемы получают дочерние логгеры ChatApp.<подсистема>
+ROOT_LOGGER_NAME = 'ChatApp'
+
+# Уровень логирования по умолчанию (переопределяется переменной LOG_LEVEL)
+DEFAULT_LOG_LEVEL = 'INFO'
+
+# Префикс файлов логов приложения в каталоге логов
+LOG_FILE_PREFIX = 'chat_app'
+
+# Ротация и хранение по умолчанию (переопределяются LOG_MAX_BYTES,
+# LOG_RETENTION_DAYS, LOG_MAX_TOTAL_MB)
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_RETENTION_DAYS = 14
+DEFAULT_MAX_TOTAL_MB = 200
+
+# Не более стольких одинаковых DEBUG-сообщений в секунду (переопределяется LOG_DEBUG_RATE)
+DEFAULT_DEBUG_RATE = 10
+
+# Общее состояние логирования процесса: настраивается один раз
+_setup_lock = threading.Lock()
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Обработчик, помещающий запись в очередь без форматирования.
+
+    Стандартный QueueHandler полностью форматирует запись в вызывающем потоке
+    и копирует ее; здесь в вызывающем потоке только подставляются аргументы
+    (их значения фиксируются на момент вызова логгера, даже если объект
+    изменится позже), а форматирование строки лога, JSON и трассировки
+    исключения выполняются потоком записи.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class DebugRateFilter(logging.Filter):
+    """
+    Ограничение частоты DEBUG-сообщений на горячем пути.
+
+    Для каждого шаблона сообщения пропускается не более rate записей в секунду;
+    количество отброшенных записей добавляется полем suppressed
+    к первой пропущенной записи следующей секунды. Записи уровня INFO
+    и выше не ограничиваются.
+    """
+
+    def __init__(self, rate: int = DEFAULT_DEBUG_RATE):
+        super().__init__()
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.windows = {}  # (логгер, шаблон) -> [секунда, пропущено, отброшено]
+
+    def filter(self, record) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, record.msg)
+        second = int(record.created)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or window[0] != second:
+                suppressed = window[2] if window is not None else 0
+                window = self.windows[key] = [second, 0, 0]
+                if suppressed:
+                    record.fields = {**getattr(record, 'fields', {}), 'suppressed': suppressed}
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирование записи в одну строку JSON (формат JSON Lines).
+
+    Поля: ts, level, logger, msg, дополнительные поля записи
+    (model, request_id, latency, tokens и т.п., см. AppLogger) и exc при исключении.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Файловый обработчик с ротацией по размеру и по дню и фоновым сжатием.
+
+    Активный файл - <prefix>_YYYY-MM-DD.jsonl. При превышении max_bytes или смене
+    дня он переименовывается в сегмент <prefix>_YYYY-MM-DD.N.jsonl, который сжимается
+    в .gz отдельным потоком (поток записи логов не ждет сжатия). После сжатия
+    удаляются файлы старше retention_days и самые старые файлы сверх max_total_bytes.
+    """
+
+    def __init__(self, logs_dir: str, prefix: str = LOG_FILE_PREFIX,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 retention_days: float = DEFAULT_RETENTION_DAYS,
+                 max_total_bytes: int = DEFAULT_MAX_TOTAL_MB * 1024 * 1024):
+        """
+        Инициализация обработчика.
+
+        Args:
+            logs_dir (str): Каталог логов
+            prefix (str): Префикс имен файлов
+            max_bytes (int): Размер активного файла, после которого выполняется ротация
+            retention_days (float): Срок хранения файлов логов в днях
+            max_total_bytes (int): Максимальный суммарный объем файлов логов
+        """
+        self.logs_dir = logs_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.compress_lock = threading.Lock()
+        self._set_day(datetime.now())
+        super().__init__(self._active_path(), 'a', encoding='utf-8')
+
+        # Завершенные сегменты, оставшиеся несжатыми (прерванное сжатие). Файлы без номера
+        # сегмента не сжимаются: это может быть активный файл другого экземпляра приложения
+        segment_pattern = re.compile(rf'{re.escape(prefix)}_\d{{4}}-\d{{2}}-\d{{2}}\.\d+\.jsonl')
+        pending = [
+            path for path in glob.glob(os.path.join(logs_dir, f'{prefix}_*.jsonl'))
+            if segment_pattern.fullmatch(os.path.basename(path))
+        ]
+        self._compress_in_background(pending)
+
+    def _set_day(self, now: datetime):
+        """
+        Внутренняя функция установки текущего дня и времени следующей ротации по дню.
+        """
+        self.day = now.strftime('%Y-%m-%d')
+        midnight = datetime(now.year, now.month, now.day) + timedelta(days=1)
+        self.rollover_at = midnight.timestamp()
+
+    def _active_path(self) -> str:
+        """
+        Внутренняя функция пути активного файла текущего дня.
+        """
+        return os.path.join(self.logs_dir, f'{self.prefix}_{self.day}.jsonl')
+
+    def shouldRollover(self, record) -> bool:
+        if record.created >= self.rollover_at:
+            return True
+        return bool(self.max_bytes) and self.stream is not None and self.stream.tell() >= self.max_bytes
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        # Следующий свободный номер сегмента дня
+        numbers = [0]
+        for path in glob.glob(os.path.join(self.logs_dir, f'{self.prefix}_{self.day}.*.jsonl*')):
+            number = os.path.basename(path)[len(self.prefix) + len(self.day) + 2:].split('.')[0]
+            if number.isdigit():
+                numbers.append(int(number))
+        segment = os.path.join(self.logs_dir, f'{self.prefix}_{self.day}.{max(numbers) + 1}.jsonl')
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, segment)
+
+        self._set_day(datetime.now())
+        self.baseFilename = os.path.abspath(self._active_path())
+        self.stream = self._open()
+        self._compress_in_background([segment])
+
+    def _compress_in_background(self, paths):
+        """
+        Внутренняя функция запуска сжатия сегментов и очистки в отдельном потоке.
+        """
+        def worker():
+            with self.compress_lock:
+                for path in paths:
+                    try:
+                        with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+                            shutil.copyfileobj(source, target)
+                        os.remove(path)
+                    except OSError:
+                        pass  # Сегмент будет сжат при следующем запуске
+                self.apply_retention()
+
+        threading.Thread(target=worker, name='LogCompressor', daemon=True).start()
+
+    def apply_retention(self):
+        """
+        Удаление файлов логов старше срока хранения и самых старых файлов сверх общего объема.
+        Активный файл не удаляется.
+        """
+        files = []
+        for path in glob.glob(os.path.join(self.logs_dir, f'{self.prefix}_*')):
+            if os.path.abspath(path) == self.baseFilename:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        expire_before = time.time() - self.retention_days * 86400
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if mtime >= expire_before and total <= self.max_total_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def _parse_levels(value: str) -> dict:
+    """
+    Внутренняя функция разбора уровней подсистем вида "api=DEBUG,monitor=WARNING".
+    """
+    levels = {}
+    for item in value.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _level(name: str):
+    """
+    Внутренняя функция проверки имени уровня логирования.
+
+    Returns:
+        int: Числовой уровень или None, если имя неизвестно
+    """
+    level = logging.getLevelName(name.upper())
+    return level if isinstance(level, int) else None
+
+
+def _setup_logging(logs_dir: str):
+    """
+    Внутренняя функция однократной настройки логирования процесса.
+
+    К корневому логгеру приложения подключается единственный обработчик очереди;
+    файловый и консольный обработчики работают в потоке QueueListener.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        # Структурированный лог в формате JSON Lines с ротацией, сжатием и сроком хранения
+        # Формат файлов: chat_app_YYYY-MM-DD.jsonl (активный), chat_app_YYYY-MM-DD.N.jsonl.gz
+        file_handler = CompressingRotatingFileHandler(
+            logs_dir,
+            max_bytes=int(os.getenv('LOG_MAX_BYTES', DEFAULT_MAX_BYTES)),
+            retention_days=float(os.getenv('LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)),
+            max_total_bytes=int(float(os.getenv('LOG_MAX_TOTAL_MB', DEFAULT_MAX_TOTAL_MB)) * 1024 * 1024)
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+
+        # Настройка формата сообщений консоли
+        # Формат: YYYY-MM-DD HH:MM:SS - LEVEL - Message
+        formatter = logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',  # Шаблон сообщения
+            datefmt='%Y-%m-%d %H:%M:%S'                   # Формат даты и времени
+        )
+
+        # Обработчик для вывода в консоль (в сборке без консоли sys.stderr отсутствует)
+        if sys.stderr is not None:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        level_name = os.getenv('LOG_LEVEL', DEFAULT_LOG_LEVEL)
+        level = _level(level_name)
+        root.setLevel(level if level is not None else DEFAULT_LOG_LEVEL)
+        queue_handler = _DeferredQueueHandler(log_queue)
+        # Ограничение частоты DEBUG выполняется до постановки в очередь
+        queue_handler.addFilter(DebugRateFilter(int(os.getenv('LOG_DEBUG_RATE', DEFAULT_DEBUG_RATE))))
+        root.addHandler(queue_handler)
+        root.propagate = False  # Записи не дублируются обработчиками корневого логгера Python
+
+        # Уровни отдельных подсистем, например LOG_LEVELS="api=DEBUG,monitor=WARNING"
+        invalid_levels = []
+        for name, subsystem_level in _parse_levels(os.getenv('LOG_LEVELS', '')).items():
+            if _level(subsystem_level) is None:
+                invalid_levels.append(f"{name}={subsystem_level}")
+                continue
+            root.getChild(name).setLevel(subsystem_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)  # Запись оставшихся в очереди сообщений при выходе
+
+        # Неизвестный уровень не прерывает запуск: используется уровень по умолчанию,
+        # неизвестные уровни подсистем пропускаются
+        if level is None:
+            root.warning("Unknown LOG_LEVEL %r, using %s", level_name, DEFAULT_LOG_LEVEL)
+        for setting in invalid_levels:
+            root.warning("Unknown level in LOG_LEVELS %r ignored", setting)
+
 
 class AppLogger:
     """
     Класс для логирования работы приложения.
-    
+
     Обеспечивает:
-    - Сохранение логов в файлы с датой в имени
+    - Сохранение логов в файлы с датой в имени в формате JSON Lines
+      с ротацией по размеру и дню, сжатием и сроком хранения
     - Вывод логов в консоль
     - Различные уровни логирования (debug, info, warning, error)
     - Форматирование сообщений с временными метками
+    - Единую для процесса настройку обработчиков: экземпляры AppLogger
+      не добавляют обработчики повторно, поэтому строки не дублируются
+    - Запись в файл и консоль в фоновом потоке: вызывающий поток только
+      помещает запись в очередь
+    - Отложенное форматирование: аргументы передаются отдельно
+      (logger.info("Retrieved %d models", count)) и подставляются
+      только если сообщение проходит по уровню
+    - Уровни подсистем: LOG_LEVEL задает общий уровень,
+      LOG_LEVELS - уровни подсистем ("api=DEBUG,monitor=WARNING")
+    - Поля структурированной записи: logger.info("Request done", model=..., latency=...)
+    - Ограничение частоты одинаковых DEBUG-сообщений (LOG_DEBUG_RATE в секунду)
     """
-    
-    def __init__(self):
+
+    def __init__(self, subsystem: str = 'app'):
         """
-        Инициализация системы логирования.
-        
-        Настраивает:
+        Инициализация логгера подсистемы.
+
+        При первом создании в процессе настраивает:
         - Директорию для хранения логов
         - Форматирование сообщений
-        - Обработчики для файла и консоли
+        - Обработчики для файла и консоли в фоновом потоке
         - Уровни логирования
+
+        Args:
+            subsystem (str): Имя подсистемы (дочерний логгер ChatApp.<subsystem>)
         """
         # Создание директории для хранения файлов логов
         self.logs_dir = "logs"
         if not os.path.exists(self.logs_dir):
             os.makedirs(self.logs_dir)
-            
-        # Формирование имени файла лога с текущей датой
-        # Формат: chat_app_YYYY-MM-DD.log
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        log_file = os.path.join(self.logs_dir, f"chat_app_{current_date}.log")
-        
-        # Настройка формата сообщений лога
-        # Формат: YYYY-MM-DD HH:MM:SS - LEVEL - Message
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',  # Шаблон сообщения
-            datefmt='%Y-%m-%d %H:%M:%S'                   # Формат даты и времени
-        )
-        
-        # Создание и настройка обработчика для записи в файл
-        file_handler = logging.FileHandler(
-            log_file,           # Путь к файлу лога
-            encoding='utf-8'    # Кодировка для поддержки Unicode
-        )
-        file_handler.setFormatter(formatter)  # Установка форматирования
-        
-        # Создание и настройка обработчика для вывода в консоль
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)  # Установка того же форматирования
-        
-        # Настройка основного логгера приложения
-        self.logger = logging.getLogger('ChatApp')  # Создание логгера с именем
-        self.logger.setLevel(logging.DEBUG)         # Установка уровня логирования
-        self.logger.addHandler(file_handler)        # Добавление файлового обработчика
-        self.logger.addHandler(console_handler)     # Добавление консольного обработчика
-    
-    def info(self, message: str):
+        _setup_logging(self.logs_dir)
+
+        # Логгер подсистемы; обработчики наследуются от корневого логгера приложения
+        self.logger = logging.getLogger(ROOT_LOGGER_NAME).getChild(subsystem)
+
+    def info(self, message: str, *args, **fields):
         """
         Логирование информационного сообщения.
-        
+
         Используется для записи важной информации о работе приложения:
         - Успешные операции
         - Статус выполнения
         - Информация о состоянии
-        
+
         Args:
-            message (str): Текст информационного сообщения
+            message (str): Текст информационного сообщения (шаблон с %s)
+            *args: Аргументы шаблона (подставляются при записи)
+            **fields: Поля структурированной записи (model, request_id, latency, tokens)
         """
-        self.logger.info(message)
-    
-    def error(self, message: str, exc_info=None):
+        self.logger.info(message, *args, extra={'fields': fields} if fields else None)
+
+    def error(self, message: str, *args, exc_info=None, **fields):
         """
         Логирование ошибки.
-        
+
         Используется для записи информации об ошибках:
         - Исключения
         - Сбои в работе
         - Критические ошибки
-        
+
         Args:
-            message (str): Текст сообщения об ошибке
+            message (str): Текст сообщения об ошибке (шаблон с %s)
+            *args: Аргументы шаблона (подставляются при записи)
+            **fields: Поля структурированной записи (model, request_id, latency, tokens)
             exc_info: Информация об исключении (по умолчанию None)
                      Если передано True, автоматически добавляет стек вызовов
         """
-        self.logger.error(message, exc_info=exc_info)
-    
-    def debug(self, message: str):
+        self.logger.error(message, *args, exc_info=exc_info, extra={'fields': fields} if fields else None)
+
+    def debug(self, message: str, *args, **fields):
         """
         Логирование отладочной информации.
-        
+
         Используется для записи подробной информации для отладки:
         - Значения переменных
         - Промежуточные результаты
         - Детали выполнения
-        
+
         Args:
-            message (str): Текст отладочного сообщения
+            message (str): Текст отладочного сообщения (шаблон с %s)
+            *args: Аргументы шаблона (подставляются при записи)
+            **fields: Поля структурированной записи (model, request_id, latency, tokens)
         """
-        self.logger.debug(message)
-    
-    def warning(self, message: str):
+        self.logger.debug(message, *args, extra={'fields': fields} if fields else None)
+
+    def warning(self, message: str, *args, **fields):
         """
         Логирование предупреждения.
-        
+
         Используется для записи предупреждений:
         - Потенциальные проблемы
         - Нежелательные ситуации
         - Предупреждения о состоянии
-        
+
         Args:
-            message (str): Текст предупреждения
+            message (str): Текст предупреждения (шаблон с %s)
+            *args: Аргументы шаблона (подставляются при записи)
+            **fields: Поля структурированной записи (model, request_id, latency, tokens)
         """
-        self.logger.warning(message)
\ No newline at end of file
+        self.logger.warning(message, *args, extra={'fields': fields} if fields else None)
@@ -0,0 +1,114 @@
+# Импорт необходимых библиотек
+import sys         # Библиотека для получения стека потока цикла событий
+import time        # Библиотека для измерения задержек
+import asyncio     # Библиотека асинхронного программирования
+import threading   # Библиотека для сторожевого потока
+import traceback   # Библиотека для форматирования стека
+import os          # Библиотека для определения каталога стандартной библиотеки
+
+# Каталог стандартной библиотеки: ее кадры не считаются кодом приложения
+STDLIB_DIR = os.path.dirname(os.__file__)
+
+
+class EventLoopMonitor:
+    """
+    Монитор отзывчивости цикла событий интерфейса.
+
+    Обеспечивает:
+    - Измерение задержки цикла: периодический таймер в цикле фиксирует,
+      насколько позже запланированного он срабатывает
+    - Обнаружение медленных обработчиков: сторожевой поток замечает, что таймер
+      давно не срабатывал, и записывает в лог имя функции и стек потока цикла
+      в момент блокировки
+    - Передачу задержек в гистограмму PerformanceMonitor (см. record_loop_lag)
+
+    Накладные расходы - одна короткая задача цикла за интервал и один поток,
+    просыпающийся с тем же интервалом.
+    """
+
+    def __init__(self, monitor, logger=None, interval: float = 0.1, slow_threshold: float = 0.25):
+        """
+        Инициализация монитора.
+
+        Args:
+            monitor (PerformanceMonitor): Монитор, получающий замеры задержки
+            logger (AppLogger): Логгер для сообщений о медленных обработчиках
+            interval (float): Период таймера проверки в секундах
+            slow_threshold (float): Порог блокировки цикла в секундах
+        """
+        self.monitor = monitor
+        self.logger = logger
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.heartbeat = time.monotonic()  # Время последнего срабатывания таймера
+        self.loop_thread_id = None         # Идентификатор потока цикла событий
+        self.stop_event = threading.Event()
+        self.watchdog = None
+
+    async def probe(self):
+        """
+        Задача цикла событий: измеряет запаздывание таймера и обновляет отметку активности.
+        Запускается в цикле интерфейса (например, через page.run_task).
+        """
+        self.loop_thread_id = threading.get_ident()
+        self._start_watchdog()
+        self.heartbeat = time.monotonic()
+        while not self.stop_event.is_set():
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            self.monitor.record_loop_lag(max(now - expected, 0.0))
+
+    def _start_watchdog(self):
+        """
+        Внутренняя функция запуска сторожевого потока обнаружения медленных обработчиков.
+        """
+        if self.watchdog is not None:
+            return
+
+        def worker():
+            reported = None  # Отметка активности, для которой блокировка уже записана
+            while not self.stop_event.wait(self.interval):
+                heartbeat = self.heartbeat
+                blocked = time.monotonic() - heartbeat
+                if blocked < self.slow_threshold + self.interval or heartbeat == reported:
+                    continue
+                reported = heartbeat
+                self.monitor.record_slow_callback()
+                self._report_blocked(blocked)
+
+        self.watchdog = threading.Thread(target=worker, name='EventLoopWatchdog', daemon=True)
+        self.watchdog.start()
+
+    def _report_blocked(self, blocked: float):
+        """
+        Внутренняя функция записи в лог стека заблокированного потока цикла.
+        """
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None or self.logger is None:
+            return
+        stack = traceback.extract_stack(frame)
+        # Обработчик - первый кадр после диспетчера asyncio (вызванная циклом функция),
+        # место блокировки - самый внутренний кадр кода приложения
+        dispatch = max(
+            (i for i, entry in enumerate(stack) if os.sep + 'asyncio' + os.sep in entry.filename),
+            default=-1
+        )
+        handler = stack[dispatch + 1] if dispatch + 1 < len(stack) else stack[-1]
+        app_frames = [
+            entry for entry in stack[dispatch + 1:]
+            if not entry.filename.startswith(STDLIB_DIR) and 'site-packages' not in entry.filename
+        ]
+        location = app_frames[-1] if app_frames else stack[-1]
+        self.logger.warning(
+            "Event loop blocked for %.2fs in %s (now at %s, %s:%d)\n%s",
+            blocked, handler.name, location.name, location.filename, location.lineno,
+            ''.join(traceback.format_list(stack[-15:]))
+        )
+
+    def stop(self):
+        """
+        Остановка таймера и сторожевого потока.
+        """
+        self.stop_event.set()
@@ -0,0 +1,200 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для сокращения путей мест выделения
+import time        # Библиотека для отметок времени снимков
+import threading   # Библиотека для фонового снятия снимков
+import tracemalloc # Библиотека отслеживания выделений памяти
+from .monitor import MetricsRingBuffer  # Кольцевой буфер истории замеров
+
+# Выделения самого tracemalloc и загрузчика модулей не относятся к приложению
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class MemoryDiagnostics:
+    """
+    Диагностика роста памяти в длительных сессиях.
+
+    Обеспечивает:
+    - Периодические снимки tracemalloc и сравнение с первым снимком:
+      в отчет попадают места выделения с наибольшим приростом
+    - Счетчики живых объектов приложения (элементы Flet, записи кэшей,
+      обработчики логов), регистрируемые через add_counter
+    - Историю объема отслеживаемой памяти и скорость ее роста
+      (используется PerformanceMonitor.check_health)
+
+    tracemalloc замедляет каждое выделение памяти, поэтому диагностика
+    включается только по запросу (в приложении - переменной MEMORY_DIAGNOSTICS=1).
+    """
+
+    def __init__(self, logger=None, interval: float = 60.0, top: int = 10,
+                 frames: int = 1, capacity: int = 1440):
+        """
+        Инициализация диагностики.
+
+        Args:
+            logger (AppLogger): Логгер для отчетов о росте памяти
+            interval (float): Интервал между снимками в секундах
+            top (int): Количество мест выделения в отчете
+            frames (int): Глубина стека, сохраняемого для каждого выделения
+            capacity (int): Количество хранимых замеров объема памяти
+        """
+        self.logger = logger
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.counters = {}          # Имя счетчика -> функция без аргументов
+        self.history = MetricsRingBuffer(capacity=capacity, names=('traced_bytes',))
+        self.baseline = None        # Первый снимок, с которым сравниваются последующие
+        self.baseline_counts = {}   # Значения счетчиков на момент первого снимка
+        self.baseline_bytes = 0     # Объем отслеживаемой памяти на момент первого снимка
+        self.last_report = None     # Последний отчет (см. snapshot)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add_counter(self, name: str, counter):
+        """
+        Регистрация счетчика живых объектов.
+
+        Args:
+            name (str): Имя счетчика в отчете
+            counter: Функция без аргументов, возвращающая количество объектов
+        """
+        self.counters[name] = counter
+
+    def count_objects(self) -> dict:
+        """
+        Текущие значения всех счетчиков. Ошибка счетчика не прерывает остальные.
+
+        Returns:
+            dict: Имя счетчика -> количество (None при ошибке)
+        """
+        counts = {}
+        for name, counter in self.counters.items():
+            try:
+                counts[name] = counter()
+            except Exception:
+                counts[name] = None
+        return counts
+
+    def snapshot(self) -> dict:
+        """
+        Снимок памяти и отчет о росте относительно первого снимка.
+
+        Returns:
+            dict: Отчет:
+                - timestamp: время снимка
+                - traced_bytes: объем отслеживаемой памяти
+                - growth_bytes: прирост с первого снимка
+                - top_sites: места выделения с наибольшим приростом
+                  (site, size_diff, count_diff, size)
+                - counts: значения счетчиков
+                - count_growth: прирост счетчиков с первого снимка
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        now = time.time()
+        current = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        traced_bytes = sum(stat.size for stat in current.statistics('filename'))
+        counts = self.count_objects()
+
+        if self.baseline is None:
+            self.baseline = current
+            self.baseline_counts = counts
+            self.baseline_bytes = traced_bytes
+
+        top_sites = []
+        for stat in current.compare_to(self.baseline, 'lineno')[:self.top]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            top_sites.append({
+                'site': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size': stat.size,
+            })
+
+        self.history.append(now, {'traced_bytes': traced_bytes})
+        report = {
+            'timestamp': now,
+            'traced_bytes': traced_bytes,
+            'growth_bytes': traced_bytes - self.baseline_bytes,
+            'top_sites': top_sites,
+            'counts': counts,
+            'count_growth': {
+                name: value - self.baseline_counts[name]
+                for name, value in counts.items()
+                if value is not None and self.baseline_counts.get(name) is not None
+            },
+        }
+        self.last_report = report
+        return report
+
+    def growth_rate(self, seconds: float = 3600):
+        """
+        Скорость роста отслеживаемой памяти.
+
+        Args:
+            seconds (float): Окно оценки в секундах
+
+        Returns:
+            float | None: Байт в секунду (None, если снимков недостаточно)
+        """
+        return self.history.slope('traced_bytes', seconds)
+
+    def format_report(self, report: dict) -> str:
+        """
+        Текст отчета для записи в лог.
+        """
+        lines = [
+            f"Memory diagnostics - traced: {report['traced_bytes'] / 1024 / 1024:.1f} MB, "
+            f"growth: {report['growth_bytes'] / 1024 / 1024:+.1f} MB"
+        ]
+        rate = self.growth_rate()
+        if rate is not None:
+            lines[0] += f", rate: {rate * 3600 / 1024 / 1024:+.1f} MB/h"
+        if report['counts']:
+            lines.append("Objects: " + ", ".join(
+                f"{name}={value} ({report['count_growth'].get(name, 0):+d})"
+                if value is not None else f"{name}=?"
+                for name, value in report['counts'].items()
+            ))
+        for site in report['top_sites']:
+            lines.append(
+                f"  {site['size_diff'] / 1024:+10.1f} KB  {site['count_diff']:+8d} blocks  {site['site']}"
+            )
+        return "\n".join(lines)
+
+    def start(self):
+        """
+        Включение tracemalloc и запуск периодических снимков в фоновом потоке.
+        """
+        if self.thread is not None:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        def worker():
+            while not self.stop_event.wait(self.interval):
+                try:
+                    report = self.snapshot()
+                    if self.logger is not None:
+                        self.logger.info(self.format_report(report))
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.error("Memory diagnostics error: %s", e)
+
+        self.snapshot()  # Первый снимок - точка отсчета
+        self.thread = threading.Thread(target=worker, name='MemoryDiagnostics', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Остановка снимков и отслеживания выделений.
+        """
+        self.stop_event.set()
+        tracemalloc.stop()
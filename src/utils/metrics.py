@@ -0,0 +1,299 @@
+# Импорт необходимых библиотек
+import bisect      # Библиотека для поиска корзины гистограммы
+import hmac        # Библиотека для сравнения токена доступа за постоянное время
+import threading   # Библиотека для фонового сбора метрик и HTTP-сервера
+from urllib.parse import urlsplit, parse_qs  # Разбор адреса запроса профилирования
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Встроенный HTTP-сервер
+
+# Границы корзин гистограмм длительности по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Тип содержимого ответа в формате OpenMetrics
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _format_labels(labels: tuple) -> str:
+    """
+    Внутренняя функция форматирования набора меток {name="value",...}.
+    """
+    if not labels:
+        return ''
+    escaped = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик приложения в формате OpenMetrics.
+
+    Обеспечивает:
+    - Счетчики, измерители (gauge) и гистограммы с метками
+    - Дешевую запись значений на пути запроса (словарь под блокировкой)
+    - Сборщики, вызываемые фоновым потоком, а не при каждом запросе метрик
+    - Формирование текста OpenMetrics только из уже накопленных значений
+    """
+
+    def __init__(self):
+        """
+        Инициализация пустого реестра.
+        """
+        self.lock = threading.Lock()
+        self.metadata = {}    # Имя метрики -> (тип, описание)
+        self.values = {}      # Имя метрики -> {метки: значение}
+        self.buckets = {}     # Имя гистограммы -> границы корзин
+        self.collectors = []  # Функции периодического сбора метрик
+        self.failing = set()  # Сборщики, завершившиеся ошибкой при последнем сборе
+        self.logger = None    # Логгер ошибок сборщиков (см. start_collecting)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def counter(self, name: str, description: str):
+        """
+        Регистрация счетчика (в тексте получает суффикс _total).
+        """
+        self.metadata[name] = ('counter', description)
+        self.values.setdefault(name, {})
+
+    def gauge(self, name: str, description: str):
+        """
+        Регистрация измерителя текущего значения.
+        """
+        self.metadata[name] = ('gauge', description)
+        self.values.setdefault(name, {})
+
+    def histogram(self, name: str, description: str, buckets=DEFAULT_BUCKETS):
+        """
+        Регистрация гистограммы с заданными границами корзин.
+        """
+        self.metadata[name] = ('histogram', description)
+        self.values.setdefault(name, {})
+        self.buckets[name] = tuple(sorted(buckets))
+
+    @staticmethod
+    def _key(labels) -> tuple:
+        """
+        Внутренняя функция приведения меток к ключу словаря.
+        """
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Увеличение счетчика.
+        """
+        key = self._key(labels)
+        with self.lock:
+            series = self.values[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """
+        Установка значения измерителя.
+        """
+        with self.lock:
+            self.values[name][self._key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Добавление наблюдения в гистограмму.
+        """
+        key = self._key(labels)
+        bounds = self.buckets[name]
+        index = bisect.bisect_left(bounds, value)
+        with self.lock:
+            series = self.values[name]
+            state = series.get(key)
+            if state is None:
+                # Счетчики корзин (последняя - +Inf), сумма и количество наблюдений
+                state = series[key] = [[0] * (len(bounds) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def add_collector(self, collector):
+        """
+        Добавление функции сбора метрик.
+
+        Args:
+            collector: Функция без аргументов, обновляющая значения реестра;
+                       вызывается фоновым потоком (см. start_collecting)
+        """
+        self.collectors.append(collector)
+
+    def collect(self):
+        """
+        Однократный вызов всех сборщиков. Ошибка сборщика не прерывает остальные.
+
+        Первая ошибка сборщика записывается в лог как предупреждение, повторные
+        (пока сборщик не восстановится) - как DEBUG с ограничением частоты.
+        """
+        for collector in self.collectors:
+            name = getattr(collector, '__name__', repr(collector))
+            try:
+                collector()
+            except Exception as e:
+                if self.logger is None:
+                    continue
+                if name not in self.failing:
+                    self.failing.add(name)
+                    self.logger.warning("Metrics collector %s failed: %s", name, e)
+                else:
+                    self.logger.debug("Metrics collector %s failed again: %s", name, e)
+            else:
+                self.failing.discard(name)
+
+    def start_collecting(self, interval: float = 5.0, logger=None):
+        """
+        Запуск периодического сбора метрик в фоновом потоке.
+
+        Args:
+            interval (float): Интервал между сборами в секундах
+            logger (AppLogger): Логгер для записи ошибок сборщиков (необязательно)
+        """
+        if self.thread is not None:
+            return
+        self.logger = logger
+
+        def worker():
+            while not self.stop_event.is_set():
+                self.collect()
+                self.stop_event.wait(interval)
+
+        self.thread = threading.Thread(target=worker, name='MetricsCollector', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Остановка фонового сбора метрик.
+        """
+        self.stop_event.set()
+
+    def render(self) -> str:
+        """
+        Формирование текста метрик в формате OpenMetrics.
+
+        Returns:
+            str: Текст для ответа на запрос /metrics
+        """
+        with self.lock:
+            snapshot = {
+                name: {
+                    key: ([list(state[0]), state[1], state[2]] if isinstance(state, list) else state)
+                    for key, state in series.items()
+                }
+                for name, series in self.values.items()
+            }
+
+        lines = []
+        for name in sorted(snapshot):
+            metric_type, description = self.metadata[name]
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'# HELP {name} {description}')
+            for key, state in snapshot[name].items():
+                if metric_type == 'counter':
+                    lines.append(f'{name}_total{_format_labels(key)} {state}')
+                elif metric_type == 'gauge':
+                    lines.append(f'{name}{_format_labels(key)} {state}')
+                else:
+                    counts, total, count = state
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets[name] + ('+Inf',), counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_count{_format_labels(key)} {count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {total}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    Локальный HTTP-сервер, отдающий метрики реестра по адресу /metrics.
+
+    Работает в отдельном потоке и только форматирует уже собранные значения,
+    поэтому запрос метрик не влияет на обработку сообщений.
+    Если переданы профилировщик и токен, запрос POST /profile?seconds=N&mode=sampling|deterministic
+    с заголовком "Authorization: Bearer <токен>" запускает запись профиля в каталог логов.
+    Нестандартный заголовок нельзя отправить со стороннего сайта без предварительного
+    CORS-запроса, поэтому браузер пользователя не может запустить профилирование.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '127.0.0.1', profiler=None,
+                 profile_token: str = None):
+        """
+        Инициализация сервера метрик.
+
+        Args:
+            registry (MetricsRegistry): Реестр метрик
+            port (int): Порт HTTP-сервера
+            host (str): Адрес (по умолчанию только локальные подключения)
+            profiler (Profiler): Профилировщик для эндпоинта /profile (необязательно)
+            profile_token (str): Токен доступа к /profile (без токена эндпоинт отключен)
+        """
+        self.registry = registry
+        profiling = profiler is not None and bool(profile_token)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                url = urlsplit(handler.path)
+                if url.path == '/metrics':
+                    handler.reply(200, registry.render(), OPENMETRICS_CONTENT_TYPE)
+                elif url.path == '/profile' and profiling:
+                    handler.send_error(405)
+                else:
+                    handler.send_error(404)
+
+            def do_POST(handler):
+                url = urlsplit(handler.path)
+                if url.path != '/profile' or not profiling:
+                    handler.send_error(404)
+                    return
+                authorization = handler.headers.get('Authorization', '')
+                if not hmac.compare_digest(authorization.encode('utf-8'),
+                                           f"Bearer {profile_token}".encode('utf-8')):
+                    handler.reply(403, "Invalid profiling token\n")
+                    return
+                query = parse_qs(url.query)
+                try:
+                    base_path = profiler.start(
+                        seconds=float(query.get('seconds', ['10'])[0]),
+                        mode=query.get('mode', ['sampling'])[0]
+                    )
+                except ValueError as e:
+                    handler.reply(400, f"{e}\n")
+                    return
+                if base_path is None:
+                    handler.reply(409, "Profiling is already running\n")
+                else:
+                    handler.reply(202, f"Profiling started: {base_path}\n")
+
+            def reply(handler, status, text, content_type='text/plain; charset=utf-8'):
+                body = text.encode('utf-8')
+                handler.send_response(status)
+                handler.send_header('Content-Type', content_type)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass  # Запросы метрик не засоряют лог приложения
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    def start(self):
+        """
+        Запуск сервера в фоновом потоке.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name='MetricsServer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Остановка сервера.
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,168 @@
+# Импорт необходимых библиотек
+import re          # Библиотека регулярных выражений для токенизации названий
+import math        # Библиотека для логарифмического учета частоты использования
+import bisect      # Библиотека для поиска по префиксу в отсортированном списке слов
+import threading   # Библиотека для обеспечения потокобезопасности
+
+# Регулярное выражение для выделения слов названия и ID модели
+TOKEN_PATTERN = re.compile(r'[^\W_]+', re.UNICODE)
+
+# Оценки качества совпадения (чем выше, тем выше модель в результатах)
+SCORE_EXACT = 100      # Запрос совпадает с ID или названием
+SCORE_PREFIX = 80      # Название или ID начинается с запроса
+SCORE_TOKENS = 60      # Каждое слово запроса - начало слова названия, ID или провайдера
+SCORE_SUBSTRING = 40   # Запрос входит в название или ID
+SCORE_FUZZY = 30       # Максимальная оценка нечеткого совпадения по триграммам
+
+# Минимальная доля общих триграмм для нечеткого совпадения
+FUZZY_THRESHOLD = 0.4
+
+
+def _trigrams(tokens) -> set:
+    """
+    Внутренняя функция получения множества триграмм слов (с границами каждого слова).
+    """
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ModelSearchIndex:
+    """
+    Поисковый индекс списка моделей.
+
+    Обеспечивает:
+    - Однократную подготовку строк: названия, ID и провайдеры в нижнем регистре,
+      разбитые на слова
+    - Поиск по началу слов через отсортированный список слов (bisect)
+    - Нечеткий поиск с опечатками через инвертированный индекс триграмм
+    - Ранжирование по качеству совпадения и частоте/недавности использования
+    - Ограничение результата первыми N моделями
+    """
+
+    def __init__(self, models: list):
+        """
+        Построение индекса.
+
+        Args:
+            models (list): Список моделей [{"id": "provider/model", "name": "Model Name"}, ...]
+        """
+        self.lock = threading.Lock()  # Блокировка для учета использования из разных потоков
+        self.ids = [model['id'] for model in models]
+        self.names = [model['name'].lower() for model in models]
+        self.keys = [model['id'].lower() for model in models]
+        self.positions = {model_id: i for i, model_id in enumerate(self.ids)}
+
+        # Слова названия, ID и провайдера (часть ID до "/") -> модели
+        words = set()
+        self.trigram_index = {}  # Триграмма -> номера моделей
+        self.trigram_counts = []  # Количество триграмм каждой модели
+        for i, (name, key) in enumerate(zip(self.names, self.keys)):
+            provider = key.split('/', 1)[0] if '/' in key else ''
+            tokens = set(TOKEN_PATTERN.findall(name)) | set(TOKEN_PATTERN.findall(key))
+            if provider:
+                tokens.add(provider)
+            words.update((token, i) for token in tokens)
+            grams = _trigrams(tokens)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index.setdefault(gram, []).append(i)
+        self.words = sorted(words)  # Пары (слово, номер модели) для поиска по префиксу
+
+        # Использование моделей: количество выборов и порядковый номер последнего выбора
+        self.use_counts = {}
+        self.last_used = {}
+        self.use_clock = 0
+
+    def record_use(self, model_id: str, count: int = 1):
+        """
+        Учет выбора модели для ранжирования.
+
+        Args:
+            model_id (str): ID модели
+            count (int): Количество использований (например, из накопленной аналитики)
+        """
+        with self.lock:
+            self.use_counts[model_id] = self.use_counts.get(model_id, 0) + count
+            self.use_clock += 1
+            self.last_used[model_id] = self.use_clock
+
+    def _usage_boost(self, i: int) -> float:
+        """
+        Внутренняя функция надбавки за использование: частота (логарифм)
+        и недавность (последние выбранные модели выше).
+        """
+        model_id = self.ids[i]
+        boost = 5 * math.log1p(self.use_counts.get(model_id, 0))
+        last = self.last_used.get(model_id)
+        if last is not None:
+            boost += 10 / (1 + self.use_clock - last)
+        return boost
+
+    def _prefix_matches(self, token: str) -> set:
+        """
+        Внутренняя функция поиска моделей, у которых есть слово, начинающееся с token.
+        """
+        matches = set()
+        start = bisect.bisect_left(self.words, (token, -1))
+        for word, i in self.words[start:]:
+            if not word.startswith(token):
+                break
+            matches.add(i)
+        return matches
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """
+        Поиск моделей.
+
+        Args:
+            query (str): Текст запроса
+            limit (int): Максимальное количество результатов
+
+        Returns:
+            list: Номера моделей (в порядке исходного списка), упорядоченные по убыванию оценки
+        """
+        query = query.strip().lower()
+        scores = {}
+        if not query:
+            # Без запроса: сначала используемые модели, затем исходный порядок
+            scores = {i: 0.0 for i in range(len(self.ids))}
+        else:
+            # Совпадения по началу слов: каждое слово запроса должно найтись
+            tokens = TOKEN_PATTERN.findall(query)
+            if not tokens:
+                return []
+            candidates = self._prefix_matches(tokens[0])
+            for token in tokens[1:]:
+                candidates &= self._prefix_matches(token)
+            for i in candidates:
+                name, key = self.names[i], self.keys[i]
+                if query == name or query == key:
+                    scores[i] = SCORE_EXACT
+                elif name.startswith(query) or key.startswith(query):
+                    scores[i] = SCORE_PREFIX
+                else:
+                    scores[i] = SCORE_TOKENS
+
+            # Подстроки и опечатки: кандидаты по общим триграммам слов
+            grams = _trigrams(tokens)
+            overlaps = {}
+            for gram in grams:
+                for i in self.trigram_index.get(gram, ()):
+                    overlaps[i] = overlaps.get(i, 0) + 1
+            for i, overlap in overlaps.items():
+                if i in scores:
+                    continue
+                if query in self.names[i] or query in self.keys[i]:
+                    scores[i] = SCORE_SUBSTRING
+                    continue
+                # Доля триграмм запроса, найденных у модели, со штрафом за длинные названия
+                similarity = overlap / len(grams)
+                if similarity >= FUZZY_THRESHOLD:
+                    scores[i] = SCORE_FUZZY * similarity * (1 - 0.3 * min(self.trigram_counts[i] / 200, 1))
+
+        with self.lock:
+            ranked = sorted(scores, key=lambda i: (-(scores[i] + self._usage_boost(i)), i))
+        return ranked[:limit]
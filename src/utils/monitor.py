@@ -3,6 +3,151 @@ import psutil      # Библиотека для мониторинга сист
 import time        # Библиотека для работы с временными метками и измерения интервалов
 from datetime import datetime  # Библиотека для работы с датой и временем
 import threading   # Библиотека для работы с потоками
+import bisect      # Библиотека для поиска корзины гистограммы
+import numpy as np  # Библиотека для хранения истории метрик в массивах
+
+# Метрики, хранимые в кольцевом буфере истории
+RING_METRICS = ('cpu_percent', 'memory_percent', 'thread_count')
+
+# Границы корзин гистограммы задержки цикла событий (секунды)
+LOOP_LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class MetricsRingBuffer:
+    """
+    Кольцевой буфер истории метрик фиксированной емкости.
+    
+    Обеспечивает:
+    - Добавление замера за O(1) без сдвига элементов (вместо list.pop(0))
+    - Хранение каждой метрики в отдельном массиве NumPy
+    - Текущие суммы для расчета средних без повторного суммирования истории
+    - Минимум, максимум и средние за последние N секунд
+    """
+    
+    def __init__(self, capacity: int = 1000, names=RING_METRICS):
+        """
+        Инициализация буфера.
+        
+        Args:
+            capacity (int): Максимальное количество хранимых замеров
+            names (tuple): Имена метрик
+        """
+        self.capacity = capacity
+        self.names = names
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = {name: np.zeros(capacity, dtype=np.float64) for name in names}
+        self.sums = {name: 0.0 for name in names}  # Суммы значений, находящихся в буфере
+        self.position = 0  # Индекс следующей записи
+        self.count = 0     # Количество заполненных элементов
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def append(self, timestamp: float, metrics: dict):
+        """
+        Добавление замера; при заполненном буфере вытесняется самый старый.
+        
+        Args:
+            timestamp (float): Время замера (секунды Unix)
+            metrics (dict): Значения метрик по именам
+        """
+        i = self.position
+        full = self.count == self.capacity
+        for name in self.names:
+            column = self.values[name]
+            if full:
+                self.sums[name] -= float(column[i])  # Вычитание вытесняемого значения
+            column[i] = metrics[name]
+            self.sums[name] += float(metrics[name])
+        self.timestamps[i] = timestamp
+        self.position = (i + 1) % self.capacity
+        if not full:
+            self.count += 1
+    
+    def clear(self):
+        """
+        Удаление всех замеров.
+        """
+        self.position = 0
+        self.count = 0
+        for name in self.names:
+            self.sums[name] = 0.0
+    
+    def averages(self) -> dict:
+        """
+        Средние значения по всему буферу (O(1) по текущим суммам).
+        """
+        if not self.count:
+            return {}
+        return {name: self.sums[name] / self.count for name in self.names}
+    
+    def _window(self, seconds=None):
+        """
+        Внутренняя функция получения маски заполненных элементов за последние seconds секунд.
+        """
+        filled = self.timestamps[:self.count]
+        if seconds is None:
+            return slice(0, self.count)
+        return filled >= time.time() - seconds
+    
+    def window_stats(self, seconds=None) -> dict:
+        """
+        Среднее, минимум и максимум каждой метрики за последние seconds секунд.
+        
+        Args:
+            seconds (float): Длина окна (None - весь буфер)
+            
+        Returns:
+            dict: Метрика -> {'avg', 'min', 'max'}; пустой словарь, если замеров нет
+        """
+        window = self._window(seconds)
+        stats = {}
+        for name in self.names:
+            values = self.values[name][:self.count][window]
+            if len(values) == 0:
+                return {}
+            stats[name] = {
+                'avg': float(values.mean()),
+                'min': float(values.min()),
+                'max': float(values.max()),
+            }
+        return stats
+    
+    def slope(self, name: str, seconds=None):
+        """
+        Скорость изменения метрики за последние seconds секунд
+        (наклон прямой, построенной методом наименьших квадратов).
+
+        Args:
+            name (str): Имя метрики
+            seconds (float): Длина окна (None - весь буфер)
+
+        Returns:
+            float | None: Изменение в единицах метрики за секунду
+                          (None, если замеров меньше трех)
+        """
+        window = self._window(seconds)
+        timestamps = self.timestamps[:self.count][window]
+        if len(timestamps) < 3:
+            return None
+        values = self.values[name][:self.count][window]
+        # Порядок элементов кольцевого буфера для регрессии не важен
+        t = timestamps - timestamps.mean()
+        denominator = float((t * t).sum())
+        if denominator == 0:
+            return None
+        return float((t * (values - values.mean())).sum()) / denominator
+
+    def latest(self):
+        """
+        Последний замер в виде словаря (None, если замеров нет).
+        """
+        if not self.count:
+            return None
+        i = (self.position - 1) % self.capacity
+        metrics = {name: float(self.values[name][i]) for name in self.names}
+        metrics['timestamp'] = float(self.timestamps[i])
+        return metrics
 
 class PerformanceMonitor:
     """
@@ -14,6 +159,10 @@ class PerformanceMonitor:
     - Количество активных потоков
     - Время работы приложения
     - Общее состояние системы
+    
+    Замеры выполняет фоновый поток (см. start) с заданным интервалом.
+    Последний замер публикуется в атрибуте snapshot заменой ссылки на новый
+    словарь, поэтому читатели получают его без блокировок и без обращения к psutil.
     """
     
     def __init__(self):
@@ -27,19 +176,36 @@ class PerformanceMonitor:
         - Пороговые значения для метрик
         """
         self.start_time = time.time()  # Сохранение времени запуска для расчета uptime
-        self.metrics_history = []      # Список для хранения истории метрик
+        self.metrics_history = MetricsRingBuffer(capacity=1000)  # История последних 1000 замеров
         self.process = psutil.Process()  # Получение объекта текущего процесса
+        self.snapshot = None             # Последний замер (публикуется фоновым потоком)
+        
+        # Задержка цикла событий: гистограмма за все время и история последних замеров
+        self.loop_lag_counts = [0] * (len(LOOP_LAG_BUCKETS) + 1)  # Последняя корзина - выше всех границ
+        self.loop_lag_sum = 0.0
+        self.loop_lag_history = MetricsRingBuffer(capacity=600, names=('loop_lag',))
+        self.slow_callbacks = 0          # Количество обнаруженных блокировок цикла
+        self.memory_diagnostics = None   # Диагностика роста памяти (MemoryDiagnostics, по желанию)
+        self.stop_event = threading.Event()  # Событие остановки фонового сборщика
+        self.thread = None
         
         # Пороговые значения для определения проблем с производительностью
         self.thresholds = {
             'cpu_percent': 80.0,    # Максимально допустимый процент использования CPU
             'memory_percent': 75.0,  # Максимально допустимый процент использования памяти
-            'thread_count': 50      # Максимально допустимое количество потоков
+            'thread_count': 50,     # Максимально допустимое количество потоков
+            'loop_lag': 0.25,       # Максимально допустимая задержка цикла событий за минуту (секунды)
+            'memory_growth': 50.0   # Максимально допустимый рост памяти за последний час (МБ/ч)
         }
 
-    def get_metrics(self) -> dict:
+    def sample(self) -> dict:
         """
-        Получение текущих метрик производительности.
+        Замер метрик производительности.
+        
+        Все показатели процесса читаются в одном блоке psutil.oneshot()
+        (общие системные вызовы выполняются один раз), количество потоков
+        берется из num_threads() без построения списка потоков.
+        Замер сохраняется в историю и публикуется как snapshot.
         
         Returns:
             dict: Словарь с текущими метриками:
@@ -54,46 +220,127 @@ class PerformanceMonitor:
         """
         try:
             # Сбор текущих метрик производительности
-            metrics = {
-                'timestamp': datetime.now(),              # Время замера
-                'cpu_percent': self.process.cpu_percent(),    # Загрузка CPU
-                'memory_percent': self.process.memory_percent(),  # Использование памяти
-                'thread_count': len(self.process.threads()),  # Количество потоков
-                'uptime': time.time() - self.start_time      # Время работы
-            }
+            now = time.time()
+            with self.process.oneshot():
+                metrics = {
+                    'timestamp': datetime.fromtimestamp(now),     # Время замера
+                    'cpu_percent': self.process.cpu_percent(),    # Загрузка CPU
+                    'memory_percent': self.process.memory_percent(),  # Использование памяти
+                    'thread_count': self.process.num_threads(),   # Количество потоков
+                    'uptime': now - self.start_time              # Время работы
+                }
             
-            # Сохранение метрик в историю
-            self.metrics_history.append(metrics)
-            
-            # Ограничение размера истории последними 1000 записями
-            if len(self.metrics_history) > 1000:
-                self.metrics_history.pop(0)  # Удаление самой старой записи
-                
-            return metrics
+            # Сохранение метрик в кольцевой буфер истории (самый старый замер вытесняется)
+            self.metrics_history.append(now, metrics)
             
         except Exception as e:
-            # Возврат информации об ошибке при сборе метрик
-            return {
+            # Информация об ошибке при сборе метрик
+            metrics = {
                 'error': str(e),
                 'timestamp': datetime.now()
             }
+        
+        self.snapshot = metrics  # Публикация замера заменой ссылки
+        return metrics
+
+    def start(self, interval: float = 5.0):
+        """
+        Запуск фонового сбора метрик.
+        
+        Args:
+            interval (float): Интервал между замерами в секундах
+        """
+        if self.thread is not None:
+            return
+        
+        def worker():
+            while not self.stop_event.is_set():
+                self.sample()
+                self.stop_event.wait(interval)
+        
+        self.thread = threading.Thread(target=worker, name='PerformanceSampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Остановка фонового сбора метрик.
+        """
+        self.stop_event.set()
+
+    def record_loop_lag(self, lag: float):
+        """
+        Учет замера задержки цикла событий (вызывается EventLoopMonitor).
+        
+        Args:
+            lag (float): Запаздывание таймера в секундах
+        """
+        self.loop_lag_counts[bisect.bisect_left(LOOP_LAG_BUCKETS, lag)] += 1
+        self.loop_lag_sum += lag
+        self.loop_lag_history.append(time.time(), {'loop_lag': lag})
+
+    def record_slow_callback(self):
+        """
+        Учет обнаруженной блокировки цикла событий медленным обработчиком.
+        """
+        self.slow_callbacks += 1
+
+    def get_loop_lag_histogram(self) -> dict:
+        """
+        Получение гистограммы задержки цикла событий.
+        
+        Returns:
+            dict: Словарь с ключами:
+                - buckets: список пар (верхняя граница, количество замеров), последняя граница - inf
+                - sum: сумма задержек
+                - count: количество замеров
+                - slow_callbacks: количество блокировок цикла
+        """
+        counts = list(self.loop_lag_counts)
+        return {
+            'buckets': list(zip(LOOP_LAG_BUCKETS + (float('inf'),), counts)),
+            'sum': self.loop_lag_sum,
+            'count': sum(counts),
+            'slow_callbacks': self.slow_callbacks
+        }
 
-    def check_health(self) -> dict:
+    def get_metrics(self) -> dict:
+        """
+        Получение последнего замера метрик производительности.
+        
+        Замер не выполняется: возвращается snapshot фонового сборщика.
+        Только если замеров еще не было (сборщик не запущен), выполняется первый замер.
+        
+        Returns:
+            dict: Словарь с метриками (см. sample)
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def check_health(self, metrics: dict = None) -> dict:
         """
         Проверка состояния системы на основе пороговых значений.
         
         Анализирует текущие метрики и сравнивает их с пороговыми значениями
         для определения потенциальных проблем с производительностью.
         
+        Args:
+            metrics (dict): Проверяемый замер (по умолчанию - последний snapshot;
+                            новый замер не выполняется)
+        
         Returns:
             dict: Словарь с информацией о состоянии системы:
                 - status: 'healthy', 'warning' или 'error'
                 - warnings: список предупреждений (если есть)
                 - timestamp: время проверки
         """
-        metrics = self.get_metrics()  # Получение текущих метрик
+        if metrics is None:
+            metrics = self.snapshot  # Последний замер фонового сборщика
         
         # Проверка на наличие ошибок при сборе метрик
+        if metrics is None:
+            return {'status': 'error', 'error': 'No metrics sampled yet'}
         if 'error' in metrics:
             return {'status': 'error', 'error': metrics['error']}
             
@@ -118,6 +365,25 @@ class PerformanceMonitor:
             )
             health_status['status'] = 'warning'
             
+        # Проверка задержки цикла событий за последнюю минуту
+        loop_lag = self.loop_lag_history.window_stats(60)
+        if loop_lag and loop_lag['loop_lag']['max'] > self.thresholds['loop_lag']:
+            health_status['warnings'].append(
+                f"Event loop lag: {loop_lag['loop_lag']['max']:.2f}s"
+            )
+            health_status['status'] = 'warning'
+            
+        # Проверка скорости роста памяти (если включена диагностика памяти)
+        if self.memory_diagnostics is not None:
+            rate = self.memory_diagnostics.growth_rate(3600)
+            if rate is not None and rate * 3600 / 1024 / 1024 > self.thresholds['memory_growth']:
+                report = self.memory_diagnostics.last_report
+                top_site = report['top_sites'][0]['site'] if report and report['top_sites'] else 'unknown'
+                health_status['warnings'].append(
+                    f"Memory growth: {rate * 3600 / 1024 / 1024:.1f} MB/h (top site: {top_site})"
+                )
+                health_status['status'] = 'warning'
+            
         # Проверка количества потоков    
         if metrics['thread_count'] > self.thresholds['thread_count']:
             health_status['warnings'].append(
@@ -136,23 +402,37 @@ class PerformanceMonitor:
         - Использования памяти
         - Количества потоков
         
+        Средние берутся из текущих сумм кольцевого буфера за O(1).
+        
         Returns:
             dict: Словарь со средними значениями метрик или сообщением об ошибке
         """
         # Проверка наличия данных для анализа
-        if not self.metrics_history:
+        if not len(self.metrics_history):
             return {"error": "No metrics available"}
             
-        # Расчет средних значений по всей истории метрик
+        averages = self.metrics_history.averages()
         avg_metrics = {
-            'avg_cpu': sum(m['cpu_percent'] for m in self.metrics_history) / len(self.metrics_history),
-            'avg_memory': sum(m['memory_percent'] for m in self.metrics_history) / len(self.metrics_history),
-            'avg_threads': sum(m['thread_count'] for m in self.metrics_history) / len(self.metrics_history),
+            'avg_cpu': averages['cpu_percent'],
+            'avg_memory': averages['memory_percent'],
+            'avg_threads': averages['thread_count'],
             'samples_count': len(self.metrics_history)  # Количество проанализированных замеров
         }
         
         return avg_metrics
 
+    def get_window_metrics(self, seconds: float = 60) -> dict:
+        """
+        Среднее, минимум и максимум метрик за последние seconds секунд.
+        
+        Args:
+            seconds (float): Длина окна в секундах (None - вся история)
+            
+        Returns:
+            dict: Метрика -> {'avg', 'min', 'max'} (пустой словарь, если замеров нет)
+        """
+        return self.metrics_history.window_stats(seconds)
+
     def log_metrics(self, logger) -> None:
         """
         Логирование текущих метрик и состояния системы.
@@ -164,20 +444,18 @@ class PerformanceMonitor:
         Args:
             logger: Объект логгера для записи информации
         """
-        metrics = self.get_metrics()   # Получение текущих метрик
-        health = self.check_health()   # Проверка состояния системы
+        metrics = self.get_metrics()          # Последний замер фонового сборщика
+        health = self.check_health(metrics)   # Проверка состояния по тому же замеру
         
         # Логирование текущих метрик производительности
         if 'error' not in metrics:
             logger.info(
-                f"Performance metrics - "
-                f"CPU: {metrics['cpu_percent']:.1f}%, "
-                f"Memory: {metrics['memory_percent']:.1f}%, "
-                f"Threads: {metrics['thread_count']}, "
-                f"Uptime: {metrics['uptime']:.0f}s"
+                "Performance metrics - CPU: %.1f%%, Memory: %.1f%%, Threads: %d, Uptime: %.0fs",
+                metrics['cpu_percent'], metrics['memory_percent'],
+                metrics['thread_count'], metrics['uptime']
             )
             
         # Логирование предупреждений при проблемах с производительностью
         if health['status'] == 'warning':
             for warning in health['warnings']:
-                logger.warning(f"Performance warning: {warning}")
\ No newline at end of file
+                logger.warning("Performance warning: %s", warning)
\ No newline at end of file
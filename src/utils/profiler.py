@@ -0,0 +1,207 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для работы с путями файлов профиля
+import sys         # Библиотека для получения стеков всех потоков
+import time        # Библиотека для отсчета длительности записи
+import asyncio     # Библиотека асинхронного программирования
+import cProfile    # Детерминированный профилировщик стандартной библиотеки
+import pstats      # Библиотека для сохранения и вывода статистики cProfile
+import threading   # Библиотека для фонового потока выборки
+from collections import Counter  # Счетчик одинаковых стеков
+from datetime import datetime    # Библиотека для имен файлов профиля
+
+# Режимы профилирования
+PROFILE_MODES = ('sampling', 'deterministic')
+
+# Максимальная длительность одной записи в секундах
+MAX_PROFILE_SECONDS = 300
+
+
+class Profiler:
+    """
+    Встроенный профилировщик для диагностики медленной работы приложения.
+
+    Обеспечивает:
+    - Выборочный режим (sampling): фоновый поток с заданным интервалом снимает
+      стеки всех потоков; накладные расходы малы и не зависят от количества вызовов
+    - Детерминированный режим (deterministic): cProfile в потоке цикла событий
+      интерфейса, точные количества вызовов и время каждой функции
+    - Запись результата в каталог логов: стеки в свернутом формате
+      (collapsed stacks) для построения flame graph, статистика cProfile
+      в формате pstats и текстовая сводка
+    - Не более одной записи одновременно и ограничение длительности
+
+    Используется только стандартная библиотека, вывод идет только в файлы,
+    поэтому профилировщик работает и в сборке PyInstaller без консоли.
+    """
+
+    def __init__(self, logs_dir: str = "logs", run_task=None, interval: float = 0.005):
+        """
+        Инициализация профилировщика.
+
+        Args:
+            logs_dir (str): Каталог для файлов профиля
+            run_task: Функция запуска сопрограммы в цикле событий интерфейса
+                      (page.run_task); нужна для детерминированного режима
+            interval (float): Интервал выборки стеков в секундах
+        """
+        self.logs_dir = logs_dir
+        self.run_task = run_task
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = None        # Режим текущей записи (None - запись не идет)
+        self.labels = {}          # Кэш подписей кадров: объект кода -> подпись
+        os.makedirs(self.logs_dir, exist_ok=True)
+
+    @property
+    def running(self) -> bool:
+        """
+        Идет ли сейчас запись профиля.
+        """
+        return self.active is not None
+
+    def start(self, seconds: float = 10, mode: str = 'sampling', on_complete=None):
+        """
+        Запуск записи профиля в фоне.
+
+        Args:
+            seconds (float): Длительность записи (не более MAX_PROFILE_SECONDS)
+            mode (str): 'sampling' или 'deterministic'
+            on_complete: Функция, получающая список созданных файлов
+                         (или исключение при ошибке записи)
+
+        Returns:
+            str | None: Базовый путь файлов профиля (без расширения)
+                        или None, если запись уже идет
+
+        Raises:
+            ValueError: При неизвестном режиме или отсутствии цикла событий
+                        для детерминированного режима
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if mode == 'deterministic' and self.run_task is None:
+            raise ValueError("Deterministic profiling requires an event loop (run_task)")
+        seconds = min(max(float(seconds), 0.1), MAX_PROFILE_SECONDS)
+
+        with self.lock:
+            if self.active is not None:
+                return None
+            self.active = mode
+
+        base_path = os.path.join(
+            self.logs_dir,
+            f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{mode}"
+        )
+
+        def finish(result):
+            self.active = None
+            if on_complete is not None:
+                on_complete(result)
+
+        if mode == 'sampling':
+            def worker():
+                try:
+                    result = self._sample(seconds, base_path)
+                except Exception as e:
+                    result = e
+                finish(result)
+
+            threading.Thread(target=worker, name='ProfilerSampler', daemon=True).start()
+        else:
+            async def profile_loop():
+                try:
+                    result = await self._profile_loop(seconds, base_path)
+                except Exception as e:
+                    result = e
+                finish(result)
+
+            self.run_task(profile_loop)
+        return base_path
+
+    def _label(self, code) -> str:
+        """
+        Внутренняя функция подписи кадра для свернутого стека: функция (файл:строка).
+        Точка с запятой - разделитель кадров, поэтому в подписи она заменяется.
+        """
+        label = self.labels.get(code)
+        if label is None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            label = self.labels[code] = label.replace(';', ':')
+        return label
+
+    def _sample(self, seconds: float, base_path: str) -> list:
+        """
+        Внутренняя функция выборочного профилирования всех потоков.
+
+        Returns:
+            list: Пути созданных файлов
+        """
+        own_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        thread_names = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if frames.keys() - thread_names.keys():
+                # Имена потоков обновляются только при появлении новых потоков
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)).replace(';', ':'))
+                stacks[';'.join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        collapsed_path = base_path + '.collapsed'
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Сводка: функции с наибольшим количеством выборок на вершине стека
+        own_samples = Counter()
+        for stack, count in stacks.items():
+            own_samples[stack.rsplit(';', 1)[-1]] += count
+        summary_path = base_path + '.txt'
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(f"Sampling profile: {seconds:.1f}s, interval {self.interval * 1000:.1f}ms, "
+                    f"{samples} samples\n\n")
+            for label, count in own_samples.most_common(30):
+                f.write(f"{count:8d}  {count / max(samples, 1):7.1%}  {label}\n")
+        return [collapsed_path, summary_path]
+
+    async def _profile_loop(self, seconds: float, base_path: str) -> list:
+        """
+        Внутренняя функция детерминированного профилирования цикла событий.
+
+        cProfile включается внутри сопрограммы, поэтому учитываются все обработчики,
+        выполненные циклом событий за время записи. Фоновые потоки
+        (например, запросы к API в исполнителе) в этом режиме не учитываются.
+
+        Returns:
+            list: Пути созданных файлов
+        """
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+
+        stats_path = base_path + '.prof'
+        profile.dump_stats(stats_path)
+
+        # Текстовая сводка; поток вывода задается явно, так как в сборке
+        # без консоли sys.stdout отсутствует
+        summary_path = base_path + '.txt'
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(20)
+        return [stats_path, summary_path]
@@ -0,0 +1,288 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для работы с файлами и директориями
+import re          # Библиотека регулярных выражений для токенизации текста
+import json        # Библиотека для хранения метаданных индекса
+import zlib        # Библиотека с быстрой и стабильной хэш-функцией crc32
+import math        # Библиотека математических функций
+import threading   # Библиотека для обеспечения потокобезопасности
+import numpy as np  # Библиотека для векторных вычислений
+
+# Регулярное выражение для выделения слов (латиница, кириллица, цифры)
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Версия формата файлов индекса (индекс другой версии перестраивается)
+INDEX_VERSION = 2
+
+
+class SemanticIndex:
+    """
+    Локальный векторный индекс сообщений для поиска похожих диалогов.
+
+    Обеспечивает:
+    - Построение TF-IDF векторов на основе хэшированных признаков (hashing trick)
+    - Хранение векторов в компактной матрице NumPy (float32), отображаемой в память с диска
+    - Инкрементальное добавление новых сообщений без перестроения индекса
+    - Поиск top-k похожих сообщений одним матрично-векторным произведением
+
+    Строки матрицы хранят сублинейные частоты термов (TF) без весов IDF:
+    веса IDF и нормировка применяются при поиске по текущим документным
+    частотам, поэтому ранние сообщения не взвешиваются по устаревшей статистике.
+    """
+
+    def __init__(self, index_dir: str, n_features: int = 512, initial_capacity: int = 1024):
+        """
+        Инициализация векторного индекса.
+
+        Args:
+            index_dir (str): Директория для хранения файлов индекса
+            n_features (int): Размерность хэшированного пространства признаков
+            initial_capacity (int): Начальное количество строк в файле матрицы
+        """
+        self.index_dir = index_dir
+        self.n_features = n_features
+        self.lock = threading.Lock()  # Блокировка для доступа из разных потоков
+
+        # Пути к файлам индекса
+        self.vectors_path = os.path.join(index_dir, 'vectors.f32')  # Матрица векторов
+        self.ids_path = os.path.join(index_dir, 'ids.i64')          # ID сообщений для каждой строки
+        self.meta_path = os.path.join(index_dir, 'meta.json')       # Счетчики и частоты документов
+
+        os.makedirs(index_dir, exist_ok=True)
+
+        # Загрузка метаданных или создание пустого индекса
+        self.count = 0                                      # Количество заполненных строк
+        self.documents = None                               # Количество документов (без удаленных)
+        self.capacity = initial_capacity                    # Количество строк в файле
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)  # Документная частота признаков
+        self._load_meta()
+
+        # Открытие файлов матрицы и идентификаторов с отображением в память
+        self._open_arrays()
+
+        # Индекс прежнего формата метаданных: удаленные строки помечены ID -1
+        if self.documents is None:
+            self.documents = int(np.count_nonzero(self.ids[:self.count] != -1))
+
+    def _load_meta(self):
+        """
+        Внутренняя функция загрузки метаданных индекса.
+        Несовместимый индекс (другая размерность) сбрасывается.
+        """
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('n_features') != self.n_features or meta.get('version') != INDEX_VERSION:
+            return
+        self.count = meta['count']
+        self.documents = meta.get('documents')
+        self.capacity = max(meta['capacity'], self.capacity)
+        self.doc_freq = np.array(meta['doc_freq'], dtype=np.int64)
+
+    def _save_meta(self):
+        """
+        Внутренняя функция сохранения метаданных индекса.
+        """
+        meta = {
+            'version': INDEX_VERSION,
+            'n_features': self.n_features,
+            'count': self.count,
+            'documents': self.documents,
+            'capacity': self.capacity,
+            'doc_freq': self.doc_freq.tolist()
+        }
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)  # Атомарная замена файла
+
+    def _open_arrays(self):
+        """
+        Внутренняя функция открытия (и при необходимости расширения) файлов
+        матрицы векторов и идентификаторов через np.memmap.
+        """
+        vectors_size = self.capacity * self.n_features * np.dtype(np.float32).itemsize
+        ids_size = self.capacity * np.dtype(np.int64).itemsize
+
+        # Файлы расширяются до нужного размера (новые байты заполняются нулями)
+        for path, size in ((self.vectors_path, vectors_size), (self.ids_path, ids_size)):
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(self.capacity, self.n_features))
+        self.ids = np.memmap(self.ids_path, dtype=np.int64, mode='r+',
+                             shape=(self.capacity,))
+
+    def _grow(self):
+        """
+        Внутренняя функция удвоения емкости индекса.
+        """
+        self.vectors.flush()
+        self.ids.flush()
+        del self.vectors, self.ids
+        self.capacity *= 2
+        self._open_arrays()
+
+    @staticmethod
+    def tokenize(text: str) -> list:
+        """
+        Разбиение текста на признаки.
+
+        Помимо целых слов добавляет их усеченную основу (первые 6 символов),
+        что грубо нормализует словоформы и помогает находить перефразировки.
+
+        Args:
+            text (str): Исходный текст
+
+        Returns:
+            list: Список признаков
+        """
+        features = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            features.append(token)
+            if len(token) > 6:
+                features.append(token[:6] + '~')  # Основа слова
+        return features
+
+    def _term_frequencies(self, text: str) -> np.ndarray:
+        """
+        Внутренняя функция построения вектора сублинейных частот термов
+        в хэшированном пространстве признаков.
+        """
+        tf = np.zeros(self.n_features, dtype=np.float32)
+        for feature in self.tokenize(text):
+            bucket = zlib.crc32(feature.encode('utf-8')) % self.n_features
+            tf[bucket] += 1.0
+        np.log1p(tf, out=tf)  # Сублинейное масштабирование частот
+        return tf
+
+    def _idf(self) -> np.ndarray:
+        """
+        Внутренняя функция расчета сглаженной обратной документной частоты.
+        """
+        return np.log((1.0 + self.documents) / (1.0 + self.doc_freq)).astype(np.float32) + 1.0
+
+    def add(self, message_id: int, text: str, persist: bool = True):
+        """
+        Инкрементальное добавление сообщения в индекс.
+
+        Args:
+            message_id (int): ID сообщения в базе данных
+            text (str): Текст для индексации (вопрос и ответ)
+            persist (bool): Сохранять ли метаданные сразу (False для пакетной
+                           индексации с последующим вызовом flush)
+        """
+        tf = self._term_frequencies(text)
+        with self.lock:
+            if self.count >= self.capacity:
+                self._grow()
+            self.doc_freq += tf > 0
+            self.vectors[self.count] = tf
+            self.ids[self.count] = message_id
+            self.count += 1
+            self.documents += 1
+            if persist:
+                self._save_meta()
+
+    def search(self, text: str, top_k: int = 5, exclude_id: int = None) -> list:
+        """
+        Поиск сообщений, наиболее похожих на заданный текст.
+
+        Args:
+            text (str): Текст запроса
+            top_k (int): Количество возвращаемых результатов
+            exclude_id (int): ID сообщения, исключаемого из результатов
+
+        Returns:
+            list: Список кортежей (message_id, score), отсортированных
+                 по убыванию косинусной близости
+        """
+        with self.lock:
+            if self.count == 0:
+                return []
+            idf = self._idf()
+            query = self._term_frequencies(text) * idf
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                return []
+            vectors = self.vectors[:self.count]
+            # Косинусная близость TF-IDF векторов: (tf * idf) . (q * idf) / нормы;
+            # нормы строк с текущими весами - одним проходом по матрице без копий
+            scores = vectors @ (query * idf)
+            norms = np.sqrt(np.einsum('ij,ij,j->i', vectors, vectors, idf * idf))
+            scores = np.divide(scores, norms * query_norm, out=np.zeros_like(scores), where=norms > 0)
+            ids = np.array(self.ids[:self.count])
+
+        if exclude_id is not None:
+            scores[ids == exclude_id] = -math.inf
+
+        # Частичная сортировка: O(n) выбор кандидатов + сортировка только top-k
+        k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [
+            (int(ids[i]), float(scores[i]))
+            for i in candidates
+            if scores[i] > 0
+        ]
+
+    def missing(self, message_ids: list) -> list:
+        """
+        Поиск сообщений, отсутствующих в индексе (например, если индексация
+        после импорта была прервана закрытием приложения).
+
+        Args:
+            message_ids (list): Список ID сообщений в базе данных
+
+        Returns:
+            list: ID сообщений, которых нет в индексе, по возрастанию
+        """
+        with self.lock:
+            indexed = np.array(self.ids[:self.count])
+        return np.setdiff1d(np.asarray(message_ids, dtype=np.int64), indexed).tolist()
+
+    def remove(self, message_ids: list):
+        """
+        Удаление сообщений из индекса.
+
+        Строки не сдвигаются: вектор обнуляется (его близость с любым
+        запросом становится нулевой), а ID помечается как -1.
+
+        Args:
+            message_ids (list): Список ID удаляемых сообщений
+        """
+        if not message_ids:
+            return
+        with self.lock:
+            rows = np.nonzero(np.isin(self.ids[:self.count], message_ids))[0]
+            if len(rows) == 0:
+                return
+            # Ненулевые компоненты вектора совпадают с признаками документа
+            self.doc_freq -= (self.vectors[rows] > 0).sum(axis=0)
+            self.vectors[rows] = 0
+            self.ids[rows] = -1
+            self.documents -= len(rows)
+            self._save_meta()
+
+    def clear(self):
+        """
+        Полная очистка индекса.
+        """
+        with self.lock:
+            self.count = 0
+            self.documents = 0
+            self.doc_freq[:] = 0
+            self.vectors[:] = 0
+            self.ids[:] = 0
+            self._save_meta()
+
+    def flush(self):
+        """
+        Сброс изменений матрицы и метаданных на диск.
+        """
+        with self.lock:
+            self.vectors.flush()
+            self.ids.flush()
+            self._save_meta()
@@ -0,0 +1,210 @@
+# Импорт необходимых библиотек
+import threading   # Библиотека для обеспечения потокобезопасности
+import numpy as np  # Библиотека для векторных вычислений
+
+# Столбцы хранилища и их типы данных
+SESSION_COLUMNS = {
+    'timestamp': np.float64,       # Время сообщения (секунды Unix)
+    'model': np.int32,             # Код модели (индекс в списке models)
+    'message_length': np.int32,    # Длина сообщения в символах
+    'response_time': np.float32,   # Время ответа в секундах
+    'tokens_used': np.int32,       # Количество токенов
+}
+
+
+class SessionStore:
+    """
+    Столбцовое хранилище метрик сообщений сессии.
+
+    Обеспечивает:
+    - Компактное хранение каждого столбца в отдельном массиве NumPy
+      (около 24 байт на сообщение вместо словаря с объектом datetime)
+    - Словарное кодирование идентификаторов моделей целыми кодами
+    - Векторные агрегаты: суммы, средние и перцентили по моделям и интервалам времени
+    - Доступ к данным через представления массивов без копирования
+
+    Массивы растут удвоением емкости, поэтому добавление записи в среднем O(1).
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Инициализация хранилища.
+
+        Args:
+            initial_capacity (int): Начальное количество строк в массивах
+        """
+        self.lock = threading.Lock()  # Блокировка для доступа из разных потоков
+        self.capacity = initial_capacity
+        self.count = 0
+        self.models = []        # Идентификаторы моделей по кодам
+        self.model_codes = {}   # Обратное отображение: модель -> код
+        self.columns = {
+            name: np.zeros(initial_capacity, dtype=dtype)
+            for name, dtype in SESSION_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _grow(self):
+        """
+        Внутренняя функция удвоения емкости массивов.
+        """
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def model_code(self, model: str) -> int:
+        """
+        Получение кода модели (новая модель получает следующий свободный код).
+        """
+        code = self.model_codes.get(model)
+        if code is None:
+            code = len(self.models)
+            self.models.append(model)
+            self.model_codes[model] = code
+        return code
+
+    def append(self, timestamp: float, model: str, message_length: int,
+               response_time: float, tokens_used: int):
+        """
+        Добавление записи о сообщении.
+
+        Args:
+            timestamp (float): Время сообщения (секунды Unix)
+            model (str): Идентификатор модели
+            message_length (int): Длина сообщения в символах
+            response_time (float): Время ответа в секундах
+            tokens_used (int): Количество токенов
+        """
+        with self.lock:
+            if self.count >= self.capacity:
+                self._grow()
+            row = self.count
+            self.columns['timestamp'][row] = timestamp
+            self.columns['model'][row] = self.model_code(model)
+            self.columns['message_length'][row] = message_length
+            self.columns['response_time'][row] = response_time
+            self.columns['tokens_used'][row] = tokens_used
+            self.count += 1
+
+    def clear(self):
+        """
+        Удаление всех записей (емкость массивов сохраняется).
+        """
+        with self.lock:
+            self.count = 0
+            self.models.clear()
+            self.model_codes.clear()
+
+    def view(self) -> dict:
+        """
+        Получение заполненной части столбцов без копирования.
+
+        Массивы доступны только для чтения; при последующем росте хранилища
+        представления продолжают ссылаться на прежние данные.
+
+        Returns:
+            dict: Столбцы SESSION_COLUMNS и список 'models' для расшифровки кодов
+        """
+        with self.lock:
+            result = {}
+            for name, column in self.columns.items():
+                view = column[:self.count]
+                view.flags.writeable = False
+                result[name] = view
+            result['models'] = list(self.models)
+        return result
+
+    def _mask(self, model=None, start=None, end=None):
+        """
+        Внутренняя функция построения маски строк по модели и интервалу времени.
+        Возвращает None, если фильтры не заданы.
+        """
+        columns = self.view()
+        mask = None
+        if model is not None:
+            code = self.model_codes.get(model, -1)
+            mask = columns['model'] == code
+        if start is not None:
+            window = columns['timestamp'] >= start
+            mask = window if mask is None else mask & window
+        if end is not None:
+            window = columns['timestamp'] < end
+            mask = window if mask is None else mask & window
+        return columns, mask
+
+    def select(self, column: str, model=None, start=None, end=None) -> np.ndarray:
+        """
+        Выборка значений столбца с фильтрами по модели и времени.
+
+        Args:
+            column (str): Имя столбца из SESSION_COLUMNS
+            model (str): Идентификатор модели (None - все модели)
+            start (float): Нижняя граница времени (включительно)
+            end (float): Верхняя граница времени (не включительно)
+
+        Returns:
+            np.ndarray: Значения столбца (без фильтров - представление без копирования)
+        """
+        columns, mask = self._mask(model, start, end)
+        values = columns[column]
+        return values if mask is None else values[mask]
+
+    def percentiles(self, column: str = 'response_time', q=(50, 90, 99),
+                    model=None, start=None, end=None) -> dict:
+        """
+        Расчет перцентилей столбца.
+
+        Returns:
+            dict: Перцентиль -> значение (пустой словарь, если данных нет)
+        """
+        values = self.select(column, model, start, end)
+        if len(values) == 0:
+            return {}
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def group_by_model(self, start=None, end=None) -> dict:
+        """
+        Агрегаты по моделям за интервал времени, рассчитанные через np.bincount.
+
+        Returns:
+            dict: Модель -> словарь count, tokens, message_length_sum,
+                  avg_response_time и max_response_time
+        """
+        columns, mask = self._mask(start=start, end=end)
+        codes = columns['model']
+        response_time = columns['response_time']
+        tokens = columns['tokens_used']
+        lengths = columns['message_length']
+        if mask is not None:
+            codes, response_time = codes[mask], response_time[mask]
+            tokens, lengths = tokens[mask], lengths[mask]
+
+        n_models = len(columns['models'])
+        counts = np.bincount(codes, minlength=n_models)
+        tokens_sum = np.bincount(codes, weights=tokens, minlength=n_models)
+        length_sum = np.bincount(codes, weights=lengths, minlength=n_models)
+        time_sum = np.bincount(codes, weights=response_time, minlength=n_models)
+        time_max = np.zeros(n_models, dtype=np.float64)
+        np.maximum.at(time_max, codes, response_time)
+
+        return {
+            model: {
+                'count': int(counts[code]),
+                'tokens': int(tokens_sum[code]),
+                'message_length_sum': int(length_sum[code]),
+                'avg_response_time': float(time_sum[code] / counts[code]),
+                'max_response_time': float(time_max[code]),
+            }
+            for code, model in enumerate(columns['models'])
+            if counts[code]
+        }
+
+    def memory_usage(self) -> int:
+        """
+        Объем памяти, занятый массивами хранилища, в байтах.
+        """
+        return sum(column.nbytes for column in self.columns.values())
@@ -0,0 +1,158 @@
+# Импорт необходимых библиотек
+import json        # Библиотека для сериализации состояния скетча
+import math        # Библиотека математических функций
+import zlib        # Библиотека сжатия сериализованного скетча
+
+# Относительная погрешность квантилей по умолчанию (1%)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Максимальное количество корзин; при превышении сливаются самые младшие
+DEFAULT_MAX_BUCKETS = 2048
+
+
+class QuantileSketch:
+    """
+    Потоковый скетч квантилей с логарифмическими корзинами (по схеме DDSketch).
+
+    Обеспечивает:
+    - Оценку любого квантиля с заданной относительной погрешностью
+    - Ограниченный объем памяти независимо от количества значений
+    - Слияние скетчей (например, дневных в недельный) без потери точности
+    - Компактную сериализацию для хранения в SQLite
+
+    Положительное значение v попадает в корзину ceil(log(v) / log(gamma)),
+    где gamma = (1 + a) / (1 - a); нулевые и отрицательные значения
+    учитываются отдельным счетчиком.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        """
+        Инициализация пустого скетча.
+
+        Args:
+            relative_accuracy (float): Относительная погрешность оценки квантилей
+            max_buckets (int): Максимальное количество корзин
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}       # Индекс корзины -> количество значений
+        self.zero_count = 0     # Количество значений <= 0
+        self.count = 0          # Общее количество значений
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1):
+        """
+        Добавление значения в скетч.
+
+        Args:
+            value (float): Значение
+            weight (int): Количество повторений значения
+        """
+        if value > 0:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + weight
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self):
+        """
+        Внутренняя функция слияния самых младших корзин для ограничения памяти.
+        Точность снижается только для наименьших значений (нижние квантили).
+        """
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def merge(self, other: 'QuantileSketch'):
+        """
+        Добавление в скетч всех значений другого скетча.
+
+        Raises:
+            ValueError: Если скетчи построены с разной точностью
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float):
+        """
+        Оценка квантиля.
+
+        Args:
+            q (float): Квантиль от 0 до 1
+
+        Returns:
+            float | None: Оценка значения (None для пустого скетча)
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0  # Скетч рассчитан на неотрицательные метрики
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Середина корзины (gamma^(i-1), gamma^i] в смысле относительной погрешности
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def percentiles(self, q=(50, 90, 99)) -> dict:
+        """
+        Оценка нескольких перцентилей.
+
+        Returns:
+            dict: Перцентиль -> значение (пустой словарь для пустого скетча)
+        """
+        if self.count == 0:
+            return {}
+        return {p: self.quantile(p / 100) for p in q}
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализация скетча в сжатый BLOB.
+        """
+        state = {
+            'a': self.relative_accuracy,
+            'm': self.max_buckets,
+            'z': self.zero_count,
+            'n': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'b': [[index, bucket_count] for index, bucket_count in sorted(self.buckets.items())],
+        }
+        return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'QuantileSketch':
+        """
+        Восстановление скетча из BLOB, созданного to_bytes.
+        """
+        state = json.loads(zlib.decompress(data).decode('utf-8'))
+        sketch = cls(state['a'], state['m'])
+        sketch.buckets = {index: bucket_count for index, bucket_count in state['b']}
+        sketch.zero_count = state['z']
+        sketch.count = state['n']
+        if sketch.count:
+            sketch.min = state['min']
+            sketch.max = state['max']
+        return sketch
@@ -0,0 +1,165 @@
+# Импорт необходимых библиотек
+import os          # Библиотека для получения ID процесса
+import json        # Библиотека для записи трассы в формате Chrome
+import time        # Библиотека для измерения длительности участков
+import threading   # Библиотека для идентификации потоков
+from collections import deque  # Двусторонняя очередь для кольцевого буфера событий
+
+
+class _NullSpan:
+    """
+    Пустой участок, возвращаемый выключенным трассировщиком.
+    Один общий экземпляр: вход и выход ничего не делают.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """
+    Участок трассы: при выходе записывает в трассировщик завершенное событие.
+    """
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), **self.args)
+        return False
+
+    def set(self, **args):
+        """
+        Добавление аргументов участка (например, результата) до его завершения.
+        """
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Встроенный трассировщик участков выполнения.
+
+    Обеспечивает:
+    - Вложенные участки через with tracer.span(...) (вложенность определяется
+      по времени начала и окончания в пределах потока)
+    - Почти нулевую стоимость в выключенном состоянии: span возвращает общий пустой объект
+    - Хранение последних событий в кольцевом буфере фиксированного размера
+    - Экспорт в формат Chrome Trace Event (chrome://tracing, Perfetto)
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 10000):
+        """
+        Инициализация трассировщика.
+
+        Args:
+            enabled (bool): Включена ли запись участков
+            capacity (int): Количество хранимых последних событий
+        """
+        self.enabled = enabled
+        self.events = deque(maxlen=capacity)  # Кольцевой буфер: старые события вытесняются
+        self.origin = time.perf_counter()     # Начало отсчета времени трассы
+        self.pid = os.getpid()
+
+    def span(self, name: str, **args):
+        """
+        Участок трассы для использования в блоке with.
+
+        Args:
+            name (str): Название участка
+            **args: Дополнительные сведения, сохраняемые в событии
+
+        Returns:
+            Контекстный менеджер участка (пустой, если трассировка выключена)
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name: str, start: float, end: float, **args):
+        """
+        Запись завершенного участка по известным отметкам времени.
+
+        Используется для интервалов, начатых в одном потоке и завершенных
+        в другом (например, ожидание свободного потока исполнителя).
+
+        Args:
+            name (str): Название участка
+            start (float): Начало (time.perf_counter())
+            end (float): Окончание (time.perf_counter())
+            **args: Дополнительные сведения
+        """
+        if not self.enabled:
+            return
+        # deque.append потокобезопасен, поэтому блокировка не требуется
+        self.events.append((name, start, end, threading.get_ident(), args))
+
+    def clear(self):
+        """
+        Удаление всех записанных событий.
+        """
+        self.events.clear()
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Преобразование событий в формат Chrome Trace Event.
+
+        Returns:
+            dict: Объект {"traceEvents": [...]} с событиями типа "X" (завершенный участок),
+                  время в микросекундах от начала трассы
+        """
+        events = list(self.events)
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        trace_events = [
+            {
+                'name': name,
+                'ph': 'X',
+                'ts': (start - self.origin) * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': self.pid,
+                'tid': tid,
+                'args': args,
+            }
+            for name, start, end, tid, args in events
+        ]
+        # Имена потоков для удобства просмотра
+        trace_events.extend(
+            {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+             'args': {'name': thread_names.get(tid, str(tid))}}
+            for tid in {event[3] for event in events}
+        )
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, filepath: str) -> int:
+        """
+        Сохранение трассы в файл JSON для открытия в chrome://tracing или Perfetto.
+
+        Args:
+            filepath (str): Путь к файлу
+
+        Returns:
+            int: Количество экспортированных участков
+        """
+        trace = self.to_chrome_trace()
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False, default=str)
+        return sum(1 for event in trace['traceEvents'] if event['ph'] == 'X')